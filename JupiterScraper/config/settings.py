@@ -10,9 +10,7 @@ PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 CACHE_DIR = PROJECT_ROOT / "cache"
 
-# Ensure directories exist
-DATA_DIR.mkdir(exist_ok=True)
-CACHE_DIR.mkdir(exist_ok=True)
+# Directories are created by the code that writes into them, not on import
 
 # Website configuration
 BASE_URL = "https://www.jupiter.money"
@@ -21,23 +19,60 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 # Data configuration
 DATA_FILE = DATA_DIR / "scraped_texts.txt"
 CACHE_FILE = CACHE_DIR / "cache_metadata.json"
-CHUNK_SIZE = 500
+INDEX_BUILDS_KEPT = 2  # most recent index builds kept on disk (older ones go once unused)
+INDEX_DIR = CACHE_DIR / "index"
+MANIFEST_FILE = CACHE_DIR / "scrape_manifest.json"
+SNAPSHOT_DIR = DATA_DIR / "snapshots"  # one immutable directory per published data version
+SNAPSHOT_POINTER = DATA_DIR / "current.json"  # names the snapshot being served
+SNAPSHOTS_KEPT = 3  # most recent snapshots kept on disk
+CHUNK_SIZE = 100  # maximum whitespace-separated tokens per retrieval window
+CHUNK_OVERLAP = 20  # tokens of trailing sentences repeated in the next window
 TOP_K = 5
 
 # Timing configuration
 REFRESH_INTERVAL = 6 * 60 * 60  # 6 hours in seconds
+INDEX_REFRESH_INTERVAL = 30  # seconds between checks for a newly published snapshot
+REFRESH_CHECK_INTERVAL = 10 * 60  # seconds between checks whether a data refresh is due
 REQUEST_DELAY = 2  # seconds between requests
 PAGE_TIMEOUT = 15  # seconds timeout for page loading
 
 # Scraping configuration
 MAX_PAGES = 100
 MAX_RETRIES = 3
+MAX_CONCURRENT_REQUESTS = 4  # in-flight requests per host
+REQUESTS_PER_SECOND = 2.0  # token-bucket refill rate per host
+RETRY_BACKOFF = 1.0  # seconds; doubled after every failed attempt
+HTML_PARSER = "lxml"  # or "html.parser" for the pure-Python BeautifulSoup path
+EXTRACTION_WORKERS = None  # HTML extraction processes (None = one per CPU)
+PIPELINE_BUFFER = 16  # fetched pages waiting for extraction before the crawler pauses
 HEADLESS_MODE = True
 
 # NLP configuration
 MIN_SIMILARITY_THRESHOLD = 0.15
 MAX_VOCABULARY_SIZE = 10000
 SYNONYM_EXPANSION = True
+SYNONYM_WEIGHT = 0.5  # count of an expansion term relative to the term that triggered it
+QUERY_TOKEN_CACHE_SIZE = 1024  # memoized query tokenizations
+QUERY_CACHE_SIZE = 256  # cached answers (LRU)
+QUERY_CACHE_TTL = 3600  # seconds a cached answer stays valid
+SPARSE_MIN_DOCUMENTS = 1000  # use CSR document vectors at or above this corpus size
+HYBRID_COSINE_WEIGHT = 0.7  # hybrid score = cosine weight * TF-IDF cosine
+HYBRID_OVERLAP_WEIGHT = 0.3  #              + overlap weight * word-overlap (Jaccard)
+RANKING = "tfidf"  # search() ranking: "tfidf" (cosine), "bm25" or "bm25+"
+BM25_K1 = 1.2  # term frequency saturation
+BM25_B = 0.75  # document length normalization (0 = none, 1 = full)
+BM25_PLUS_DELTA = 1.0  # lower bound on a matching term's contribution in "bm25+"
+BATCH_QUERY_BLOCK = 256  # max queries scored per matrix product in search_batch()
+BATCH_SCORE_CELLS = 4_000_000  # max dense (queries x documents) scores held at once
+INDEX_PRECISION = "float64"  # posting weights scored as "float64", "float32" or "uint8" (quantized)
+RERANK_CANDIDATES = 200  # compact-score candidates re-ranked at full precision (float32/uint8)
+INDEX_MAX_REMOVED = 0.25  # refresh refits from scratch once this share of index ids are removed chunks
+
+# API configuration
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+API_WORKERS = 4  # threads running CPU-bound scoring
+API_KEEPALIVE_TIMEOUT = 15  # seconds an idle keep-alive connection stays open
 
 # UI configuration
 PAGE_TITLE = "Jupiter Assistant"
@@ -48,6 +83,13 @@ LAYOUT = "wide"
 DEBUG_MODE = os.getenv("JUPITER_SCRAPER_DEBUG", "false").lower() == "true"
 MAX_PAGES_ENV = int(os.getenv("JUPITER_SCRAPER_MAX_PAGES", str(MAX_PAGES)))
 TIMEOUT_ENV = int(os.getenv("JUPITER_SCRAPER_TIMEOUT", str(PAGE_TIMEOUT)))
+API_URL = os.getenv("JUPITER_API_URL")  # e.g. http://127.0.0.1:8765; Streamlit then queries the API
+
+# Run the scheduled scrape -> index refresh inside the app and API processes
+AUTO_REFRESH = os.getenv("JUPITER_AUTO_REFRESH", "false").lower() == "true"
+
+# Timing spans and counters (src/metrics.py); always on in debug mode
+METRICS_ENABLED = DEBUG_MODE or os.getenv("JUPITER_METRICS", "false").lower() == "true"
 
 # Override with environment variables if set
 MAX_PAGES = MAX_PAGES_ENV
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark HTML extraction: single-threaded html.parser vs lxml process pool
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data.snapshots import current_data_file
+from src.data.chunker import TextChunker, iter_pages
+from src.scraper.extractor import ExtractionPool, extract_text
+
+
+def load_html_corpus(html_dir: str) -> list:
+    """Read saved pages (scrape_jupiter.py --save-html DIR)"""
+    return [(path.name, path.read_text(encoding="utf-8")) for path in sorted(Path(html_dir).glob("*.html"))]
+
+
+def synthetic_html_corpus(n_pages: int) -> list:
+    """Wrap paragraphs of the scraped data file in realistic page markup"""
+    paragraphs = [text for _, text in iter_pages(current_data_file())] or ["Jupiter savings account with Pots."]
+    chrome = "<nav>" + "".join(f'<a href="/p{i}">Menu {i}</a>' for i in range(40)) + "</nav>"
+    pages = []
+    for i in range(n_pages):
+        body = "".join(f"<section><h2>Section {j}</h2><p>{paragraphs[(i + j) % len(paragraphs)]}</p></section>"
+                       for j in range(8))
+        html = (f"<html><head><title>Page {i}</title><style>body{{margin:0}}</style>"
+                f"<script>window.x = {i};</script></head><body><header>Jupiter</header>{chrome}"
+                f"<main>{body}</main><footer>© Jupiter</footer></body></html>")
+        pages.append((f"page{i}.html", html))
+    return pages
+
+
+def run(label: str, extract, n_pages: int) -> float:
+    """Time one extraction strategy (through chunking) and print throughput"""
+    start = time.perf_counter()
+    n_chunks = extract()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.3f}s  {n_pages / elapsed:8.1f} pages/s  {n_chunks} chunks")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--html-dir", help="directory of saved .html pages")
+    parser.add_argument("--pages", type=int, default=300, help="synthetic pages when no --html-dir")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes")
+    args = parser.parse_args()
+    
+    pages = load_html_corpus(args.html_dir) if args.html_dir else synthetic_html_corpus(args.pages)
+    total_mb = sum(len(html) for _, html in pages) / 1e6
+    print(f"📄 {len(pages)} pages, {total_mb:.1f} MB of HTML\n")
+    chunker = TextChunker()
+    
+    def serial(parser_name):
+        def extract():
+            texts = ((url, extract_text(html, parser_name)) for url, html in pages)
+            return sum(1 for _ in chunker.chunk_pages(texts))
+        return extract
+    
+    def pooled():
+        with ExtractionPool(max_workers=args.workers, parser="lxml") as pool:
+            # Chunks are produced while other pages are still being parsed
+            return sum(1 for _ in chunker.chunk_pages(pool.extract_pages(pages)))
+    
+    baseline = run("html.parser (single thread)", serial("html.parser"), len(pages))
+    lxml_serial = run("lxml (single thread)", serial("lxml"), len(pages))
+    lxml_pool = run("lxml (process pool)", pooled, len(pages))
+    
+    print(f"\n⚡ lxml speedup: {baseline / lxml_serial:.1f}x single-threaded, {baseline / lxml_pool:.1f}x pooled")
+
+
+if __name__ == "__main__":
+    main()
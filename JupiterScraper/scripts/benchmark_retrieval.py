@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Retrieval benchmark: fit time, index size, peak RSS and query latency percentiles
+on synthetic Jupiter-like corpora, written to a JSON file for run-to-run comparison.
+Compact index precisions also report the posting weight memory they save and
+their recall@K against float64 scoring.
+"""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import CACHE_DIR, RANKING, TOP_K
+from src.data.chunker import SENTENCE_BOUNDARY, iter_pages
+from src.data.snapshots import current_data_file
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_ENGINES = "search,search-float32,search-uint8,answer"
+DEFAULT_OUTPUT = CACHE_DIR / "benchmark_retrieval.json"
+
+# Questions users actually ask; the rest of the query set is sampled from the corpus
+SEED_QUERIES = [
+    "How does Jupiter help me track expenses?",
+    "What fees should I know about?",
+    "How do I open a savings account?",
+    "What are the transfer limits?",
+    "What are Jupiter's account features?",
+    "Is my money safe with Jupiter?",
+]
+
+FALLBACK_SENTENCES = [
+    "Jupiter is a digital banking app built for your everyday money needs.",
+    "Open a savings account in minutes with zero balance requirements.",
+    "Track your expenses automatically with smart categories and insights.",
+    "Invest in mutual funds with no commission on direct plans.",
+    "Your money is protected with bank-grade encryption and security.",
+    "Send money instantly over UPI with no transfer fees.",
+]
+
+
+def source_sentences() -> list:
+    """Sentences of the scraped data file (a built-in sample if it is missing)"""
+    sentences = []
+    for _, text in iter_pages(current_data_file()):
+        sentences.extend(s.strip() for s in SENTENCE_BOUNDARY.split(text) if len(s.split()) >= 4)
+    return sentences or FALLBACK_SENTENCES
+
+
+def synthetic_corpus(n_chunks: int, seed: int = 0) -> list:
+    """
+    Chunks of 3-6 scraped sentences, with a Zipf-distributed share of words
+    turned into new variants so the vocabulary keeps growing with corpus
+    size, as it would for a larger site
+    """
+    rng = np.random.default_rng(seed)
+    sentences = source_sentences()
+    picks = rng.integers(0, len(sentences), size=(n_chunks, 6))
+    lengths = rng.integers(3, 7, size=n_chunks)
+    variants = rng.zipf(1.3, size=n_chunks * 6)
+    
+    chunks = []
+    for i in range(n_chunks):
+        parts = []
+        for j in range(lengths[i]):
+            words = sentences[picks[i, j]].split()
+            variant = variants[i * 6 + j]
+            if variant > 1:
+                pos = variant % len(words)
+                words[pos] = f"{words[pos].strip('.,!?')}{variant % 5000}"
+            parts.append(" ".join(words))
+        chunks.append(" ".join(parts))
+    return chunks
+
+
+def query_set(corpus: list, n_queries: int, seed: int = 1) -> list:
+    """Seed questions plus 2-6 word queries sampled from the corpus"""
+    rng = np.random.default_rng(seed)
+    queries = list(SEED_QUERIES)
+    while len(queries) < n_queries:
+        words = corpus[rng.integers(len(corpus))].split()
+        n_words = int(rng.integers(2, 7))
+        start = int(rng.integers(0, max(len(words) - n_words, 1)))
+        queries.append(" ".join(words[start:start + n_words]))
+    return queries[:n_queries]
+
+
+def latency_stats(fn, queries: list, warmup: int = 5) -> dict:
+    """p50/p95/p99/mean latency of fn(query) in milliseconds"""
+    for query in queries[:warmup]:
+        fn(query)
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "mean_ms": float(np.mean(timings)),
+            "queries": len(timings)}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def search_index_bytes(search) -> int:
+    """Bytes of the arrays that make up a fitted EnhancedSimilaritySearch"""
+    index = search.index
+    return (search.tf_matrix.nbytes + search.doc_matrix.data.nbytes + search.presence_matrix.nbytes
+            + index.term_ptr.nbytes + index.doc_ids.nbytes + index.weight_nbytes() + index.max_weights.nbytes
+            + search.doc_lengths.nbytes)
+
+
+def recall_at_k(model, reference, queries: list, k: int = TOP_K) -> float:
+    """Mean share of the reference index's top-k ids that the model's index also returns"""
+    bm25 = model.bm25 is not None
+    recalls = []
+    for query in queries:
+        if bm25:
+            term_ids, weights = model.vectorizer.query_counts(query)
+        else:
+            term_ids, weights = model.vectorizer.query_weights(query)
+        expected = set(reference.search(term_ids, weights, k, normalize=not bm25)[0].tolist())
+        if expected:
+            found = set(model.index.search(term_ids, weights, k, normalize=not bm25)[0].tolist())
+            recalls.append(len(expected & found) / len(expected))
+    return float(np.mean(recalls)) if recalls else 1.0
+
+
+def bench_engine(engine: str, n_chunks: int, n_queries: int, seed: int) -> dict:
+    """
+    Benchmark one engine on one corpus size (run in a fresh process so peak RSS is its own)
+    
+    Args:
+        engine: "search" (EnhancedSimilaritySearch.search), "search-float32" / "search-uint8"
+            (compact posting weights plus a full-precision re-rank) or "answer" (uncached
+            RetrievalEngine.ask, the path behind the Streamlit app and the API)
+        n_chunks: Synthetic corpus size
+        n_queries: Queries timed
+        seed: Corpus seed
+    
+    Returns:
+        Result record
+    """
+    corpus = synthetic_corpus(n_chunks, seed)
+    queries = query_set(corpus, n_queries, seed + 1)
+    baseline_rss = peak_rss_mb()
+    extra = {}
+    
+    if engine.startswith("search"):
+        from src.nlp.similarity import EnhancedSimilaritySearch
+        precision = engine.partition("-")[2] or "float64"
+        model = EnhancedSimilaritySearch(precision=precision)
+        start = time.perf_counter()
+        model.fit(corpus)
+        fit_s = time.perf_counter() - start
+        index_bytes = search_index_bytes(model)
+        query = lambda q: model.search(q, TOP_K)
+        vocabulary = model.vectorizer.get_vocabulary_size()
+        
+        # Posting weights held (and scanned), against the float64 weights they replace
+        full_bytes = len(model.index.doc_ids) * np.dtype(np.float64).itemsize
+        extra = {
+            "precision": precision,
+            "weights_mb": model.index.weight_nbytes() / 1e6,
+            "weights_saved_mb": (full_bytes - model.index.weight_nbytes()) / 1e6,
+        }
+    else:
+        from src.engine import RetrievalEngine
+        from src.nlp.query_cache import QueryCache
+        model = RetrievalEngine(cache=QueryCache(max_entries=0))
+        start = time.perf_counter()
+        model.fit(corpus)
+        fit_s = time.perf_counter() - start
+        index_bytes = search_index_bytes(model.searcher)
+        query = model.ask
+        vocabulary = model.searcher.vectorizer.get_vocabulary_size()
+    
+    result = {
+        "engine": engine,
+        "chunks": n_chunks,
+        "vocabulary": vocabulary,
+        "fit_s": fit_s,
+        "index_mb": index_bytes / 1e6,
+        "latency": latency_stats(query, queries),
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline_rss,
+        **extra,
+    }
+    if extra:
+        # Compact indexes keep no float64 postings: fit a reference after RSS was taken
+        reference = EnhancedSimilaritySearch(ranking=model.ranking)
+        reference.fit(corpus)
+        result["recall_at_k"] = recall_at_k(model, reference.index, queries)
+    return result
+
+
+def run_isolated(engine: str, n_chunks: int, n_queries: int, seed: int) -> dict:
+    """Run bench_engine in a spawned process"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(bench_engine, (engine, n_chunks, n_queries, seed))
+
+
+def compare(results: list, baseline_file: str) -> None:
+    """Print relative changes against a previous results file"""
+    with open(baseline_file, 'r') as file:
+        previous = {(r["engine"], r["chunks"]): r for r in json.load(file)["results"]}
+    
+    print("\n📈 Change vs baseline (negative is better):")
+    for result in results:
+        old = previous.get((result["engine"], result["chunks"]))
+        if not old:
+            continue
+        changes = {
+            "fit": (result["fit_s"], old["fit_s"]),
+            "p95": (result["latency"]["p95_ms"], old["latency"]["p95_ms"]),
+            "rss": (result["peak_rss_mb"], old["peak_rss_mb"]),
+            "index": (result["index_mb"], old["index_mb"]),
+        }
+        summary = "  ".join(f"{name} {(new / base - 1) * 100:+6.1f}%" for name, (new, base) in changes.items() if base)
+        print(f"  {result['engine']:<14} {result['chunks']:>7}  {summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=DEFAULT_SIZES,
+                        help="comma-separated corpus sizes in chunks")
+    parser.add_argument("--engines", default=DEFAULT_ENGINES,
+                        help="comma-separated: search, search-float32, search-uint8, answer")
+    parser.add_argument("--queries", type=int, default=300, help="queries timed per run")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="JSON results file")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    args = parser.parse_args()
+    
+    results = []
+    print(f"{'engine':<14} {'chunks':>7} {'fit s':>8} {'index MB':>9} {'RSS MB':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'wts MB':>8} {'saved MB':>9} {'recall':>7}")
+    for n_chunks in args.sizes:
+        for engine in args.engines.split(","):
+            result = run_isolated(engine, n_chunks, args.queries, args.seed)
+            results.append(result)
+            latency = result["latency"]
+            compact = (f" {result['weights_mb']:8.2f} {result['weights_saved_mb']:9.2f} {result['recall_at_k']:7.3f}"
+                       if "precision" in result else "")
+            print(f"{engine:<14} {n_chunks:>7} {result['fit_s']:8.2f} {result['index_mb']:9.1f} "
+                  f"{result['peak_rss_mb']:8.0f} {latency['p50_ms']:8.3f} {latency['p95_ms']:8.3f} "
+                  f"{latency['p99_ms']:8.3f}{compact}")
+    
+    report = {
+        "benchmark": "retrieval",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "ranking": RANKING,
+        "top_k": TOP_K,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\n💾 Results written to {output}")
+    
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
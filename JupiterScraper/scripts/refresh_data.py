@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Scheduled data refresh: scrape, extract, chunk and index when the data is due
+
+Run once from cron (exits immediately if the data is fresh enough), or with
+--watch as a long-lived worker checking every REFRESH_CHECK_INTERVAL seconds.
+Running servers pick the published snapshot up without a restart.
+"""
+
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import MAX_PAGES, REFRESH_CHECK_INTERVAL, REFRESH_INTERVAL
+from src.refresh import RefreshPipeline, RefreshWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="refresh even if the data is not due yet")
+    parser.add_argument("--watch", action="store_true", help="keep running and refresh whenever due")
+    parser.add_argument("--interval", type=float, default=REFRESH_CHECK_INTERVAL,
+                        help="seconds between checks with --watch")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES, help="maximum pages to crawl")
+    args = parser.parse_args()
+    
+    worker = RefreshWorker(RefreshPipeline(max_pages=args.max_pages, verbose=False), interval=args.interval)
+    if args.watch:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        print(f"🔁 Refreshing when the data is older than {REFRESH_INTERVAL}s "
+              f"(checking every {args.interval:.0f}s)")
+        worker.start()
+        try:
+            worker.join()
+        except KeyboardInterrupt:
+            worker.stop()
+            print("👋 Stopped")
+        return
+    
+    result = worker.run_once(force=args.force)
+    if result is None:
+        print("✅ Data is up to date (use --force to refresh anyway)")
+        return
+    if not result.pages:
+        print("❌ No data was scraped; the current snapshot stays in service")
+        sys.exit(1)
+    
+    summary = result.summary
+    published = f"published {result.snapshot.version}" if result.snapshot else "no changes"
+    print(f"✅ {result.pages} pages ({len(summary['changed'])} changed, {len(summary['removed'])} removed), "
+          f"{published}")
+    print("⏱️  " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in result.stages.items()))
+
+
+if __name__ == "__main__":
+    main()
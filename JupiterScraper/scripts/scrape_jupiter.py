@@ -3,82 +3,69 @@
 Simple Jupiter.money Scraper
 """
 
-import os
 import sys
+import argparse
 from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-import requests
-from bs4 import BeautifulSoup
-import time
-from config.settings import BASE_URL, USER_AGENT, MAX_PAGES, REQUEST_DELAY
+from config.settings import MAX_PAGES
+from src.refresh import RefreshPipeline, RefreshResult
 
 
-def scrape_jupiter():
-    """Scrape Jupiter.money website"""
-    print("🚀 Starting Jupiter.money scraper...")
-    
-    # Create data directory
-    data_dir = Path("JupiterScraper/data")
-    data_dir.mkdir(parents=True, exist_ok=True)
-    
-    data_file = data_dir / "scraped_texts.txt"
-    
-    # URLs to scrape
-    urls = [
-        BASE_URL,
-        f"{BASE_URL}/about-us",
-        f"{BASE_URL}/services",
-        f"{BASE_URL}/features",
-        f"{BASE_URL}/pricing"
-    ]
-    
-    all_texts = []
+def print_result(result: RefreshResult) -> None:
+    """Print the summary of a pipeline run"""
+    summary = result.summary
+    if not result.pages:
+        print("❌ No data was scraped")
+        return
     
-    for i, url in enumerate(urls):
-        print(f"📄 Scraping {i+1}/{len(urls)}: {url}")
-        
-        try:
-            headers = {"User-Agent": USER_AGENT}
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Remove unwanted elements
-            for unwanted in soup(["script", "style", "nav", "footer", "header"]):
-                unwanted.extract()
-            
-            # Extract text content
-            text = soup.get_text(separator=" ", strip=True)
-            
-            if text and len(text) > 100:
-                all_texts.append(text)
-                print(f"✅ Extracted {len(text)} characters")
-            else:
-                print(f"⚠️  Insufficient content from {url}")
-            
-            # Delay between requests
-            time.sleep(REQUEST_DELAY)
-            
-        except Exception as e:
-            print(f"❌ Failed to scrape {url}: {e}")
+    if result.snapshot is not None:
+        print(f"📸 Published data snapshot {result.snapshot.version}")
+    print(f"\n🎉 Scraping completed!")
+    print(f"📊 Total pages: {result.pages} "
+          f"({len(summary['changed'])} changed, {len(summary['unchanged'])} unchanged, "
+          f"{len(summary['removed'])} removed)")
+    if result.failed:
+        print(f"⚠️  Failed pages: {len(result.failed)}")
+    print("⏱️  " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in result.stages.items()))
+
+
+def scrape_jupiter(max_pages: int = MAX_PAGES, follow_links: bool = True, incremental: bool = True,
+                   html_dir: Path = None) -> dict:
+    """
+    Scrape Jupiter.money website and publish a new data snapshot if anything changed
     
-    # Save scraped data
-    if all_texts:
-        with open(data_file, "w", encoding="utf-8") as file:
-            file.write("\n\n".join(all_texts))
+    Args:
+        max_pages: Maximum pages to crawl
+        follow_links: Discover links beyond the seed URLs
+        incremental: Send conditional requests and skip unchanged pages
+        html_dir: Save the raw HTML of fetched pages here (benchmark corpus)
         
-        print(f"\n🎉 Scraping completed!")
+    Returns:
+        Dict with the "changed", "unchanged" and "removed" page URLs
+    """
+    print("🚀 Starting Jupiter.money scraper...")
+    pipeline = RefreshPipeline(max_pages=max_pages, follow_links=follow_links, incremental=incremental,
+                               html_dir=html_dir)
+    result = pipeline.run()
+    print_result(result)
+    if result.pages:
+        data_file = pipeline.manager.data_file
         print(f"📁 Data saved to: {data_file}")
-        print(f"📊 Total chunks: {len(all_texts)}")
         print(f"💾 File size: {data_file.stat().st_size / 1024:.1f} KB")
-    else:
-        print("❌ No data was scraped")
+    return result.summary
 
 
 if __name__ == "__main__":
-    scrape_jupiter() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape Jupiter.money")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES, help="maximum pages to crawl")
+    parser.add_argument("--no-follow", action="store_true", help="only fetch the seed URLs")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-extract every page")
+    parser.add_argument("--save-html", metavar="DIR", help="also save raw HTML (for benchmark_extraction.py)")
+    args = parser.parse_args()
+    
+    scrape_jupiter(max_pages=args.max_pages, follow_links=not args.no_follow, incremental=not args.full,
+                   html_dir=args.save_html)
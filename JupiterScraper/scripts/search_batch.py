@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Bulk search / answering: JSONL queries in, JSONL results out
+"""
+
+import sys
+import argparse
+import json
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, TextIO
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import TOP_K
+from src.engine import RetrievalEngine
+
+
+def read_queries(lines: Iterator[str]) -> Iterator[dict]:
+    """
+    Parse JSONL query records
+    
+    Each line is either a JSON string or an object with a "query" (or "q")
+    field and an optional "id"; other fields are passed through.
+    """
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            record = {"query": record}
+        query = record.get("query", record.get("q"))
+        if not isinstance(query, str):
+            raise ValueError(f"Line {line_no}: expected a \"query\" string")
+        record.setdefault("id", line_no)
+        record["query"] = query
+        yield record
+
+
+def run_batch(engine: RetrievalEngine, records: Iterator[dict], output: TextIO, k: int = TOP_K,
+              answers: bool = False, batch_size: int = 1024) -> int:
+    """
+    Score queries in batches and stream one JSON line per query
+    
+    Args:
+        engine: Loaded retrieval engine
+        records: Parsed query records
+        output: Text stream for the JSONL results
+        k: Results per query
+        answers: Also render an answer per query
+        batch_size: Records read and scored together
+    
+    Returns:
+        Number of queries written
+    """
+    written = 0
+    while True:
+        batch: List[dict] = list(islice(records, batch_size))
+        if not batch:
+            return written
+        
+        results = engine.search_batch([record["query"] for record in batch], k)
+        for record, hits in zip(batch, results):
+            record["results"] = [{"id": i, "score": score} for i, score, _ in hits]
+            if answers:
+                record["answer"] = engine.generate_answer(record["query"], hits)
+            output.write(json.dumps(record) + "\n")
+        output.flush()
+        written += len(batch)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run JSONL queries through the search engine")
+    parser.add_argument("input", help="JSONL file of queries ('-' for stdin)")
+    parser.add_argument("output", help="JSONL file for results ('-' for stdout)")
+    parser.add_argument("--k", type=int, default=TOP_K, help="results per query")
+    parser.add_argument("--answers", action="store_true", help="also render an answer per query")
+    parser.add_argument("--batch-size", type=int, default=1024, help="queries read and scored together")
+    args = parser.parse_args()
+    
+    engine = RetrievalEngine()
+    if not engine.load():
+        print("❌ No data found. Run scripts/scrape_jupiter.py first.", file=sys.stderr)
+        sys.exit(1)
+    
+    source = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    sink = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    try:
+        count = run_batch(engine, read_queries(source), sink, k=args.k, answers=args.answers,
+                          batch_size=args.batch_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ {count} queries in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} queries/s)", file=sys.stderr)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Serve the Jupiter.money RAG Bot as an HTTP/JSON API
+"""
+
+import sys
+import argparse
+import asyncio
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import API_HOST, API_PORT, API_WORKERS, AUTO_REFRESH
+from src.api.server import QueryServer
+from src.engine import RetrievalEngine
+from src.refresh import RefreshWorker
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    """Load the index once and serve /ask, /search, /health and /metrics"""
+    engine = RetrievalEngine()
+    print("📚 Loading search index...")
+    if not engine.load():
+        print("❌ No data found. Run scripts/scrape_jupiter.py first.")
+        sys.exit(1)
+    
+    # Newly published data snapshots are indexed and swapped in without a restart
+    engine.start_refresher()
+    if AUTO_REFRESH:
+        # Scrape and re-index in the background whenever the data is due
+        RefreshWorker(engine=engine).start()
+    server = QueryServer(engine, host=host, port=port, workers=workers)
+    
+    async def run():
+        await server.start()
+        print(f"🚀 Serving {len(engine.documents)} chunks on http://{server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("👋 Stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Jupiter Assistant query API")
+    parser.add_argument("--host", default=API_HOST, help="interface to bind")
+    parser.add_argument("--port", type=int, default=API_PORT, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="scoring threads")
+    args = parser.parse_args()
+    
+    serve(args.host, args.port, args.workers)
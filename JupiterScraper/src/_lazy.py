@@ -0,0 +1,29 @@
+"""
+Lazy package exports for Jupiter.money RAG Bot
+"""
+
+import sys
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], object], List[str]]:
+    """
+    Module ``__getattr__`` and ``__all__`` importing each export on first access
+    
+    Args:
+        package: ``__name__`` of the package
+        exports: Exported name -> relative module defining it
+    
+    Returns:
+        (``__getattr__``, ``__all__``) for the package
+    """
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(exports[name], package), name)
+        # Cache on the package so later lookups skip __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+    
+    return __getattr__, list(exports)
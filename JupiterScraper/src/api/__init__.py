@@ -0,0 +1,7 @@
+"""
+HTTP query API for Jupiter.money RAG Bot
+"""
+
+from .server import QueryServer
+
+__all__ = ["QueryServer"]
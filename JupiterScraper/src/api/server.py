@@ -0,0 +1,248 @@
+"""
+Headless HTTP/JSON query API for Jupiter.money RAG Bot
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+from config.settings import API_HOST, API_PORT, API_WORKERS, API_KEEPALIVE_TIMEOUT, TOP_K
+from src.engine import RetrievalEngine
+from src.metrics import METRICS
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+MAX_K = 100
+
+
+class HTTPError(Exception):
+    """Request failure reported to the client as a JSON error"""
+    
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class QueryServer:
+    """
+    asyncio HTTP/1.1 server exposing a RetrievalEngine as JSON
+    
+    Endpoints (GET with query string, or POST with a JSON body):
+        /search  {"q": ..., "k": 5}  -> ranked chunk ids, scores and texts
+        /ask     {"q": ...}          -> rendered answer plus its chunks (cached)
+        /health                      -> document count and index version
+        /metrics [?format=prometheus] -> timing spans and counters
+    
+    The engine is loaded once and shared. Scoring and answer generation are
+    CPU-bound, so they run in a thread pool while the event loop keeps
+    serving other connections. Connections are kept alive between requests
+    unless the client asks to close them.
+    """
+    
+    def __init__(self, engine: RetrievalEngine, host: str = API_HOST, port: int = API_PORT,
+                 workers: int = API_WORKERS, keepalive_timeout: float = API_KEEPALIVE_TIMEOUT):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self) -> None:
+        """Start listening (port 0 picks a free port, stored back in ``self.port``)"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def serve_forever(self) -> None:
+        """Start if needed and serve until cancelled"""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+    
+    async def close(self) -> None:
+        """Stop accepting connections and shut the worker threads down"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+    
+    def search_query(self, query: str, k: int = TOP_K) -> dict:
+        """
+        Rank chunks for a query (runs in a worker thread)
+        
+        Args:
+            query: User question
+            k: Number of results
+        
+        Returns:
+            JSON-ready dict with results and the scoring time
+        """
+        start = time.perf_counter()
+        results = self.engine.search(query, k)
+        elapsed = time.perf_counter() - start
+        
+        return {
+            "query": query,
+            "results": [{"id": i, "score": score, "text": text} for i, score, text in results],
+            "timings_ms": {"search": elapsed * 1000},
+        }
+    
+    def ask_query(self, query: str) -> dict:
+        """
+        Answer a question through the query cache (runs in a worker thread)
+        
+        Args:
+            query: User question
+        
+        Returns:
+            JSON-ready dict with the answer, its chunks and timings
+        """
+        timings = {}
+        result, chunks = self.engine.ask_with_chunks(query, timings)
+        
+        return {
+            "query": query,
+            "answer": result.answer,
+            "chunk_ids": list(result.chunk_ids),
+            "scores": list(result.scores),
+            "chunks": chunks,
+            "cached": "search" not in timings,
+            "timings_ms": timings,
+        }
+    
+    def health(self) -> dict:
+        """Serving status"""
+        # Removed chunks leave None behind; a mapped ChunkStore counts without decoding
+        documents = self.engine.documents
+        return {
+            "status": "ok",
+            "documents": len(documents) - documents.count(None),
+            "index_version": str(self.engine.version),
+            "cache": self.engine.cache.stats(),
+        }
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one connection until it closes or idles out"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+                
+                start = time.perf_counter()
+                keep_alive = body_read = False
+                try:
+                    method, target, headers, keep_alive = self._parse_head(head)
+                    body = await self._read_body(reader, headers)
+                    body_read = True
+                    status, payload = await self._dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    METRICS.increment("api_errors")
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                
+                # Without a fully read body the stream position is unknown
+                keep_alive = keep_alive and body_read
+                
+                if isinstance(payload, dict) and isinstance(payload.get("timings_ms"), dict):
+                    payload["timings_ms"]["total"] = (time.perf_counter() - start) * 1000
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str], bool]:
+        """Request line, lowercased headers and whether to keep the connection open"""
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method.upper(), target, headers, keep_alive
+    
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        """Read a Content-Length delimited body"""
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        return await reader.readexactly(length) if length else b""
+    
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, Union[dict, str]]:
+        """Route a request to its handler"""
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if method == "POST" and body:
+            try:
+                params.update(json.loads(body))
+            except (ValueError, TypeError):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        elif method not in ("GET", "POST"):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"Method {method} not allowed")
+        
+        if url.path == "/health":
+            return HTTPStatus.OK, self.health()
+        if url.path == "/metrics":
+            if params.get("format") == "prometheus":
+                return HTTPStatus.OK, METRICS.to_prometheus()
+            return HTTPStatus.OK, METRICS.snapshot()
+        if url.path not in ("/search", "/ask"):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown endpoint {url.path}")
+        
+        query = str(params.get("q") or params.get("query") or "").strip()
+        if not query:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing query parameter 'q'")
+        
+        loop = asyncio.get_running_loop()
+        if url.path == "/ask":
+            return HTTPStatus.OK, await loop.run_in_executor(self.executor, self.ask_query, query)
+        
+        try:
+            k = min(max(int(params.get("k", TOP_K)), 1), MAX_K)
+        except (TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Parameter 'k' must be an integer")
+        return HTTPStatus.OK, await loop.run_in_executor(self.executor, self.search_query, query, k)
+    
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Union[dict, str],
+                        keep_alive: bool) -> None:
+        """Write a JSON response (plain text for string payloads)"""
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), "application/json"
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
@@ -1,7 +1,17 @@
 """
 Data management modules for Jupiter.money RAG Bot
+
+Classes are imported on first access (IndexStore and ChunkStore need NumPy).
 """
 
-from .manager import DataManager
+from src._lazy import lazy_exports
 
-__all__ = ["DataManager"] 
\ No newline at end of file
+__getattr__, __all__ = lazy_exports(__name__, {
+    "DataManager": ".manager",
+    "Chunk": ".chunker",
+    "TextChunker": ".chunker",
+    "IndexStore": ".index_store",
+    "ChunkStore": ".chunk_store",
+    "Snapshot": ".snapshots",
+    "SnapshotStore": ".snapshots",
+})
@@ -0,0 +1,129 @@
+"""
+Memory-mapped chunk text store for Jupiter.money RAG Bot
+"""
+
+import json
+import mmap
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+import numpy as np
+from .chunker import Chunk
+
+
+class ChunkStore(Sequence):
+    """
+    Read-only chunk texts kept in one memory-mapped UTF-8 blob
+    
+    Layout (inside an index directory):
+        chunks.bin          UTF-8 text of every chunk, back to back
+        chunk_offsets.npy   int64 byte offsets; chunk i is blob[offsets[i]:offsets[i + 1]]
+        chunk_pages.npy     int32 page id of every chunk (-1 if unknown, -2 if removed)
+        sources.json        source URL of every page id
+    
+    Indexing decodes one chunk at a time, so a process only pays for the
+    chunks it actually shows; the blob and the offsets are shared through
+    the page cache by every worker mapping the same files. Ids of removed
+    chunks (None, see ``EnhancedSimilaritySearch.remove_documents``) are
+    kept, so an incrementally updated index round-trips unchanged.
+    """
+    
+    REMOVED = -2
+    BLOB = "chunks.bin"
+    OFFSETS = "chunk_offsets.npy"
+    PAGES = "chunk_pages.npy"
+    SOURCES = "sources.json"
+    
+    def __init__(self, directory: Path):
+        """
+        Args:
+            directory: Directory written by ``ChunkStore.write``
+        
+        Raises:
+            OSError, ValueError: If the files are missing or inconsistent
+        """
+        directory = Path(directory)
+        self.offsets = np.load(directory / self.OFFSETS, mmap_mode='r')
+        self.pages = np.load(directory / self.PAGES, mmap_mode='r')
+        with open(directory / self.SOURCES, 'r', encoding='utf-8') as file:
+            self.sources = json.load(file)
+        
+        with open(directory / self.BLOB, 'rb') as file:
+            size = file.seek(0, 2)
+            # mmap rejects empty files
+            self._blob = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if len(self.offsets) != len(self.pages) + 1 or int(self.offsets[-1]) != size:
+            raise ValueError(f"Chunk store in {directory} is inconsistent")
+    
+    @classmethod
+    def write(cls, directory: Path, chunks: Iterable[Union[Chunk, str]]) -> int:
+        """
+        Write chunks in store format
+        
+        Args:
+            directory: Target directory (created if needed)
+            chunks: Chunks in id order; plain strings are stored without a source
+                and None marks a removed chunk
+        
+        Returns:
+            Number of chunks written
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        offsets = [0]
+        pages = []
+        sources: List[Optional[str]] = []
+        page_ids = {}
+        
+        with open(directory / cls.BLOB, 'wb') as blob:
+            for chunk in chunks:
+                if chunk is None:
+                    pages.append(cls.REMOVED)
+                    text = ""
+                elif isinstance(chunk, Chunk):
+                    # Pages are told apart by URL; only pages without one need their id
+                    key = chunk.source_url if chunk.source_url is not None else chunk.page_id
+                    if key not in page_ids:
+                        page_ids[key] = len(sources)
+                        sources.append(chunk.source_url)
+                    pages.append(page_ids[key])
+                    text = chunk.text
+                else:
+                    pages.append(-1)
+                    text = chunk
+                offsets.append(offsets[-1] + blob.write(text.encode('utf-8')))
+        
+        np.save(directory / cls.OFFSETS, np.array(offsets, dtype=np.int64))
+        np.save(directory / cls.PAGES, np.array(pages, dtype=np.int32))
+        with open(directory / cls.SOURCES, 'w', encoding='utf-8') as file:
+            json.dump(sources, file)
+        return len(pages)
+    
+    def __len__(self) -> int:
+        return len(self.pages)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk id out of range")
+        if self.pages[i] == self.REMOVED:
+            return None
+        return self._blob[int(self.offsets[i]):int(self.offsets[i + 1])].decode('utf-8')
+    
+    def count(self, value) -> int:
+        """Occurrences of a text (removed chunks, None, are counted without decoding)"""
+        if value is None:
+            return int(np.count_nonzero(self.pages == self.REMOVED))
+        return super().count(value)
+    
+    def page_id(self, i: int) -> int:
+        """Page the chunk was cut from (-1 if unknown, -2 if removed)"""
+        return int(self.pages[i])
+    
+    def source(self, i: int) -> Optional[str]:
+        """Source URL of the chunk, if known"""
+        page = self.page_id(i)
+        return self.sources[page] if page >= 0 else None
@@ -0,0 +1,159 @@
+"""
+Streaming text chunker for Jupiter.money RAG Bot
+"""
+
+import re
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from config.settings import CHUNK_SIZE, CHUNK_OVERLAP
+
+# Pages in the data file may start with a "Source: <url>" line
+SOURCE_PREFIX = "Source: "
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+TOKEN = re.compile(r'\S+')
+
+
+class Chunk(NamedTuple):
+    """A retrieval window and where it came from"""
+    text: str
+    source_url: Optional[str]
+    page_id: int
+    start: int  # character offset of the window inside its page
+    end: int
+
+
+def iter_pages(path) -> Iterator[Tuple[Optional[str], str]]:
+    """
+    Stream (source URL, page text) pairs from a data file
+    
+    Pages are separated by blank lines and read one at a time, so the whole
+    file is never held in memory.
+    
+    Args:
+        path: Path to the scraped data file
+        
+    Yields:
+        Tuple of (source URL or None, page text)
+    """
+    lines = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.rstrip('\n')
+            if line.strip():
+                lines.append(line)
+                continue
+            if lines:
+                yield _split_source(lines)
+                lines = []
+    if lines:
+        yield _split_source(lines)
+
+
+def _split_source(lines: List[str]) -> Tuple[Optional[str], str]:
+    """Separate an optional source line from the page body"""
+    if lines[0].startswith(SOURCE_PREFIX):
+        return lines[0][len(SOURCE_PREFIX):].strip(), "\n".join(lines[1:]).strip()
+    return None, "\n".join(lines).strip()
+
+
+class TextChunker:
+    """
+    Splits pages into sentence-aware, overlapping windows
+    
+    Budgets count whitespace-separated tokens. Windows are built from whole
+    sentences up to ``chunk_size`` tokens, and longer sentences are cut on
+    token boundaries. Each new window repeats trailing sentences of the
+    previous one, up to ``overlap`` tokens, so answers spanning a boundary
+    are still retrievable.
+    """
+    
+    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.chunk_size = chunk_size
+        self.overlap = max(0, min(overlap, chunk_size // 2))
+    
+    def chunk_file(self, path) -> Iterator[Chunk]:
+        """
+        Stream chunks for every page in a data file
+        
+        Args:
+            path: Path to the scraped data file
+            
+        Yields:
+            Chunk windows in file order
+        """
+        for page_id, (source_url, text) in enumerate(iter_pages(path)):
+            yield from self.chunk_page(text, source_url, page_id)
+    
+    def chunk_pages(self, pages: Iterable[Tuple[Optional[str], str]]) -> Iterator[Chunk]:
+        """Stream chunks for (source URL, text) pages"""
+        for page_id, (source_url, text) in enumerate(pages):
+            yield from self.chunk_page(text, source_url, page_id)
+    
+    def chunk_page(self, text: str, source_url: Optional[str] = None, page_id: int = 0) -> Iterator[Chunk]:
+        """
+        Split one page into overlapping windows
+        
+        Args:
+            text: Page text
+            source_url: URL the page was scraped from
+            page_id: Position of the page in its file
+            
+        Yields:
+            Chunk windows whose text is ``text[start:end]``
+        """
+        # Token start offsets, so the tokens of any span are counted by bisection
+        starts = [token.start() for token in TOKEN.finditer(text)]
+        window: List[Tuple[int, int]] = []
+        for span in self._spans(text, starts):
+            if window and _count(starts, window[0][0], span[1]) > self.chunk_size:
+                yield self._make_chunk(text, window, source_url, page_id)
+                window = self._overlap_tail(window, starts)
+                if window and _count(starts, window[0][0], span[1]) > self.chunk_size:
+                    window = []
+            window.append(span)
+        
+        if window:
+            yield self._make_chunk(text, window, source_url, page_id)
+    
+    def _spans(self, text: str, starts: List[int]) -> Iterator[Tuple[int, int]]:
+        """Sentence spans, with over-long sentences cut on token boundaries"""
+        start = 0
+        for boundary in SENTENCE_BOUNDARY.finditer(text):
+            yield from self._fit_span(text, starts, start, boundary.start())
+            start = boundary.end()
+        yield from self._fit_span(text, starts, start, len(text))
+    
+    def _fit_span(self, text: str, starts: List[int], start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Yield the span, split into pieces of at most chunk_size tokens"""
+        if end <= start:
+            return
+        if _count(starts, start, end) <= self.chunk_size:
+            yield start, end
+            return
+        
+        tokens = list(TOKEN.finditer(text, start, end))
+        for first in range(0, len(tokens), self.chunk_size):
+            piece = tokens[first:first + self.chunk_size]
+            yield piece[0].start(), piece[-1].end()
+    
+    def _overlap_tail(self, window: List[Tuple[int, int]], starts: List[int]) -> List[Tuple[int, int]]:
+        """Trailing spans of a window that fit in the overlap budget"""
+        tail = []
+        for span in reversed(window[1:]):
+            if _count(starts, span[0], window[-1][1]) > self.overlap:
+                break
+            tail.insert(0, span)
+        return tail
+    
+    @staticmethod
+    def _make_chunk(text: str, window: List[Tuple[int, int]], source_url: Optional[str], page_id: int) -> Chunk:
+        start, end = window[0][0], window[-1][1]
+        return Chunk(text[start:end], source_url, page_id, start, end)
+
+
+def _count(starts: List[int], start: int, end: int) -> int:
+    """Number of tokens starting inside text[start:end]"""
+    return bisect_left(starts, end) - bisect_left(starts, start)
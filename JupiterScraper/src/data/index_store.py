@@ -0,0 +1,373 @@
+"""
+Persisted, memory-mapped search index for Jupiter.money RAG Bot
+"""
+
+import os
+import json
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+import numpy as np
+from config.settings import DATA_FILE, INDEX_BUILDS_KEPT, INDEX_DIR, INDEX_PRECISION, RANKING
+from src.nlp.similarity import EnhancedSimilaritySearch
+from src.nlp.bm25 import ranking_params
+from src.nlp.sparse import CSRMatrix
+from src.nlp.index import InvertedIndex
+from .chunk_store import ChunkStore
+from .chunker import Chunk
+from .manager import file_hash
+from .snapshots import atomic_write_text
+
+
+class IndexStore:
+    """
+    Saves a fitted EnhancedSimilaritySearch under CACHE_DIR and maps it back in
+    
+    Layout of the index directory:
+        current.json       pointer to the build being served
+        b<sequence>/       one directory per build, e.g. b000007, never modified after saving
+    
+    Layout of a build directory:
+        meta.json          format version, data file hash, ranking parameters, sizes
+        vocabulary.json    terms ordered by vocabulary id
+        doc_freq.json      document frequency of every term (for incremental updates)
+        tokens.json        every indexed token, ordered by token-presence id
+        *.npy              idf, CSR TF and TF-IDF matrices, posting lists (float64 weights,
+                           or compact weights and scales for float32/uint8, which re-rank
+                           from the CSR matrices), document lengths, token-presence matrix
+        chunks.bin, ...    chunk texts and sources (ChunkStore)
+    
+    Arrays load with ``np.load(mmap_mode='r')`` and chunk texts are decoded
+    from the mapped blob only when shown, so worker processes on the same
+    host share the pages. Every save writes a fresh build directory and
+    then replaces the pointer with ``os.replace``, so files another process
+    still has mapped are never truncated; ``prune`` deletes old builds once
+    the engine has closed every index using them. ``meta.json`` carries the content hash of the data file, so
+    a stale index is never loaded.
+    """
+    
+    FORMAT_VERSION = 7
+    ARRAYS = [
+        "idf", "doc_indptr", "doc_indices", "doc_data", "doc_tf",
+        "term_ptr", "post_docs", "max_weights", "doc_lengths",
+        "presence_indptr", "presence_indices"
+    ]
+    
+    def __init__(self, index_dir: Path = INDEX_DIR, data_file: Path = DATA_FILE, ranking: str = RANKING,
+                 precision: str = INDEX_PRECISION, keep: int = INDEX_BUILDS_KEPT):
+        """
+        Args:
+            index_dir: Directory holding the builds and the pointer
+            data_file: Scraped text file the index is built from
+            ranking: "tfidf", "bm25" or "bm25+"
+            precision: Posting weight precision ("float64", "float32" or "uint8")
+            keep: Number of most recent builds kept by ``prune``
+        """
+        self.index_dir = Path(index_dir)
+        self.data_file = Path(data_file)
+        self.ranking = ranking
+        self.precision = precision
+        self.keep = keep
+        self.pointer = self.index_dir / "current.json"
+        # Build directory last loaded or saved by this store
+        self.build: Optional[Path] = None
+    
+    def data_hash(self) -> Optional[str]:
+        """SHA-256 of the data file contents, or None if it is missing"""
+        return file_hash(self.data_file)
+    
+    def data_stat(self) -> Optional[List[int]]:
+        """Cheap change marker of the data file: [size, mtime in ns], or None if it is missing"""
+        try:
+            stat = os.stat(self.data_file)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+    
+    def current_build(self) -> Optional[Path]:
+        """Build directory the pointer names, or None before the first save"""
+        try:
+            with open(self.pointer, 'r', encoding='utf-8') as file:
+                return self.index_dir / json.load(file)["build"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def builds(self) -> List[str]:
+        """Build directories on disk, oldest first"""
+        if not self.index_dir.exists():
+            return []
+        return sorted(path.name for path in self.index_dir.iterdir() if path.is_dir() and path.name.startswith("b"))
+    
+    def read_meta(self, build: Optional[Path] = None) -> Optional[dict]:
+        """Metadata of a build (default: the current one), or None if there is none"""
+        build = build or self.current_build()
+        if build is None:
+            return None
+        try:
+            with open(build / "meta.json", 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+    
+    def is_current(self, data_hash: Optional[str] = None, build: Optional[Path] = None) -> bool:
+        """
+        Check if the saved index was built from the current data file, ranking and precision
+        
+        The data file is only hashed when its size or modification time
+        differ from the ones recorded with the build.
+        """
+        meta = self.read_meta(build)
+        if not meta or meta.get("version") != self.FORMAT_VERSION:
+            return False
+        if meta.get("ranking") != ranking_params(self.ranking) or meta.get("precision") != self.precision:
+            return False
+        
+        if data_hash is None:
+            stat = self.data_stat()
+            if stat is not None and meta.get("data_stat") == stat:
+                return True
+            data_hash = self.data_hash()
+        return data_hash is not None and meta.get("data_hash") == data_hash
+    
+    def loaded_hash(self) -> Optional[str]:
+        """Data hash of the build last loaded or saved (hashing the data file if there is none)"""
+        meta = self.read_meta(self.build) if self.build is not None else None
+        return meta["data_hash"] if meta and meta.get("data_hash") else self.data_hash()
+    
+    def save(self, search: EnhancedSimilaritySearch, documents: Iterable[Union[Chunk, str]],
+             data_hash: Optional[str] = None) -> None:
+        """
+        Persist a fitted search engine as a new build and point readers at it
+        
+        Args:
+            search: Fitted EnhancedSimilaritySearch
+            documents: Chunks the engine was fitted on, in id order (Chunk objects keep their
+                source; None marks a removed chunk)
+            data_hash: Hash of the data file (computed if not given)
+            
+        Raises:
+            ValueError: If the engine is not fitted
+        """
+        if not search.is_fitted:
+            raise ValueError("Search engine must be fitted first")
+        
+        staging = self._staging()
+        try:
+            ChunkStore.write(staging, documents)
+            self._publish(staging, search, data_hash)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    
+    def fit_and_save(self, chunks: Iterable[Union[Chunk, str]],
+                     data_hash: Optional[str] = None) -> Optional[EnhancedSimilaritySearch]:
+        """
+        Fit a search engine on streamed chunks and persist it as a new build
+        
+        Chunks go straight into the build's ChunkStore and the engine is fitted
+        on the texts mapped back from it, so no list of chunks is ever built.
+        
+        Args:
+            chunks: Chunks in id order (Chunk objects keep their source), consumed once
+            data_hash: Hash of the data file (computed if not given)
+            
+        Returns:
+            The fitted EnhancedSimilaritySearch, or None if there were no chunks
+        """
+        staging = self._staging()
+        try:
+            if not ChunkStore.write(staging, chunks):
+                shutil.rmtree(staging, ignore_errors=True)
+                return None
+            search = EnhancedSimilaritySearch(ranking=self.ranking, precision=self.precision)
+            search.fit(ChunkStore(staging))
+            self._publish(staging, search, data_hash)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return search
+    
+    def _staging(self) -> Path:
+        """Private directory to write a build into; the files of the serving build are never touched"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(prefix=".build-", dir=self.index_dir))
+    
+    def _publish(self, staging: Path, search: EnhancedSimilaritySearch, data_hash: Optional[str]) -> None:
+        """Complete a staged build holding its ChunkStore, move it in place and point readers at it"""
+        self._write(staging, search, data_hash)
+        builds = self.builds()
+        sequence = int(builds[-1][1:]) + 1 if builds else 1
+        build = self.index_dir / f"b{sequence:06d}"
+        os.replace(staging, build)
+        
+        atomic_write_text(self.pointer, json.dumps({"build": build.name}))
+        self.build = build
+    
+    def _write(self, directory: Path, search: EnhancedSimilaritySearch, data_hash: Optional[str]) -> None:
+        """Write the index files of a build next to its ChunkStore"""
+        vectorizer = search.vectorizer
+        terms = vectorizer.get_feature_names()
+        arrays = {
+            "idf": np.array([vectorizer.idf[term] for term in terms], dtype=np.float64),
+            "doc_indptr": search.doc_matrix.indptr,
+            "doc_indices": search.doc_matrix.indices,
+            "doc_data": search.doc_matrix.data,
+            "doc_tf": search.tf_matrix.data,
+            "term_ptr": search.index.term_ptr,
+            "post_docs": search.index.doc_ids,
+            "max_weights": search.index.max_weights,
+            "doc_lengths": search.doc_lengths,
+            "presence_indptr": search.presence_matrix.indptr,
+            "presence_indices": search.presence_matrix.indices,
+        }
+        if search.index.exact:
+            arrays["post_weights"] = search.index.weights
+        else:
+            arrays["post_compact"] = search.index.compact
+        if search.index.scales is not None:
+            arrays["post_scales"] = search.index.scales
+        for name, array in arrays.items():
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(array))
+        
+        with open(directory / "vocabulary.json", 'w', encoding='utf-8') as file:
+            json.dump(terms, file)
+        with open(directory / "doc_freq.json", 'w', encoding='utf-8') as file:
+            json.dump(dict(vectorizer.doc_freq), file)
+        with open(directory / "tokens.json", 'w', encoding='utf-8') as file:
+            json.dump(list(search.token_ids), file)
+        
+        # Stat before hashing: a file changing meanwhile then fails the cheap check next time
+        data_stat = self.data_stat()
+        meta = {
+            "version": self.FORMAT_VERSION,
+            "data_hash": data_hash or self.data_hash(),
+            "data_stat": data_stat,
+            "ranking": search.ranking_params(),
+            "precision": search.index.precision,
+            "n_docs": len(search.doc_lengths),
+            "n_terms": len(terms),
+            "total_docs": vectorizer.total_docs,
+        }
+        with open(directory / "meta.json", 'w') as file:
+            json.dump(meta, file)
+    
+    def prune(self, protect: Iterable[Path] = ()) -> List[str]:
+        """
+        Delete builds older than the ``keep`` most recent ones
+        
+        The current build and any build in ``protect`` are never deleted.
+        Directories that cannot be removed yet (a file still mapped on
+        Windows) are left for a later prune.
+        
+        Returns:
+            Builds deleted
+        """
+        current = self.current_build()
+        protected = {Path(path).name for path in protect} | ({current.name} if current else set())
+        builds = self.builds()
+        deleted = []
+        for name in builds[:max(len(builds) - self.keep, 0)]:
+            if name in protected:
+                continue
+            try:
+                shutil.rmtree(self.index_dir / name)
+                deleted.append(name)
+            except OSError:
+                pass
+        return deleted
+    
+    def load(self) -> Optional[EnhancedSimilaritySearch]:
+        """
+        Map a saved index back into a ready-to-query search engine
+        
+        Returns:
+            EnhancedSimilaritySearch, or None if no current index exists
+        """
+        # Resolve the pointer once, so every file comes from the same build
+        build = self.current_build()
+        if build is None or not self.is_current(build=build):
+            return None
+        
+        try:
+            meta = self.read_meta(build)
+            names = list(self.ARRAYS)
+            if meta["precision"] == "float64":
+                names.append("post_weights")
+            else:
+                names.append("post_compact")
+            if meta["precision"] == "uint8":
+                names.append("post_scales")
+            arrays = {name: np.load(build / f"{name}.npy", mmap_mode='r') for name in names}
+            with open(build / "vocabulary.json", 'r', encoding='utf-8') as file:
+                terms = json.load(file)
+            with open(build / "doc_freq.json", 'r', encoding='utf-8') as file:
+                doc_freq = json.load(file)
+            with open(build / "tokens.json", 'r', encoding='utf-8') as file:
+                tokens = json.load(file)
+            documents = ChunkStore(build)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        
+        search = EnhancedSimilaritySearch(ranking=meta["ranking"]["ranking"], precision=meta["precision"])
+        vectorizer = search.vectorizer
+        vectorizer.vocabulary = {term: i for i, term in enumerate(terms)}
+        vectorizer.idf = dict(zip(terms, arrays["idf"].tolist()))
+        vectorizer.doc_freq = Counter(doc_freq)
+        vectorizer.total_docs = meta["total_docs"]
+        
+        vectorizer.documents = documents
+        search.documents = documents
+        search.doc_lengths = arrays["doc_lengths"]
+        search.token_ids = {token: i for i, token in enumerate(tokens)}
+        presence_indices = arrays["presence_indices"]
+        # Presence entries are all 1: a zero-stride view instead of a heap array per process
+        search.presence_matrix = CSRMatrix(arrays["presence_indptr"], presence_indices,
+                                           np.broadcast_to(np.float64(1), presence_indices.shape),
+                                           (len(documents), len(tokens)))
+        shape = (len(documents), len(terms))
+        search.tf_matrix = CSRMatrix(arrays["doc_indptr"], arrays["doc_indices"], arrays["doc_tf"], shape)
+        search.doc_matrix = CSRMatrix(arrays["doc_indptr"], arrays["doc_indices"], arrays["doc_data"], shape)
+        forward = None
+        if meta["precision"] != "float64":
+            forward = search.forward_weights(search.tf_matrix, search.doc_matrix, search.doc_lengths, vectorizer)
+        search.index = InvertedIndex(arrays["term_ptr"], arrays["post_docs"], arrays.get("post_weights"),
+                                     len(documents), max_weights=arrays["max_weights"],
+                                     precision=meta["precision"], compact=arrays.get("post_compact"),
+                                     scales=arrays.get("post_scales"), forward=forward)
+        search.is_fitted = True
+        self.build = build
+        return search
+    
+    def load_or_build(self, documents_loader) -> Optional[EnhancedSimilaritySearch]:
+        """
+        Load the saved index, rebuilding it only if the data file changed
+        
+        Args:
+            documents_loader: Callable returning the chunks to fit on (Chunk objects or texts),
+                as any iterable; it is called again if the build cannot be saved
+            
+        Returns:
+            EnhancedSimilaritySearch mapped from disk (the fitted one if saving failed),
+            or None if there is no data
+        """
+        search = self.load()
+        if search is not None:
+            return search
+        
+        try:
+            search = self.fit_and_save(documents_loader())
+        except (OSError, ValueError) as e:
+            print(f"Could not save index: {e}")
+            texts = [doc.text if isinstance(doc, Chunk) else doc for doc in documents_loader()]
+            if not texts:
+                return None
+            search = EnhancedSimilaritySearch(ranking=self.ranking, precision=self.precision)
+            search.fit(texts)
+            return search
+        if search is None:
+            return None
+        
+        # Serve the mapped build (ChunkStore texts) so the fitted copy can be freed
+        return self.load() or search
@@ -4,9 +4,25 @@ Data Manager for Jupiter.money RAG Bot
 
 import os
 import json
+import hashlib
 from datetime import datetime, timedelta
-from pathlib import Path
-from config.settings import DATA_FILE, CACHE_FILE, REFRESH_INTERVAL
+from typing import Dict, Iterator, Optional
+from config.settings import CACHE_FILE, REFRESH_INTERVAL
+from .chunker import Chunk, TextChunker
+from .snapshots import current_data_file
+from src.metrics import METRICS
+
+
+def file_hash(path) -> Optional[str]:
+    """SHA-256 of a file's contents, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 class DataManager:
@@ -15,24 +31,29 @@ class DataManager:
     """
     
     def __init__(self):
-        self.data_file = DATA_FILE
+        # Data of the active snapshot (DATA_FILE before the first one)
+        self.data_file = current_data_file()
         self.cache_file = CACHE_FILE
+        self.chunker = TextChunker()
     
+    @METRICS.timed("load_data")
     def load_data(self) -> list:
-        """Load scraped data from file"""
-        if not os.path.exists(self.data_file):
-            return []
-        
+        """Load scraped data from file as a list of chunk texts"""
+        return [chunk.text for chunk in self.load_chunks()]
+    
+    def load_chunks(self) -> Iterator[Chunk]:
+        """Stream scraped data from file as chunks with their source URL and page id"""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            chunks = [chunk.strip() for chunk in content.split('\n\n') if chunk.strip()]
-            return chunks
-            
+            yield from self.iter_chunks()
         except Exception as e:
+            # A read error ends the stream; chunks already yielded stay valid
             print(f"Error loading data: {e}")
-            return []
+    
+    def iter_chunks(self) -> Iterator[Chunk]:
+        """Stream chunk windows with source URL and offsets from the data file"""
+        if not os.path.exists(self.data_file):
+            return iter(())
+        return self.chunker.chunk_file(self.data_file)
     
     def should_refresh_data(self) -> bool:
         """Check if data should be refreshed"""
@@ -49,14 +70,22 @@ class DataManager:
         except Exception:
             return True
     
-    def update_cache(self):
-        """Update cache metadata"""
+    def update_cache(self, stages: Optional[Dict[str, float]] = None):
+        """
+        Update cache metadata
+        
+        Args:
+            stages: Seconds spent in each stage of the refresh that produced the data
+        """
         try:
             os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
             cache_data = {
                 'last_update': datetime.now().isoformat(),
-                'data_file': str(self.data_file)
+                'data_file': str(self.data_file),
+                'data_hash': self.get_data_hash()
             }
+            if stages is not None:
+                cache_data['stages'] = {name: round(seconds, 3) for name, seconds in stages.items()}
             
             with open(self.cache_file, 'w') as file:
                 json.dump(cache_data, file)
@@ -64,6 +93,10 @@ class DataManager:
         except Exception as e:
             print(f"Could not update cache: {e}")
     
+    def get_data_hash(self) -> Optional[str]:
+        """Get the content hash of the data file"""
+        return file_hash(self.data_file)
+    
     def get_data_info(self) -> dict:
         """Get information about the data file"""
         if not os.path.exists(self.data_file):
@@ -0,0 +1,158 @@
+"""
+Versioned data snapshots for Jupiter.money RAG Bot
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+from config.settings import DATA_FILE, SNAPSHOT_DIR, SNAPSHOT_POINTER, SNAPSHOTS_KEPT
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Write a text file so readers see either the old or the new contents
+    
+    The text goes to a temporary file in the same directory, is flushed to
+    disk and then renamed over the target with ``os.replace``.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class Snapshot(NamedTuple):
+    """One immutable version of the scraped data"""
+    version: str
+    path: Path
+    data_hash: str
+    created: str
+    
+    @property
+    def data_file(self) -> Path:
+        """Scraped text of this snapshot"""
+        return self.path / DATA_FILE.name
+    
+    @property
+    def index_dir(self) -> Path:
+        """Persisted search index built from this snapshot"""
+        return self.path / "index"
+
+
+class SnapshotStore:
+    """
+    Immutable data snapshots behind an atomically replaced pointer
+    
+    Layout:
+        snapshots/v<sequence>-<hash>/           one directory per version, e.g. v000042-3f2a9c1b0d4e
+        snapshots/<version>/scraped_texts.txt   snapshot data, never modified after staging
+        snapshots/<version>/index/              its persisted search index (IndexStore)
+        current.json                            pointer to the snapshot being served
+    
+    A refresh stages a new snapshot directory, optionally builds its index,
+    and then activates it by replacing the pointer with ``os.replace``.
+    Readers resolve the pointer once per load, so they never see a
+    half-written data file, and processes still serving an older snapshot
+    keep their files until it is pruned.
+    """
+    
+    def __init__(self, root: Path = SNAPSHOT_DIR, pointer: Path = SNAPSHOT_POINTER, keep: int = SNAPSHOTS_KEPT):
+        """
+        Args:
+            root: Directory holding one subdirectory per snapshot
+            pointer: JSON file naming the current snapshot
+            keep: Number of most recent snapshots kept by ``prune``
+        """
+        self.root = Path(root)
+        self.pointer = Path(pointer)
+        self.keep = keep
+    
+    def current(self) -> Optional[Snapshot]:
+        """The active snapshot, or None before the first one is published"""
+        try:
+            with open(self.pointer, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            snapshot = Snapshot(meta["version"], self.root / meta["version"], meta["data_hash"], meta["created"])
+        except (OSError, ValueError, KeyError):
+            return None
+        return snapshot if snapshot.data_file.exists() else None
+    
+    def versions(self) -> List[str]:
+        """Snapshot versions on disk, oldest first"""
+        if not self.root.exists():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir() and path.name.startswith("v"))
+    
+    def stage(self, text: str) -> Snapshot:
+        """
+        Write a new snapshot without activating it
+        
+        Args:
+            text: Full contents of the scraped data file
+        
+        Returns:
+            The staged Snapshot (the current one if the text is unchanged)
+        """
+        data_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        current = self.current()
+        if current is not None and current.data_hash == data_hash:
+            return current
+        
+        # Zero-padded sequence numbers keep versions in publication order
+        versions = self.versions()
+        sequence = int(versions[-1].split("-", 1)[0][1:]) + 1 if versions else 1
+        version = f"v{sequence:06d}-{data_hash[:12]}"
+        snapshot = Snapshot(version, self.root / version, data_hash, datetime.now().isoformat(timespec="seconds"))
+        atomic_write_text(snapshot.data_file, text)
+        return snapshot
+    
+    def activate(self, snapshot: Snapshot) -> None:
+        """Point readers at a staged snapshot and prune old ones"""
+        meta = {"version": snapshot.version, "data_hash": snapshot.data_hash, "created": snapshot.created}
+        atomic_write_text(self.pointer, json.dumps(meta))
+        self.prune()
+    
+    def publish(self, text: str) -> Snapshot:
+        """Stage and activate a snapshot in one step"""
+        snapshot = self.stage(text)
+        self.activate(snapshot)
+        return snapshot
+    
+    def prune(self, protect: Iterable[str] = ()) -> List[str]:
+        """
+        Delete snapshots older than the ``keep`` most recent ones
+        
+        The current snapshot and any version in ``protect`` are never
+        deleted. Directories that cannot be removed yet (a file still
+        mapped on Windows) are left for a later prune.
+        
+        Returns:
+            Versions deleted
+        """
+        current = self.current()
+        protected = set(protect) | ({current.version} if current else set())
+        versions = self.versions()
+        deleted = []
+        for version in versions[:max(len(versions) - self.keep, 0)]:
+            if version in protected:
+                continue
+            try:
+                shutil.rmtree(self.root / version)
+                deleted.append(version)
+            except OSError:
+                pass
+        return deleted
+
+
+def current_data_file(store: SnapshotStore = None) -> Path:
+    """Data file of the active snapshot, or DATA_FILE before the first snapshot"""
+    snapshot = (store or SnapshotStore()).current()
+    return snapshot.data_file if snapshot is not None else DATA_FILE
@@ -0,0 +1,448 @@
+"""
+Retrieval engine facade for Jupiter.money RAG Bot
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from config.settings import DATA_FILE, INDEX_DIR, INDEX_REFRESH_INTERVAL, RANKING, TOP_K
+from src.data.snapshots import SnapshotStore
+from src.metrics import METRICS
+from src.nlp.query_cache import CachedAnswer, QueryCache
+
+# (chunk id, score, chunk text)
+SearchHit = Tuple[int, float, str]
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(path: Path) -> Optional[Tuple[str, int, int]]:
+    """Cheap change marker for a data file: (path, mtime in ns, size), or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+class IndexHandle:
+    """
+    One loaded index version and the number of requests using it
+    
+    The engine hands out acquired handles. After a swap the old handle is
+    retired and closed when its last request releases it, so in-flight
+    queries finish on the version they started with.
+    """
+    
+    def __init__(self, searcher, version: Hashable, source: Hashable = None,
+                 on_close: Callable[["IndexHandle"], None] = None, build: Path = None):
+        """
+        Args:
+            searcher: Fitted EnhancedSimilaritySearch
+            version: Cache version of this index
+            source: Signature of the data the index was built from
+            on_close: Called once the handle is retired and drained
+            build: IndexStore build directory the searcher maps, if any
+        """
+        self.searcher = searcher
+        self.version = version
+        self.source = source
+        self.build = Path(build) if build is not None else None
+        self.on_close = on_close
+        self.refs = 0
+        self.retired = False
+        self.closed = False
+        self._lock = threading.Lock()
+    
+    @property
+    def documents(self) -> Sequence[str]:
+        """Indexed chunks, a lazily decoding ChunkStore once loaded from disk (empty once closed)"""
+        return self.searcher.documents if self.searcher is not None else []
+    
+    def acquire(self) -> "IndexHandle":
+        """Count one more request using this index"""
+        with self._lock:
+            self.refs += 1
+        return self
+    
+    def release(self) -> None:
+        """Count a finished request, closing a retired index after its last one"""
+        with self._lock:
+            self.refs -= 1
+            drained = self._drained()
+        if drained:
+            self._close()
+    
+    def retire(self) -> None:
+        """Stop serving new requests; close now or when the last one finishes"""
+        with self._lock:
+            self.retired = True
+            drained = self._drained()
+        if drained:
+            self._close()
+    
+    def _drained(self) -> bool:
+        """Whether the handle should close now (lock held; true at most once)"""
+        if self.retired and self.refs == 0 and not self.closed:
+            self.closed = True
+            return True
+        return False
+    
+    def _close(self) -> None:
+        """Drop the index so its arrays and memory maps can be freed"""
+        self.searcher = None
+        if self.on_close is not None:
+            self.on_close(self)
+
+
+class RetrievalEngine:
+    """
+    Single entry point for search and answers
+    
+    Wraps the persisted EnhancedSimilaritySearch (see IndexStore), the
+    SmartAnswerGenerator and a QueryCache keyed on the index version. The
+    Streamlit app, the HTTP API and the CLI scripts all go through it, so
+    they share one tokenizer, one ranking and one cache.
+    
+    Without an explicit data file the engine follows the active data
+    snapshot (see SnapshotStore). ``refresh`` builds the index of a newly
+    published snapshot off the request path and swaps it in atomically;
+    every request leases the index it started on, so it finishes on that
+    version, and readers never wait for a build.
+    
+    NumPy and the index modules are imported on the first ``load``/``fit``,
+    not when this module is imported, so entry points start quickly.
+    """
+    
+    def __init__(self, data_file: Path = None, index_dir: Path = None, ranking: str = RANKING,
+                 cache: QueryCache = None, snapshots: SnapshotStore = None):
+        """
+        Args:
+            data_file: Scraped text file to index (default: follow the active snapshot)
+            index_dir: Directory of the persisted index for ``data_file``
+            ranking: "tfidf", "bm25" or "bm25+"
+            cache: Answer cache (a private one if not given)
+            snapshots: Snapshot store followed when no data file is given
+        """
+        self.data_file = Path(data_file) if data_file is not None else None
+        self.index_dir = Path(index_dir) if index_dir is not None else None
+        self.ranking = ranking
+        self.cache = cache if cache is not None else QueryCache()
+        self.snapshots = snapshots or SnapshotStore()
+        self.answer_generator = None
+        self._handle: Optional[IndexHandle] = None
+        # Serving and retired handles not closed yet; their files are kept on disk
+        self._open: List[IndexHandle] = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refresher: Optional["IndexRefresher"] = None
+    
+    @property
+    def is_ready(self) -> bool:
+        """Whether an index is loaded"""
+        return self._handle is not None
+    
+    @property
+    def searcher(self):
+        """Search engine currently serving (None before loading)"""
+        handle = self._handle
+        return handle.searcher if handle is not None else None
+    
+    @property
+    def version(self) -> Optional[Hashable]:
+        """Version of the index currently serving"""
+        handle = self._handle
+        return handle.version if handle is not None else None
+    
+    @property
+    def documents(self) -> Sequence[str]:
+        """Indexed chunks of the serving index (empty before loading)"""
+        handle = self._handle
+        return handle.documents if handle is not None else []
+    
+    @contextmanager
+    def lease(self) -> Iterator[Optional[IndexHandle]]:
+        """Pin the serving index for the duration of a request (None before loading)"""
+        with self._lock:
+            handle = self._handle
+            if handle is not None:
+                handle.acquire()
+        try:
+            yield handle
+        finally:
+            if handle is not None:
+                handle.release()
+    
+    def swap(self, searcher, version: Hashable, source: Hashable = None, build: Path = None) -> None:
+        """
+        Atomically make a fitted search engine serve new requests
+        
+        Args:
+            searcher: Fitted EnhancedSimilaritySearch
+            version: Cache version of this index
+            source: Signature of the data it was built from
+            build: IndexStore build directory the searcher maps, if any
+        """
+        handle = IndexHandle(searcher, version, source, on_close=self._on_close, build=build)
+        # New requests only see answers of the new version
+        self.cache.set_version(version)
+        with self._lock:
+            old, self._handle = self._handle, handle
+            self._open.append(handle)
+        if old is not None:
+            METRICS.increment("index_swaps")
+            old.retire()
+    
+    def _on_close(self, handle: IndexHandle) -> None:
+        """Delete snapshots and index builds that no request uses any more"""
+        with self._lock:
+            if handle in self._open:
+                self._open.remove(handle)
+        self._prune(handle.build.parent if handle.build is not None else None)
+    
+    def _prune(self, index_dir: Optional[Path]) -> None:
+        """
+        Prune old snapshots (when following them) and old builds in ``index_dir``,
+        keeping everything an open handle still maps
+        """
+        from src.data.index_store import IndexStore
+        
+        with self._lock:
+            handles = list(self._open)
+        if self.data_file is None:
+            self.snapshots.prune(protect=[handle.version for handle in handles])
+        if index_dir is not None:
+            IndexStore(index_dir).prune(protect=[handle.build for handle in handles if handle.build is not None])
+    
+    def _source(self) -> Tuple[Path, Path, Optional[str]]:
+        """Data file, index directory and snapshot version to load"""
+        if self.data_file is not None:
+            return self.data_file, self.index_dir or INDEX_DIR, None
+        
+        snapshot = self.snapshots.current()
+        if snapshot is not None:
+            return snapshot.data_file, snapshot.index_dir, snapshot.version
+        return DATA_FILE, self.index_dir or INDEX_DIR, None
+    
+    def load(self) -> bool:
+        """
+        Map the persisted index of the current data in (rebuilding it only if
+        the data changed) and swap it in
+        
+        Returns:
+            True if an index is ready, False if there is no data
+        """
+        from src.data.index_store import IndexStore
+        from src.data.manager import DataManager
+        
+        with self._load_lock:
+            data_file, index_dir, snapshot_version = self._source()
+            source = file_signature(data_file)
+            store = IndexStore(index_dir, data_file, self.ranking)
+            manager = DataManager()
+            manager.data_file = data_file
+            searcher = store.load_or_build(manager.load_chunks)
+            if searcher is None:
+                return self.is_ready
+            
+            self.swap(searcher, snapshot_version or store.loaded_hash(), source, store.build)
+            self._prune(store.index_dir)
+            return True
+    
+    def refresh(self) -> bool:
+        """
+        Load the current data if it changed since the serving index was built
+        
+        Returns:
+            True if a new index was swapped in
+        """
+        data_file, _, _ = self._source()
+        handle = self._handle
+        if handle is not None and handle.source == file_signature(data_file):
+            return False
+        return self.load() and self._handle is not handle
+    
+    def start_refresher(self, interval: float = INDEX_REFRESH_INTERVAL,
+                        warm_questions: Iterable[str] = ()) -> "IndexRefresher":
+        """Start (once) the background thread that keeps the index current"""
+        if self._refresher is None:
+            self._refresher = IndexRefresher(self, interval, warm_questions)
+            self._refresher.start()
+        return self._refresher
+    
+    def stop_refresher(self) -> None:
+        """Stop the background refresh thread, if running"""
+        if self._refresher is not None:
+            self._refresher.stop()
+            self._refresher = None
+    
+    def fit(self, documents: List[str], version: Hashable = None) -> None:
+        """
+        Index chunks in memory without persisting them (tests, benchmarks)
+        
+        Args:
+            documents: Chunks to index
+            version: Cache version of this index (a fresh one if not given)
+        """
+        from src.nlp.similarity import EnhancedSimilaritySearch
+        
+        searcher = EnhancedSimilaritySearch(ranking=self.ranking)
+        searcher.fit(documents)
+        self.swap(searcher, version if version is not None else id(searcher))
+    
+    def search(self, query: str, k: int = TOP_K) -> List[SearchHit]:
+        """
+        Rank chunks for a query
+        
+        Args:
+            query: User question
+            k: Number of results
+        
+        Returns:
+            (chunk id, score, text) tuples, best first (empty before loading)
+        """
+        with self.lease() as handle:
+            return self._search(handle, query, k)
+    
+    @staticmethod
+    def _search(handle: Optional[IndexHandle], query: str, k: int = TOP_K) -> List[SearchHit]:
+        """Rank chunks on a leased index"""
+        if handle is None:
+            return []
+        return handle.searcher.search(query, k)
+    
+    def search_batch(self, queries: List[str], k: int = TOP_K) -> List[List[SearchHit]]:
+        """Rank chunks for many queries at once (see EnhancedSimilaritySearch.search_batch)"""
+        with self.lease() as handle:
+            if handle is None:
+                return [[] for _ in queries]
+            return handle.searcher.search_batch(queries, k)
+    
+    def _generator(self):
+        """Answer generator, created on first use"""
+        if self.answer_generator is None:
+            from src.nlp.answer_generator import SmartAnswerGenerator
+            self.answer_generator = SmartAnswerGenerator()
+        return self.answer_generator
+    
+    def generate_answer(self, query: str, hits: List[SearchHit]) -> str:
+        """Render an answer from search hits"""
+        return self._generator().generate_answer(query, [text for _, _, text in hits],
+                                                 [score for _, score, _ in hits])
+    
+    def ask(self, query: str, timings: Dict[str, float] = None) -> CachedAnswer:
+        """
+        Retrieve and render an answer, reusing the cached result of a repeated question
+        
+        An empty ``chunk_ids`` means nothing relevant was found. Exceptions
+        propagate (and nothing is cached) so callers can report them.
+        
+        Args:
+            query: User question
+            timings: Optional dict that receives "search" and "answer" times in ms on a miss
+        
+        Returns:
+            CachedAnswer
+        """
+        return self.ask_with_chunks(query, timings)[0]
+    
+    def ask_with_chunks(self, query: str, timings: Dict[str, float] = None) -> Tuple[CachedAnswer, List[str]]:
+        """Like ``ask``, plus the texts of the answer's chunks from the same index version"""
+        with self.lease() as handle:
+            version = handle.version if handle is not None else None
+            cached = self.cache.get(query, version)
+            if cached is not None:
+                return cached, self._chunks(handle, cached.chunk_ids)
+            
+            start = time.perf_counter()
+            hits = self._search(handle, query)
+            searched = time.perf_counter()
+            answer = self.generate_answer(query, hits)
+            if timings is not None:
+                timings["search"] = (searched - start) * 1000
+                timings["answer"] = (time.perf_counter() - searched) * 1000
+            
+            result = CachedAnswer(tuple(i for i, _, _ in hits), tuple(score for _, score, _ in hits), answer)
+            self.cache.put(query, version, result)
+            return result, [text for _, _, text in hits]
+    
+    def ask_stream(self, query: str) -> Tuple[CachedAnswer, List[str], Iterator[str]]:
+        """
+        Retrieve now and render the answer lazily, piece by piece
+        
+        Retrieval runs before returning; formatting happens as the pieces are
+        consumed, and the complete answer is cached once they are exhausted.
+        A cached answer comes back as a single piece.
+        
+        Args:
+            query: User question
+        
+        Returns:
+            (CachedAnswer with chunk ids and scores but an empty answer on a miss,
+            texts of those chunks, answer pieces)
+        """
+        with self.lease() as handle:
+            version = handle.version if handle is not None else None
+            cached = self.cache.get(query, version)
+            if cached is not None:
+                return cached, self._chunks(handle, cached.chunk_ids), iter((cached.answer,))
+            hits = self._search(handle, query)
+        
+        result = CachedAnswer(tuple(i for i, _, _ in hits), tuple(score for _, score, _ in hits), "")
+        chunks = [text for _, _, text in hits]
+        
+        def pieces() -> Iterator[str]:
+            parts = []
+            for part in self._generator().iter_answer(query, chunks, result.scores):
+                parts.append(part)
+                yield part
+            self.cache.put(query, version, result._replace(answer="".join(parts)))
+        
+        return result, chunks, pieces()
+    
+    @staticmethod
+    def _chunks(handle: Optional[IndexHandle], chunk_ids: Iterable[int]) -> List[str]:
+        """Texts of chunks in a leased index"""
+        documents = handle.documents if handle is not None else []
+        return [documents[i] for i in chunk_ids]
+    
+    def warm(self, questions: Iterable[str]) -> None:
+        """Answer questions up front so their first request is a cache hit"""
+        for question in questions:
+            self.ask(question)
+
+
+class IndexRefresher(threading.Thread):
+    """Background thread swapping in the index of newly published data"""
+    
+    def __init__(self, engine: RetrievalEngine, interval: float = INDEX_REFRESH_INTERVAL,
+                 warm_questions: Iterable[str] = ()):
+        """
+        Args:
+            engine: Engine to keep current
+            interval: Seconds between checks
+            warm_questions: Answered after each swap so the new version starts warm
+        """
+        super().__init__(name="index-refresher", daemon=True)
+        self.engine = engine
+        self.interval = interval
+        self.warm_questions = list(warm_questions)
+        self._stopped = threading.Event()
+    
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                if self.engine.refresh():
+                    logger.info("Index refreshed to version %s", self.engine.version)
+                    self.engine.warm(self.warm_questions)
+            except Exception:
+                # Keep serving the current index; try again next interval
+                logger.exception("Index refresh failed")
+    
+    def stop(self) -> None:
+        """Ask the thread to exit after its current check"""
+        self._stopped.set()
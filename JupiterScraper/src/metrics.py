@@ -0,0 +1,191 @@
+"""
+Lightweight instrumentation (timing spans and counters) for Jupiter.money RAG Bot
+"""
+
+import json
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from typing import Dict, Iterable, Iterator, Optional
+from config.settings import METRICS_ENABLED
+
+# Shared no-op context manager: a disabled span allocates nothing
+NULL_SPAN = nullcontext()
+
+
+class SpanStats:
+    """Accumulated timings of one span name"""
+    
+    __slots__ = ("calls", "errors", "total", "max", "last")
+    
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+    
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max * 1000,
+            "last_ms": self.last * 1000,
+        }
+
+
+class _Span:
+    """Times one ``with`` block and records it on exit"""
+    
+    __slots__ = ("metrics", "name", "start")
+    
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """
+    Registry of timing spans and counters
+    
+    Usage::
+    
+        with METRICS.span("score"):
+            scores = matrix.dot(query)
+        METRICS.increment("search_errors")
+    
+    When disabled, ``span`` returns a shared no-op context manager and
+    ``increment`` returns immediately, so instrumented hot paths pay one
+    attribute check. Updates take a lock because Streamlit sessions and API
+    workers run in threads.
+    """
+    
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.spans: Dict[str, SpanStats] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def span(self, name: str):
+        """Context manager timing a block under ``name``"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+    
+    def timed(self, name: str):
+        """Decorator timing every call of a function under ``name``"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def timed_stream(self, pieces: Iterable, first: str, total: str, start: Optional[float] = None) -> Iterator:
+        """
+        Pass a stream through, timing its first item and its completion separately
+        
+        Args:
+            pieces: Iterable being consumed (e.g. streamed answer text)
+            first: Span recording the time until the first item (time to first byte)
+            total: Span recording the time until the stream is exhausted
+            start: ``time.perf_counter()`` value to measure from (default: first pull)
+        
+        Yields:
+            The items of ``pieces`` unchanged
+        """
+        if not self.enabled:
+            yield from pieces
+            return
+        
+        start = time.perf_counter() if start is None else start
+        seen_first = False
+        try:
+            for piece in pieces:
+                if not seen_first:
+                    seen_first = True
+                    self.record(first, time.perf_counter() - start)
+                yield piece
+        except Exception:
+            self.record(total, time.perf_counter() - start, error=True)
+            raise
+        self.record(total, time.perf_counter() - start)
+    
+    def record(self, name: str, seconds: float, error: bool = False) -> None:
+        """Add one timing to a span"""
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.total += seconds
+            stats.last = seconds
+            if seconds > stats.max:
+                stats.max = seconds
+    
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def reset(self) -> None:
+        """Forget every span and counter"""
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+    
+    def snapshot(self) -> dict:
+        """Current spans and counters as plain data"""
+        with self._lock:
+            return {
+                "spans": {name: stats.as_dict() for name, stats in sorted(self.spans.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+    
+    def to_json(self, indent: int = 2) -> str:
+        """Snapshot as a JSON document"""
+        return json.dumps(self.snapshot(), indent=indent)
+    
+    def to_prometheus(self, prefix: str = "jupiter") -> str:
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        span_metrics = [
+            ("span_calls_total", "counter", "Calls of an instrumented span", lambda s: s["calls"]),
+            ("span_errors_total", "counter", "Calls that raised an exception", lambda s: s["errors"]),
+            ("span_seconds_total", "counter", "Total time spent in a span", lambda s: s["total_ms"] / 1000),
+            ("span_max_seconds", "gauge", "Slowest call of a span", lambda s: s["max_ms"] / 1000),
+        ]
+        for suffix, kind, help_text, value in span_metrics:
+            metric = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in snapshot["spans"].items():
+                lines.append(f'{metric}{{span="{name}"}} {value(stats):.9g}')
+        
+        for name, value in snapshot["counters"].items():
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:.9g}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the instrumented modules
+METRICS = Metrics()
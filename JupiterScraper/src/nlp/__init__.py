@@ -1,13 +1,20 @@
 """
 Natural Language Processing modules for Jupiter.money RAG Bot
+
+Classes are imported on first access, so importing a light module such as
+the tokenizer or the query cache does not pull in NumPy.
 """
 
-from .vectorizer import EnhancedTFIDFVectorizer
-from .similarity import EnhancedSimilaritySearch
-from .answer_generator import SmartAnswerGenerator
+from src._lazy import lazy_exports
 
-__all__ = [
-    "EnhancedTFIDFVectorizer",
-    "EnhancedSimilaritySearch", 
-    "SmartAnswerGenerator"
-] 
\ No newline at end of file
+__getattr__, __all__ = lazy_exports(__name__, {
+    "EnhancedTFIDFVectorizer": ".vectorizer",
+    "EnhancedSimilaritySearch": ".similarity",
+    "SmartAnswerGenerator": ".answer_generator",
+    "CSRMatrix": ".sparse",
+    "InvertedIndex": ".index",
+    "SynonymTable": ".synonyms",
+    "BM25Scorer": ".bm25",
+    "CachedAnswer": ".query_cache",
+    "QueryCache": ".query_cache",
+})
@@ -3,7 +3,12 @@ Smart Answer Generator for Jupiter.money RAG Bot
 """
 
 import re
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+from .tokenizer import tokenize_query
+from src.metrics import METRICS
+
+WHITESPACE = re.compile(r'\s+')
+SENTENCE_END = re.compile(r'[.!?]')
 
 
 class SmartAnswerGenerator:
@@ -12,78 +17,86 @@ class SmartAnswerGenerator:
     """
     
     def __init__(self):
-        self.query_patterns = {
-            'savings': r'\b(savings?|deposit|interest|rate|account)\b',
-            'expenses': r'\b(expense|spending|budget|track|category)\b',
-            'investments': r'\b(investment|fund|portfolio|stocks?|returns?)\b',
-            'security': r'\b(security|safe|protect|encryption|privacy)\b',
-            'fees': r'\b(fee|charge|cost|commission|rate)\b',
-            'transfers': r'\b(transfer|send|receive|move|exchange)\b'
+        # Matched against the shared (cached) query tokenization
+        self.query_keywords = {
+            'savings': {'saving', 'savings', 'deposit', 'interest', 'rate', 'account'},
+            'expenses': {'expense', 'spending', 'budget', 'track', 'category'},
+            'investments': {'investment', 'fund', 'portfolio', 'stock', 'stocks', 'return', 'returns'},
+            'security': {'security', 'safe', 'protect', 'encryption', 'privacy'},
+            'fees': {'fee', 'charge', 'cost', 'commission', 'rate'},
+            'transfers': {'transfer', 'send', 'receive', 'move', 'exchange'}
         }
     
+    @METRICS.timed("generate_answer")
     def generate_answer(self, query: str, context_chunks: List[str], scores: List[float]) -> str:
         """Generate intelligent answers from context"""
-        
+        return "".join(self.iter_answer(query, context_chunks, scores))
+    
+    def iter_answer(self, query: str, context_chunks: List[str], scores: List[float]) -> Iterator[str]:
+        """
+        Yield the answer piece by piece as each part is formatted
+        
+        The header comes first, then every ranked snippet, the insights, the
+        follow-up suggestions and the attribution, so a UI can render the
+        start of the answer before the rest is ready.
+        
+        Args:
+            query: User question
+            context_chunks: Retrieved chunks, best first
+            scores: Their similarity scores
+        
+        Yields:
+            Markdown pieces that concatenate to the full answer
+        """
         if not context_chunks:
-            return "I couldn't find specific information on that yet. Try asking about Jupiter's savings accounts, expense tracking, or security features."
-        
-        # Detect query type
-        query_type = self._detect_query_type(query)
+            yield "I couldn't find specific information on that yet. Try asking about Jupiter's savings accounts, expense tracking, or security features."
+            return
         
         # Filter chunks by relevance
-        relevant_chunks = []
-        for chunk, score in zip(context_chunks, scores):
-            if score > 0.15:  # Threshold for relevance
-                relevant_chunks.append((chunk, score))
-        
+        relevant_chunks = [(chunk, score) for chunk, score in zip(context_chunks, scores) if score > 0.15]
         if not relevant_chunks:
-            return "The information I found doesn't seem directly relevant. Try rephrasing your question."
+            yield "The information I found doesn't seem directly relevant. Try rephrasing your question."
+            return
         
         # Sort by relevance
         relevant_chunks.sort(key=lambda x: x[1], reverse=True)
         
-        # Generate structured answer
-        answer = "**Here's what I found about your question:**\n\n"
-        
-        # Add the most relevant information first
-        top_chunks = relevant_chunks[:3]  # Top 3 most relevant
+        yield "**Here's what I found about your question:**\n\n"
         
-        for i, (chunk, score) in enumerate(top_chunks, 1):
-            # Clean and format the chunk
-            clean_chunk = self._clean_text_chunk(chunk)
-            answer += f"{i}. {clean_chunk}\n"
+        # Add the most relevant information first (top 3)
+        for i, (chunk, score) in enumerate(relevant_chunks[:3], 1):
+            yield f"{i}. {self._clean_text_chunk(chunk)}\n"
         
         # Add contextual insights
+        query_type = self._detect_query_type(query)
         insights = self._get_contextual_insights(query_type)
         if insights:
-            answer += f"\n**Quick insights:** {insights}"
+            yield f"\n**Quick insights:** {insights}"
         
         # Add follow-up suggestions
         follow_ups = self._get_follow_up_suggestions(query_type)
         if follow_ups:
-            answer += f"\n\n**You might also want to know:** {follow_ups}"
+            yield f"\n\n**You might also want to know:** {follow_ups}"
         
         # Add source attribution
-        answer += "\n\n*This information comes from Jupiter's official website.*"
-        
-        return answer
+        yield "\n\n*This information comes from Jupiter's official website.*"
     
     def _detect_query_type(self, query: str) -> str:
         """Detect the type of financial query"""
-        query_lower = query.lower()
+        tokens = set(tokenize_query(query))
         
-        for query_type, pattern in self.query_patterns.items():
-            if re.search(pattern, query_lower):
+        for query_type, keywords in self.query_keywords.items():
+            if tokens & keywords:
                 return query_type
         
         return "general"
     
     def _clean_text_chunk(self, chunk: str) -> str:
         """Clean and format text chunks"""
-        chunk = re.sub(r'\s+', ' ', chunk.strip())
+        chunk = WHITESPACE.sub(' ', chunk.strip())
         
         if len(chunk) > 250:
-            sentences = re.split(r'[.!?]', chunk[:250])
+            sentences = SENTENCE_END.split(chunk[:250])
             if len(sentences) > 1:
                 chunk = '. '.join(sentences[:-1]) + '.'
             else:
@@ -0,0 +1,120 @@
+"""
+BM25 / BM25+ ranking for Jupiter.money RAG Bot
+"""
+
+from typing import Optional
+import numpy as np
+from config.settings import BM25_K1, BM25_B, BM25_PLUS_DELTA
+from .sparse import CSRMatrix
+
+RANKING_MODES = ("tfidf", "bm25", "bm25+")
+
+
+class BM25Scorer:
+    """
+    Okapi BM25 document weights over the TF storage of the TF-IDF path
+    
+    Every (document, term) weight is precomputed at index time:
+    
+        idf(t) * (tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(d) / avg_len)) + delta)
+    
+    with the smoothed, always positive idf(t) = log(1 + (N - df + 0.5) / (df + 0.5)).
+    A query then only sums weights from the inverted index, exactly like
+    cosine scoring, so BM25 adds no per-query cost. ``delta > 0`` gives
+    BM25+, which keeps long documents from scoring below documents that do
+    not contain the term at all.
+    """
+    
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B, delta: float = 0.0):
+        self.k1 = k1
+        self.b = b
+        self.delta = delta
+    
+    @classmethod
+    def for_ranking(cls, ranking: str) -> Optional["BM25Scorer"]:
+        """
+        Scorer for a ranking mode name
+        
+        Args:
+            ranking: One of RANKING_MODES
+        
+        Returns:
+            BM25Scorer, or None for plain TF-IDF cosine ranking
+        
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if ranking not in RANKING_MODES:
+            raise ValueError(f"Unknown ranking mode {ranking!r}, expected one of {RANKING_MODES}")
+        if ranking == "tfidf":
+            return None
+        return cls(delta=BM25_PLUS_DELTA if ranking == "bm25+" else 0.0)
+    
+    def params(self) -> dict:
+        """Parameters that determine the stored weights"""
+        return {"k1": self.k1, "b": self.b, "delta": self.delta}
+    
+    def idf(self, doc_freq: np.ndarray, total_docs: int) -> np.ndarray:
+        """
+        Smoothed BM25 IDF
+        
+        Args:
+            doc_freq: Document frequency per vocabulary term
+            total_docs: Number of live documents
+        
+        Returns:
+            IDF per term (positive even for terms in every document)
+        """
+        doc_freq = np.asarray(doc_freq, dtype=np.float64)
+        return np.log1p((total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    
+    @staticmethod
+    def average_length(doc_lengths: np.ndarray, total_docs: int) -> float:
+        """Mean token count of the live documents (1 for an empty corpus)"""
+        avg_length = float(np.sum(doc_lengths, dtype=np.float64)) / total_docs if total_docs > 0 else 0.0
+        return avg_length if avg_length > 0 else 1.0
+    
+    def weight_matrix(self, tf_matrix: CSRMatrix, doc_lengths: np.ndarray, idf: np.ndarray,
+                      total_docs: int, avg_length: Optional[float] = None) -> CSRMatrix:
+        """
+        BM25 weights for every stored term frequency
+        
+        Args:
+            tf_matrix: Length-normalized TF rows (``freq / len(d)``)
+            doc_lengths: Token count of every row's document (0 for removed ones)
+            idf: BM25 IDF per vocabulary term
+            total_docs: Number of live documents
+            avg_length: Mean document length of the corpus, required when the
+                rows are only some of its documents (computed from ``doc_lengths`` if not given)
+        
+        Returns:
+            CSRMatrix with the same structure as ``tf_matrix``
+        """
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+        if avg_length is None:
+            avg_length = self.average_length(doc_lengths, total_docs)
+        
+        rows = tf_matrix.row_ids
+        lengths = doc_lengths[rows]
+        counts = tf_matrix.data * lengths
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+        saturated = counts * (self.k1 + 1.0) / (counts + norm)
+        data = idf[tf_matrix.indices] * (saturated + self.delta)
+        return CSRMatrix(tf_matrix.indptr, tf_matrix.indices, data, tf_matrix.shape)
+
+
+def ranking_params(ranking: str) -> dict:
+    """
+    Ranking mode and the parameters its index weights depend on
+    
+    Args:
+        ranking: One of RANKING_MODES
+        
+    Returns:
+        Dict that changes whenever stored weights would change
+    """
+    params = {"ranking": ranking}
+    scorer = BM25Scorer.for_ranking(ranking)
+    if scorer is not None:
+        params.update(scorer.params())
+    return params
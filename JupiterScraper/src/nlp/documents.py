@@ -0,0 +1,72 @@
+"""
+Document overlay for incremental index updates in Jupiter.money RAG Bot
+"""
+
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Optional
+
+
+class DocumentOverlay(Sequence):
+    """
+    Documents of an index with a batch of changes laid over them
+    
+    The base sequence (e.g. a memory-mapped ChunkStore) is neither copied
+    nor decoded: ``changes`` holds the new text of replaced ids (None for
+    removed ones) and ``additions`` extend the ids past its end. Iterating
+    streams the merged documents, e.g. into a new ChunkStore when the
+    updated index is saved. An overlay of an overlay shares its base, so
+    lookups stay one level deep however many batches are applied.
+    """
+    
+    def __init__(self, base: Sequence, changes: Dict[int, Optional[str]] = None,
+                 additions: List[Optional[str]] = ()):
+        """
+        Args:
+            base: Documents before the batch
+            changes: New text (or None if removed) by existing id
+            additions: Documents appended after the existing ids
+        """
+        changes = dict(changes or {})
+        if isinstance(base, DocumentOverlay):
+            # Fold the earlier batch in: its additions become plain ids past the base
+            merged = dict(base.changes)
+            appended = list(base.additions)
+            for i, text in changes.items():
+                if i < len(base.base):
+                    merged[i] = text
+                else:
+                    appended[i - len(base.base)] = text
+            base, changes, additions = base.base, merged, appended + list(additions)
+        self.base = base
+        self.changes = changes
+        self.additions = list(additions)
+    
+    def __len__(self) -> int:
+        return len(self.base) + len(self.additions)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document id out of range")
+        if i in self.changes:
+            return self.changes[i]
+        if i >= len(self.base):
+            return self.additions[i - len(self.base)]
+        return self.base[i]
+    
+    def __iter__(self) -> Iterator[Optional[str]]:
+        for i, text in enumerate(self.base):
+            yield self.changes[i] if i in self.changes else text
+        yield from self.additions
+    
+    def count(self, value) -> int:
+        """Occurrences of a document (removed ones, None, without reading unchanged ids)"""
+        if value is not None:
+            return super().count(value)
+        removed = self.base.count(None) + self.additions.count(None)
+        for i, text in self.changes.items():
+            removed += (text is None) - (self.base[i] is None)
+        return removed
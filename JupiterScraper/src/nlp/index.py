@@ -0,0 +1,364 @@
+"""
+Inverted index with MaxScore top-K pruning for Jupiter.money RAG Bot
+"""
+
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from .sparse import CSRMatrix
+from src.metrics import METRICS
+from config.settings import INDEX_PRECISION, RERANK_CANDIDATES
+
+# Storage of the posting weights that queries scan
+PRECISIONS = ("float64", "float32", "uint8")
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, without a full sort
+    
+    Args:
+        scores: Score per item
+        k: Number of indices to return
+        
+    Returns:
+        Indices ordered by descending score (ties keep index order)
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    
+    if k < len(scores):
+        candidates = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        candidates = np.arange(len(scores))
+    
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class InvertedIndex:
+    """
+    Term -> posting list index over L2-normalized document vectors
+    
+    Each posting list holds ascending document ids with their precomputed
+    weights, plus the list's maximum weight. Queries use MaxScore: lists
+    are processed in order of decreasing upper bound, and once the bounds
+    of the remaining lists can no longer lift an unseen document into the
+    current top-K, those lists are only probed for existing candidates.
+    Query cost therefore follows the postings touched, not corpus size.
+    
+    With ``precision`` "float32" or "uint8", queries scan compact weights
+    (uint8 with one scale per posting list, whose largest weight maps to
+    255), keep the best ``rerank`` candidates and re-score only those at
+    full precision, so the final ranking and scores are exact unless a true
+    top-k document falls outside the candidates. Given ``forward``, the
+    re-rank reads the candidates' rows from it and the full-precision
+    postings are dropped, so a compact index is smaller than a float64 one.
+    """
+    
+    # Slack for floating point summation order when comparing to the threshold
+    EPSILON = 1e-12
+    
+    def __init__(self, term_ptr: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray, n_docs: int,
+                 max_weights: np.ndarray = None, precision: str = INDEX_PRECISION,
+                 compact: np.ndarray = None, scales: np.ndarray = None, rerank: int = RERANK_CANDIDATES,
+                 forward: Callable[[np.ndarray], CSRMatrix] = None):
+        """
+        Args:
+            term_ptr: Start of every posting list (plus the end of the last one)
+            doc_ids: Document ids of all postings
+            weights: Full-precision weights of all postings (None for a saved
+                compact index with ``forward``)
+            n_docs: Number of documents
+            max_weights: Largest weight of every list (computed if not given)
+            precision: Weights scanned by queries: "float64", "float32" or "uint8"
+            compact: Saved compact weights (computed from ``weights`` if not given)
+            scales: Saved per-list scales of "uint8" weights
+            rerank: Candidates re-scored at full precision for compact precisions
+            forward: Full-precision weights of given document ids as CSR rows,
+                used by the re-rank of compact precisions instead of ``weights``
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+        if weights is None and (precision == "float64" or forward is None or compact is None):
+            raise ValueError("Full-precision weights are needed to scan or re-rank this index")
+        self.term_ptr = np.asarray(term_ptr, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self.n_docs = int(n_docs)
+        self.max_weights = self._max_weights() if max_weights is None else np.asarray(max_weights)
+        self.precision = precision
+        self.rerank = max(1, rerank)
+        if compact is None:
+            compact, scales = self._compact_weights()
+        self.compact = compact
+        self.scales = scales
+        self.forward = forward
+        if forward is not None and not self.exact:
+            # The re-rank reads forward rows, so the full-precision postings can go
+            self.weights = None
+    
+    @classmethod
+    def from_matrix(cls, doc_matrix: CSRMatrix, normalize: bool = True, precision: str = INDEX_PRECISION,
+                    forward: Callable[[np.ndarray], CSRMatrix] = None) -> "InvertedIndex":
+        """
+        Build posting lists from a document-term CSR matrix
+        
+        Args:
+            doc_matrix: Document weights (TF-IDF vectors or BM25 weights)
+            normalize: L2-normalize rows first, for cosine scoring
+            precision: Weights scanned by queries (see the class docstring)
+            forward: Rows of the (normalized) matrix by document id, for the re-rank
+            
+        Returns:
+            InvertedIndex over the matrix columns
+        """
+        normalized = doc_matrix.normalize_rows() if normalize else doc_matrix
+        n_terms = normalized.shape[1]
+        
+        # Stable sort by term keeps document ids ascending inside each list
+        order = np.argsort(normalized.indices, kind='stable')
+        term_counts = np.bincount(normalized.indices, minlength=n_terms)
+        term_ptr = np.concatenate(([0], np.cumsum(term_counts)))
+        
+        return cls(term_ptr, normalized.row_ids[order], normalized.data[order], normalized.shape[0],
+                   precision=precision, forward=forward)
+    
+    def with_precision(self, precision: str) -> "InvertedIndex":
+        """
+        The same postings scanned at another precision (arrays are shared)
+        
+        Raises:
+            ValueError: If the full-precision postings were dropped
+        """
+        if self.weights is None:
+            raise ValueError("Full-precision postings of a compact index were dropped")
+        return InvertedIndex(self.term_ptr, self.doc_ids, self.weights, self.n_docs, self.max_weights,
+                             precision=precision, rerank=self.rerank)
+    
+    def _compact_weights(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Weights scanned by queries and, for "uint8", the scale of every posting list"""
+        if self.precision == "float64":
+            return self.weights, None
+        if self.precision == "float32":
+            return self.weights.astype(np.float32), None
+        
+        # Weights are non-negative, so a list's largest weight maps to 255
+        scales = self.max_weights / 255
+        divisors = np.repeat(scales, np.diff(self.term_ptr))
+        quantized = np.zeros(len(self.weights))
+        np.divide(self.weights, divisors, out=quantized, where=divisors > 0)
+        return np.clip(np.rint(quantized), 0, 255).astype(np.uint8), scales
+    
+    @property
+    def exact(self) -> bool:
+        """Queries scan the full-precision weights (no re-ranking)"""
+        return self.precision == "float64"
+    
+    def nbytes(self) -> int:
+        """Bytes of the weights scanned by queries"""
+        return self.compact.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+    
+    def weight_nbytes(self) -> int:
+        """Bytes of all posting weights held: compact, scales and any full-precision ones"""
+        full = self.weights.nbytes if self.weights is not None and not self.exact else 0
+        return self.nbytes() + full
+    
+    def _max_weights(self) -> np.ndarray:
+        """Maximum weight of every posting list (0 for empty lists)"""
+        n_terms = len(self.term_ptr) - 1
+        max_weights = np.zeros(n_terms)
+        starts = self.term_ptr[:-1]
+        nonempty = np.flatnonzero(np.diff(self.term_ptr) > 0)
+        if len(nonempty):
+            max_weights[nonempty] = np.maximum.reduceat(self.weights, starts[nonempty])
+        return max_weights
+    
+    @property
+    def n_terms(self) -> int:
+        """Number of posting lists"""
+        return len(self.term_ptr) - 1
+    
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Document ids and full-precision weights of one term"""
+        start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+    
+    def _scan_postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Document ids and compact weights of one term"""
+        start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+        return self.doc_ids[start:end], self.compact[start:end]
+    
+    def search(self, term_ids: np.ndarray, query_weights: np.ndarray, k: int,
+               normalize: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k scores (dot products with the posting weights) for a sparse query
+        
+        Args:
+            term_ids: Query term ids
+            query_weights: Query weights
+            k: Number of results
+            normalize: L2-normalize the query weights, for cosine scoring
+            
+        Returns:
+            Tuple of (document ids, scores), best first. Only documents
+            sharing at least one term with the query are returned.
+        """
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        query_weights = np.asarray(query_weights, dtype=np.float64)
+        
+        # Terms added to the vocabulary after this index was built have no postings
+        known = term_ids < self.n_terms
+        term_ids, query_weights = term_ids[known], query_weights[known]
+        norm = np.linalg.norm(query_weights)
+        if k <= 0 or norm == 0:
+            return np.array([], dtype=np.int64), np.array([])
+        if normalize:
+            query_weights = query_weights / norm
+        
+        bounds = query_weights * self.max_weights[term_ids]
+        order = np.argsort(-bounds, kind='stable')
+        remaining = float(bounds.sum())
+        # Compact weights: keep enough candidates for the full-precision re-rank
+        depth = k if self.exact else max(k, self.rerank)
+        factors = query_weights if self.scales is None else query_weights * self.scales[term_ids]
+        
+        cand_docs = np.array([], dtype=np.int64)
+        cand_scores = np.array([])
+        
+        for pos in order:
+            term_bound = bounds[pos]
+            remaining -= term_bound
+            if term_bound <= 0:
+                continue
+            docs, weights = self._scan_postings(term_ids[pos])
+            contrib = weights * factors[pos]
+            
+            threshold = self._threshold(cand_scores, depth)
+            if threshold is not None and term_bound + remaining < threshold - self.EPSILON:
+                # Non-essential list: unseen documents can no longer make the
+                # top-k, so drop hopeless candidates and probe the rest
+                keep = cand_scores + term_bound + remaining >= threshold - self.EPSILON
+                cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+                
+                slots = np.searchsorted(docs, cand_docs)
+                slots[slots == len(docs)] = 0
+                hits = docs[slots] == cand_docs
+                cand_scores[hits] += contrib[slots[hits]]
+            else:
+                # Essential list: merge every posting into the candidates
+                merged = np.concatenate((cand_docs, docs))
+                cand_docs, inverse = np.unique(merged, return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=np.concatenate((cand_scores, contrib)),
+                                          minlength=len(cand_docs))
+        
+        with METRICS.span("sort"):
+            top = top_k_indices(cand_scores, depth)
+        if self.exact:
+            return cand_docs[top], cand_scores[top]
+        return self._rerank(term_ids, query_weights, cand_docs[top], k)
+    
+    def search_batch(self, queries: List[Tuple[np.ndarray, np.ndarray]], k: int,
+                     normalize: bool = True) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k scores for many sparse queries with one matrix product
+        
+        The posting lists are the document matrix in term-major (CSC) form,
+        so the (queries x documents) score block is the sparse query matrix
+        times its transpose: every (query, term) pair scales that term's
+        postings, and one ``bincount`` sums them into the block. Work follows
+        the postings touched, as in ``search``, but without a Python loop
+        per query term.
+        
+        Args:
+            queries: One (term ids, weights) pair per query
+            k: Number of results per query
+            normalize: L2-normalize each query's weights, for cosine scoring
+            
+        Returns:
+            One (document ids, scores) pair per query, like ``search``
+        """
+        n_queries = len(queries)
+        if n_queries == 0:
+            return []
+        
+        # Sparse query matrix as (query, term, weight) triples
+        query_rows, term_ids, query_weights, normalized = [], [], [], []
+        for j, (terms, weights) in enumerate(queries):
+            terms = np.asarray(terms, dtype=np.int64)
+            weights = np.asarray(weights, dtype=np.float64)
+            known = terms < self.n_terms
+            terms, weights = terms[known], weights[known]
+            norm = np.linalg.norm(weights)
+            if normalize and norm > 0:
+                weights = weights / norm
+            query_rows.append(np.full(len(terms), j, dtype=np.int64))
+            term_ids.append(terms)
+            query_weights.append(weights)
+            normalized.append((terms, weights))
+        query_rows = np.concatenate(query_rows)
+        term_ids = np.concatenate(term_ids)
+        query_weights = np.concatenate(query_weights)
+        
+        # Gather the postings of every (query, term) pair
+        starts = self.term_ptr[term_ids]
+        lengths = self.term_ptr[term_ids + 1] - starts
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        positions = offsets + np.arange(total)
+        
+        factors = query_weights if self.scales is None else query_weights * self.scales[term_ids]
+        cells = np.repeat(query_rows, lengths) * self.n_docs + self.doc_ids[positions]
+        contrib = self.compact[positions] * np.repeat(factors, lengths)
+        scores = np.bincount(cells, weights=contrib, minlength=n_queries * self.n_docs)
+        scores = scores.reshape(n_queries, self.n_docs)
+        
+        depth = k if self.exact else max(k, self.rerank)
+        results = []
+        for row, (terms, weights) in zip(scores, normalized):
+            top = top_k_indices(row, depth)
+            top = top[row[top] > 0]
+            results.append((top, row[top]) if self.exact else self._rerank(terms, weights, top, k))
+        return results
+    
+    def _rerank(self, term_ids: np.ndarray, query_weights: np.ndarray, docs: np.ndarray,
+                k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-score candidates at full precision and keep the top k
+        
+        Args:
+            term_ids: Query term ids
+            query_weights: Query weights, already normalized if scoring is cosine
+            docs: Candidate document ids from the compact scan
+            k: Number of results
+            
+        Returns:
+            Tuple of (document ids, exact scores), best first
+        """
+        with METRICS.span("rerank"):
+            # Ascending ids break ties the way the exact scan does
+            docs = np.sort(docs)
+            if self.weights is None:
+                query = np.zeros(self.n_terms)
+                query[term_ids] = query_weights
+                scores = self.forward(docs).dot(query)
+                top = top_k_indices(scores, k)
+                return docs[top], scores[top]
+            
+            scores = np.zeros(len(docs))
+            for term, weight in zip(term_ids.tolist(), query_weights.tolist()):
+                post_docs, post_weights = self.postings(term)
+                if not len(post_docs):
+                    continue
+                slots = np.searchsorted(post_docs, docs)
+                slots[slots == len(post_docs)] = 0
+                hits = post_docs[slots] == docs
+                scores[hits] += post_weights[slots[hits]] * weight
+            top = top_k_indices(scores, k)
+        return docs[top], scores[top]
+    
+    @staticmethod
+    def _threshold(scores: np.ndarray, k: int):
+        """Current k-th best partial score, or None while fewer than k candidates"""
+        if len(scores) < k:
+            return None
+        return float(np.partition(scores, len(scores) - k)[len(scores) - k])
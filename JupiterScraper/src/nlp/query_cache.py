@@ -0,0 +1,146 @@
+"""
+Query result cache for Jupiter.money RAG Bot
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional, Tuple
+from config.settings import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from .tokenizer import WORD_PATTERN
+
+
+class CachedAnswer(NamedTuple):
+    """Retrieval result and rendered answer for one question"""
+    chunk_ids: Tuple[int, ...]
+    scores: Tuple[float, ...]
+    answer: str
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key form of a question: lowercase words, single spaces, no punctuation
+    
+    Args:
+        query: User question
+    
+    Returns:
+        Normalized question text
+    """
+    return " ".join(WORD_PATTERN.findall(query.lower()))
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of answers with a time-to-live
+    
+    Entries are keyed on the normalized question and the version of the
+    index that produced them. ``set_version`` (called when an index is
+    swapped in) drops every entry from other versions, so a data refresh
+    never serves stale answers. Lookups and stores from any other version
+    (requests still finishing on the old index) are misses that leave the
+    cache alone. The cache is shared by all sessions, so access is guarded
+    by a lock.
+    """
+    
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries: Maximum number of cached answers (least recently used are evicted)
+            ttl: Seconds an answer stays valid (0 or less disables expiry)
+            clock: Monotonic time source
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.version: Optional[Hashable] = None
+        self._entries: "OrderedDict[str, Tuple[float, CachedAnswer]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, query: str, version: Hashable) -> Optional[CachedAnswer]:
+        """
+        Look up a cached answer
+        
+        Args:
+            query: User question (normalized here)
+            version: Version of the index currently serving queries
+        
+        Returns:
+            CachedAnswer, or None on a miss, an expired entry or a version
+            other than the one the cache serves
+        """
+        key = normalize_query(query)
+        with self._lock:
+            if self.version is None:
+                self.version = version
+            elif version != self.version:
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and self.clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, query: str, version: Hashable, answer: CachedAnswer) -> None:
+        """
+        Store an answer produced by the given index version
+        
+        Answers from a version other than the one the cache currently
+        serves (a request that finished on an index swapped out meanwhile)
+        are dropped, so they can neither leak into nor wipe the new version.
+        
+        Args:
+            query: User question (normalized here)
+            version: Version of the index that produced the answer
+            answer: Result to cache
+        """
+        if self.max_entries <= 0:
+            return
+        
+        key = normalize_query(query)
+        with self._lock:
+            if self.version is None:
+                self.version = version
+            elif version != self.version:
+                return
+            self._entries[key] = (self.clock(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def set_version(self, version: Hashable) -> None:
+        """Serve a new index version, dropping the answers of any other one"""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+    
+    def clear(self) -> None:
+        """Drop every cached answer (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,11 +2,23 @@
 Enhanced Similarity Search for Jupiter.money RAG Bot
 """
 
+import copy
 import numpy as np
 import re
-from typing import List, Tuple
+import warnings
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .documents import DocumentOverlay
 from .vectorizer import EnhancedTFIDFVectorizer
-from config.settings import MIN_SIMILARITY_THRESHOLD
+from .index import InvertedIndex
+from .sparse import CSRMatrix
+from .bm25 import BM25Scorer, ranking_params
+from .tokenizer import tokenize, tokenize_query
+from src.metrics import METRICS
+from config.settings import (
+    MIN_SIMILARITY_THRESHOLD, SPARSE_MIN_DOCUMENTS, TOP_K,
+    HYBRID_COSINE_WEIGHT, HYBRID_OVERLAP_WEIGHT, RANKING, BATCH_QUERY_BLOCK, BATCH_SCORE_CELLS,
+    INDEX_PRECISION
+)
 
 
 class EnhancedSimilaritySearch:
@@ -14,44 +26,403 @@ class EnhancedSimilaritySearch:
     Enhanced similarity search using multiple algorithms
     """
     
-    def __init__(self):
+    def __init__(self, cosine_weight: float = HYBRID_COSINE_WEIGHT, overlap_weight: float = HYBRID_OVERLAP_WEIGHT,
+                 ranking: str = RANKING, precision: str = INDEX_PRECISION):
         self.vectorizer = EnhancedTFIDFVectorizer()
+        
+        # Ranking used by search(): TF-IDF cosine, or BM25 weights in the same index
+        self.ranking = ranking
+        self.bm25 = BM25Scorer.for_ranking(ranking)
+        # Posting weights scanned by search(): full precision, or compact plus an exact re-rank
+        self.precision = precision
+        self.cosine_weight = cosine_weight
+        self.overlap_weight = overlap_weight
+        self.index = None
+        self.tf_matrix = None
+        self.doc_matrix = None
+        self._doc_norms = None
+        self.documents = []
+        
+        # Computed once at index time so queries never re-tokenize documents:
+        # a binary document x token matrix over every token seen (not just the
+        # capped TF-IDF vocabulary) plus token counts per document
+        self.token_ids: Dict[str, int] = {}
+        self.presence_matrix = None
+        self.doc_lengths = np.zeros(0, dtype=np.int64)
         self.is_fitted = False
     
-    def fit(self, documents: List[str]):
-        """Fit the vectorizer on documents"""
-        self.vectorizer.fit(documents)
-        self.is_fitted = True
+    def fit(self, documents: Iterable[str]):
+        """Fit the vectorizer on documents (None keeps the id of a removed one) and build the inverted index"""
+        with METRICS.span("fit"):
+            self.documents = list(documents)
+            with METRICS.span("tokenize"):
+                term_counts = [self.vectorizer.analyze(doc) if doc is not None else None for doc in self.documents]
+            self.token_ids = {}
+            rows = [self._presence_row(counts or (), self.token_ids) for counts in term_counts]
+            self.presence_matrix = CSRMatrix.from_rows(rows, len(self.token_ids))
+            self.doc_lengths = np.array([sum(counts.values()) if counts else 0 for counts in term_counts],
+                                        dtype=np.int64)
+            
+            self.tf_matrix = self.vectorizer.fit_counts(term_counts)
+            self.doc_matrix = self.vectorizer.apply_idf(self.tf_matrix)
+            self._doc_norms = None
+            self.index = self._build_index(self.tf_matrix, self.doc_matrix, self.doc_lengths)
+            self.is_fitted = True
+    
+    def add_documents(self, documents: List[str]) -> List[int]:
+        """
+        Add documents without refitting the corpus
+        
+        Args:
+            documents: New document texts
+            
+        Returns:
+            Ids assigned to the new documents
+        """
+        start = len(self.documents)
+        self._update({}, list(documents))
+        return list(range(start, start + len(documents)))
+    
+    def remove_documents(self, doc_ids: Iterable[int]) -> None:
+        """
+        Remove documents; their ids are never reused
+        
+        Args:
+            doc_ids: Ids of documents to drop
+        """
+        self._update({doc_id: None for doc_id in doc_ids}, [])
+    
+    def replace_documents(self, doc_ids: List[int], documents: List[str]) -> None:
+        """
+        Replace the text of existing documents, keeping their ids
+        
+        Args:
+            doc_ids: Ids of documents to replace
+            documents: New texts, one per id
+        """
+        if len(doc_ids) != len(documents):
+            raise ValueError("doc_ids and documents must have the same length")
+        self._update(dict(zip(doc_ids, documents)), [])
+    
+    def update_documents(self, changes: Dict[int, Optional[str]], additions: List[str] = ()) -> List[int]:
+        """
+        Replace, remove and add documents in one batch
+        
+        Same as ``replace_documents``, ``remove_documents`` and
+        ``add_documents`` together, but the index is rebuilt only once.
+        
+        Args:
+            changes: New text (or None to remove) by existing document id
+            additions: Texts of new documents
+            
+        Returns:
+            Ids assigned to the new documents
+        """
+        start = len(self.documents)
+        additions = list(additions)
+        self._update(dict(changes), additions)
+        return list(range(start, start + len(additions)))
+    
+    def _update(self, changes: Dict[int, Optional[str]], additions: List[str]) -> None:
+        """
+        Apply one batch of replacements/removals (None) and additions
+        
+        Document frequencies and IDF are updated from the changed texts only.
+        TF and presence rows of untouched documents are spliced in as array
+        slices, and the documents become an overlay of the changed texts on
+        the old ones, so nothing is done per untouched document in Python.
+        The batch ends with one vectorized re-weighting, row normalization
+        and index build, then the new state is swapped in. Only the changed
+        texts are tokenized, unless the vocabulary cap admits a term
+        untouched documents already contain: then the whole corpus is refitted.
+        """
+        if not self.is_fitted:
+            self.fit(additions)
+            return
+        
+        changes = {i: text for i, text in changes.items()
+                   if 0 <= i < len(self.documents) and self.documents[i] is not None}
+        tokens = list(self.token_ids)
+        removed = [self._token_set(i, tokens) for i in changes]
+        added = [self.vectorizer.analyze(text) for text in changes.values() if text is not None]
+        added += [self.vectorizer.analyze(text) for text in additions]
+        # Update a copy, so queries keep a vocabulary matching the index until the swap
+        vectorizer = copy.copy(self.vectorizer)
+        update = vectorizer.partial_fit(added, removed)
+        documents = DocumentOverlay(self.documents, changes, additions)
+        if update is None:
+            self.fit(documents)
+            return
+        new_rows, remap = update
+        
+        tf_matrix = self.tf_matrix
+        if remap is not None:
+            tf_matrix = tf_matrix.remap_columns(remap, vectorizer.get_vocabulary_size())
+        token_ids = dict(self.token_ids)
+        empty = (np.zeros(0, dtype=np.int32), np.zeros(0))
+        
+        # New rows of the changed ids, then of the additions
+        tf_rows, presence_rows, lengths = [], [], []
+        new_row = 0
+        for text in list(changes.values()) + additions:
+            if text is None:
+                tf_rows.append(empty)
+                presence_rows.append(empty)
+                lengths.append(0)
+                continue
+            word_freq = added[new_row]
+            tf_rows.append(new_rows.row(new_row))
+            presence_rows.append(self._presence_row(word_freq, token_ids))
+            lengths.append(sum(word_freq.values()))
+            new_row += 1
+        
+        changed = len(changes)
+        tf_matrix = tf_matrix.splice_rows(dict(zip(changes, tf_rows)), tf_rows[changed:],
+                                          vectorizer.get_vocabulary_size())
+        presence = self.presence_matrix.splice_rows(dict(zip(changes, presence_rows)), presence_rows[changed:],
+                                                    len(token_ids))
+        # Presence entries are all 1, so they stay a zero-stride view
+        presence_matrix = CSRMatrix(presence.indptr, presence.indices,
+                                    np.broadcast_to(np.float64(1), presence.indices.shape), presence.shape)
+        doc_lengths = np.concatenate((self.doc_lengths, lengths[changed:])).astype(np.int64)
+        doc_lengths[list(changes)] = lengths[:changed]
+        doc_matrix = vectorizer.apply_idf(tf_matrix)
+        index = self._build_index(tf_matrix, doc_matrix, doc_lengths, vectorizer)
+        
+        # Queries read the index before the documents, so publish documents first
+        self.documents = documents
+        self.token_ids = token_ids
+        self.presence_matrix = presence_matrix
+        self.doc_lengths = doc_lengths
+        self.tf_matrix = tf_matrix
+        self.doc_matrix = doc_matrix
+        self._doc_norms = None
+        self.vectorizer = vectorizer
+        self.index = index
+    
+    def _build_index(self, tf_matrix: CSRMatrix, doc_matrix: CSRMatrix, doc_lengths: np.ndarray,
+                     vectorizer: Optional[EnhancedTFIDFVectorizer] = None) -> InvertedIndex:
+        """Posting lists for the configured ranking"""
+        vectorizer = vectorizer or self.vectorizer
+        forward = None
+        if self.precision != "float64":
+            forward = self.forward_weights(tf_matrix, doc_matrix, doc_lengths, vectorizer)
+        if self.bm25 is None:
+            return InvertedIndex.from_matrix(doc_matrix, precision=self.precision, forward=forward)
+        
+        total_docs = vectorizer.total_docs
+        idf = self.bm25.idf(vectorizer.doc_freq_array(), total_docs)
+        weights = self.bm25.weight_matrix(tf_matrix, doc_lengths, idf, total_docs)
+        return InvertedIndex.from_matrix(weights, normalize=False, precision=self.precision, forward=forward)
+    
+    def forward_weights(self, tf_matrix: CSRMatrix, doc_matrix: CSRMatrix, doc_lengths: np.ndarray,
+                         vectorizer: EnhancedTFIDFVectorizer):
+        """
+        Posting weights of chosen documents, recomputed from the document-major matrices
+        
+        Compact indexes re-rank their candidates from these rows, so they
+        keep no full-precision copy of the postings.
+        
+        Returns:
+            Callable mapping document ids to a CSRMatrix of their exact weights
+        """
+        if self.bm25 is None:
+            # Same arithmetic as CSRMatrix.normalize_rows, so scores match a float64 index
+            norms = doc_matrix.row_norms()
+            norms[norms == 0] = 1.0
+            
+            def weights(docs: np.ndarray) -> CSRMatrix:
+                rows = doc_matrix.take_rows(docs)
+                return CSRMatrix(rows.indptr, rows.indices, rows.data / norms[docs][rows.row_ids], rows.shape)
+            return weights
+        
+        bm25 = self.bm25
+        total_docs = vectorizer.total_docs
+        idf = bm25.idf(vectorizer.doc_freq_array(), total_docs)
+        avg_length = bm25.average_length(doc_lengths, total_docs)
+        return lambda docs: bm25.weight_matrix(tf_matrix.take_rows(docs), doc_lengths[docs], idf,
+                                               total_docs, avg_length)
+    
+    def ranking_params(self) -> dict:
+        """Ranking mode and parameters the index weights were built with"""
+        return ranking_params(self.ranking)
+    
+    @staticmethod
+    def _presence_row(counts, token_ids: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Binary token-presence row, assigning ids to unseen tokens"""
+        ids = np.array(sorted(token_ids.setdefault(token, len(token_ids)) for token in counts), dtype=np.int32)
+        return ids, np.ones(len(ids))
+    
+    def _token_set(self, doc_id: int, tokens: List[str] = None) -> set:
+        """Distinct tokens of a fitted document, read back from the presence matrix"""
+        tokens = tokens if tokens is not None else list(self.token_ids)
+        ids, _ = self.presence_matrix.row(doc_id)
+        return {tokens[j] for j in ids}
+    
+    def search(self, query: str, top_k: int = TOP_K) -> List[Tuple[int, float, str]]:
+        """
+        Top-k matches for a query from the inverted index
+        
+        Only posting lists of the query terms are touched, and the ranking
+        matches exhaustive scoring over the fitted documents: cosine for
+        TF-IDF, or the sum of precomputed term weights for BM25.
+        
+        Args:
+            query: User question
+            top_k: Number of results
+            
+        Returns:
+            List of (document index, score, document), best first
+        """
+        if not self.is_fitted:
+            ranked = sorted(self._fallback_similarity(query, self.documents), key=lambda x: x[1], reverse=True)
+            return ranked[:top_k]
+        
+        with METRICS.span("vectorize_query"):
+            if self.bm25 is None:
+                term_ids, weights = self.vectorizer.query_weights(query)
+            else:
+                term_ids, weights = self.vectorizer.query_counts(query)
+        with METRICS.span("score"):
+            doc_ids, scores = self.index.search(term_ids, weights, top_k, normalize=self.bm25 is None)
+        return [(int(i), float(score), self.documents[i]) for i, score in zip(doc_ids, scores)]
+    
+    def search_batch(self, queries: List[str], k: int = TOP_K,
+                     block_size: int = None) -> List[List[Tuple[int, float, str]]]:
+        """
+        Top-k matches for many queries, scored a block of queries at a time
+        
+        Each block is one (queries x documents) matrix product over the
+        inverted index, instead of one pass per query. Results match
+        ``search`` for every query.
+        
+        Args:
+            queries: User questions
+            k: Number of results per query
+            block_size: Queries scored together; by default as many as fit
+                BATCH_SCORE_CELLS dense scores, capped at BATCH_QUERY_BLOCK
+            
+        Returns:
+            One result list per query, each like ``search``
+        """
+        if not self.is_fitted:
+            return [self.search(query, k) for query in queries]
+        
+        if block_size is None:
+            block_size = min(BATCH_QUERY_BLOCK, BATCH_SCORE_CELLS // max(len(self.documents), 1))
+        block_size = max(block_size, 1)
+        
+        results = []
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            with METRICS.span("vectorize_query"):
+                if self.bm25 is None:
+                    rows = [self.vectorizer.query_weights(query) for query in block]
+                else:
+                    rows = [self.vectorizer.query_counts(query) for query in block]
+            
+            with METRICS.span("score"):
+                ranked = self.index.search_batch(rows, k, normalize=self.bm25 is None)
+            for doc_ids, scores in ranked:
+                results.append([(int(i), float(score), self.documents[i]) for i, score in zip(doc_ids, scores)])
+        return results
     
     def calculate_similarity(self, query: str, documents: List[str]) -> List[Tuple[int, float, str]]:
-        """Calculate similarity between query and documents using multiple metrics"""
+        """
+        Calculate similarity between query and documents using multiple metrics
+        
+        Removed documents (None) score 0 with an empty text.
+        """
         if not self.is_fitted:
             return self._fallback_similarity(query, documents)
         
         try:
-            # TF-IDF similarity
-            query_vector = self.vectorizer.transform_single(query)
-            doc_vectors = self.vectorizer.transform(documents)
-            
-            # Cosine similarity
-            similarities = []
-            for i, doc_vector in enumerate(doc_vectors):
-                # Cosine similarity
-                cos_sim = self._cosine_similarity(query_vector.flatten(), doc_vector)
-                
-                # Word overlap similarity
-                word_overlap = self._word_overlap_similarity(query, documents[i])
-                
-                # Combined similarity (weighted average)
-                combined_sim = 0.7 * cos_sim + 0.3 * word_overlap
-                
-                similarities.append((i, combined_sim, documents[i]))
-            
-            return similarities
+            scores = self.hybrid_scores(query, documents)
+            return [(i, score, documents[i] or '') for i, score in enumerate(scores.tolist())]
             
         except Exception as e:
             return self._fallback_similarity(query, documents)
     
+    def hybrid_scores(self, query: str, documents: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Weighted cosine + word-overlap score for every document at once
+        
+        For the fitted documents, cosine comes from the stored TF-IDF matrix
+        and Jaccard overlap from the stored token-presence matrix: the
+        intersection sizes are one binary matrix-vector product and the
+        union is |query| + |document| - intersection.
+        
+        Any other sequence is vectorized from its text on every call. The
+        fitted corpus is recognized by identity only, so a copy of it (e.g.
+        a list after ``IndexStore.load``) triggers a RuntimeWarning.
+        
+        Args:
+            query: User question
+            documents: Documents to score; None or ``self.documents`` use the stored matrices
+            
+        Returns:
+            Array of combined scores, one per document
+        """
+        with METRICS.span("vectorize_query"):
+            query_words = set(tokenize_query(query))
+            query_vector = self.vectorizer.transform_single(query).flatten()
+        
+        fitted = documents is None or documents is self.documents
+        if not fitted and len(documents) == len(self.documents):
+            warnings.warn("Scoring a copy of the fitted corpus from scratch; pass None or "
+                          "search.documents to use the stored matrices", RuntimeWarning, stacklevel=2)
+        
+        with METRICS.span("score"):
+            if fitted:
+                cos_sims = self._fitted_cosine_similarities(query_vector)
+                overlaps = self._fitted_word_overlaps(query_words)
+            else:
+                cos_sims = self._cosine_similarities(query_vector, documents)
+                overlaps = np.array([self._word_overlap_similarity(query_words, frozenset(tokenize(doc)))
+                                     for doc in documents], dtype=np.float64)
+        
+        # Combined similarity (weighted average)
+        return self.cosine_weight * cos_sims + self.overlap_weight * overlaps
+    
+    def _fitted_cosine_similarities(self, query_vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against the stored TF-IDF matrix"""
+        if self._doc_norms is None:
+            self._doc_norms = self.doc_matrix.row_norms()
+        norms = self._doc_norms * np.linalg.norm(query_vector)
+        
+        cos_sims = np.zeros(self.doc_matrix.shape[0])
+        np.divide(self.doc_matrix.dot(query_vector), norms, out=cos_sims, where=norms > 0)
+        return cos_sims
+    
+    def _fitted_word_overlaps(self, query_words: set) -> np.ndarray:
+        """Jaccard overlap of the query against every stored token set"""
+        overlaps = np.zeros(self.presence_matrix.shape[0])
+        if not query_words:
+            return overlaps
+        
+        query_presence = np.zeros(self.presence_matrix.shape[1])
+        query_presence[[self.token_ids[w] for w in query_words if w in self.token_ids]] = 1.0
+        
+        intersection = self.presence_matrix.dot(query_presence)
+        union = len(query_words) + np.diff(self.presence_matrix.indptr) - intersection
+        np.divide(intersection, union, out=overlaps, where=union > 0)
+        return overlaps
+    
+    def _cosine_similarities(self, query_vector: np.ndarray, documents: List[str]) -> np.ndarray:
+        """Cosine similarity of the query against every document"""
+        if len(documents) < SPARSE_MIN_DOCUMENTS:
+            doc_vectors = self.vectorizer.transform(documents)
+            return np.array([self._cosine_similarity(query_vector, v) for v in doc_vectors])
+        
+        # Large corpora: score against CSR rows so memory tracks non-zeros
+        doc_matrix = self.vectorizer.transform(documents, sparse=True)
+        dots = doc_matrix.dot(query_vector)
+        norms = doc_matrix.row_norms() * np.linalg.norm(query_vector)
+        
+        cos_sims = np.zeros(len(documents))
+        np.divide(dots, norms, out=cos_sims, where=norms > 0)
+        return cos_sims
+    
     def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calculate cosine similarity between two vectors"""
         dot_product = np.dot(vec1, vec2)
@@ -63,11 +434,8 @@ class EnhancedSimilaritySearch:
         
         return dot_product / (norm1 * norm2)
     
-    def _word_overlap_similarity(self, query: str, document: str) -> float:
-        """Calculate word overlap similarity"""
-        query_words = set(self.vectorizer._tokenize(query))
-        doc_words = set(self.vectorizer._tokenize(document))
-        
+    def _word_overlap_similarity(self, query_words: set, doc_words: frozenset) -> float:
+        """Calculate word overlap (Jaccard) similarity of two token sets"""
         if not query_words:
             return 0
         
@@ -82,6 +450,7 @@ class EnhancedSimilaritySearch:
         query_words = set(re.findall(r'\b\w+\b', query.lower()))
         
         for i, doc in enumerate(documents):
+            doc = doc or ''
             doc_words = set(re.findall(r'\b\w+\b', doc.lower()))
             
             if not query_words:
@@ -0,0 +1,187 @@
+"""
+Compressed sparse row (CSR) matrix for TF-IDF document vectors
+"""
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class CSRMatrix:
+    """
+    Pure-NumPy CSR matrix storing only the non-zero weights of each row
+    
+    Row ``i`` owns ``indices[indptr[i]:indptr[i + 1]]`` (column ids) and the
+    matching slice of ``data`` (weights), so memory scales with the number of
+    non-zeros rather than rows x columns.
+    """
+    
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, shape: Tuple[int, int]):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.shape = (int(shape[0]), int(shape[1]))
+        self._row_ids = None
+    
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[np.ndarray, np.ndarray]], n_cols: int) -> "CSRMatrix":
+        """
+        Build a matrix from per-row (column ids, weights) pairs
+        
+        Args:
+            rows: One (indices, data) pair per row
+            n_cols: Number of columns (vocabulary size)
+            
+        Returns:
+            CSRMatrix with one row per input pair
+        """
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        for i, (indices, _) in enumerate(rows):
+            indptr[i + 1] = indptr[i] + len(indices)
+        
+        if rows:
+            indices = np.concatenate([np.asarray(r[0], dtype=np.int32) for r in rows])
+            data = np.concatenate([np.asarray(r[1], dtype=np.float64) for r in rows])
+        else:
+            indices = np.zeros(0, dtype=np.int32)
+            data = np.zeros(0, dtype=np.float64)
+        
+        return cls(indptr, indices, data, (len(rows), n_cols))
+    
+    @classmethod
+    def from_dense(cls, matrix: np.ndarray) -> "CSRMatrix":
+        """Build a CSR matrix from a dense 2-D array"""
+        matrix = np.atleast_2d(matrix)
+        rows = []
+        for row in matrix:
+            nonzero = np.flatnonzero(row)
+            rows.append((nonzero, row[nonzero]))
+        return cls.from_rows(rows, matrix.shape[1])
+    
+    @property
+    def nnz(self) -> int:
+        """Number of stored non-zero entries"""
+        return len(self.data)
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the CSR arrays"""
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+    
+    @property
+    def row_ids(self) -> np.ndarray:
+        """Row id of every stored entry (cached for repeated products)"""
+        if self._row_ids is None:
+            self._row_ids = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        return self._row_ids
+    
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Column ids and weights of row ``i``"""
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+    
+    def splice_rows(self, rows: Dict[int, Tuple[np.ndarray, np.ndarray]],
+                    appended: List[Tuple[np.ndarray, np.ndarray]] = (), n_cols: Optional[int] = None) -> "CSRMatrix":
+        """
+        Copy with some rows replaced and rows appended
+        
+        Runs of unchanged rows are copied as whole array slices, so the cost
+        is one concatenation of the stored entries, not a Python step per row.
+        
+        Args:
+            rows: New (column ids, weights) by existing row id
+            appended: (column ids, weights) of rows added after the last one
+            n_cols: Number of columns of the result (default: unchanged)
+            
+        Returns:
+            CSRMatrix with ``shape[0] + len(appended)`` rows
+        """
+        lengths = np.diff(self.indptr)
+        indices, data = [], []
+        start = 0
+        for i in sorted(rows):
+            indices.append(self.indices[self.indptr[start]:self.indptr[i]])
+            data.append(self.data[self.indptr[start]:self.indptr[i]])
+            indices.append(rows[i][0])
+            data.append(rows[i][1])
+            lengths[i] = len(rows[i][0])
+            start = i + 1
+        indices.append(self.indices[self.indptr[start]:])
+        data.append(self.data[self.indptr[start]:])
+        for row_indices, row_data in appended:
+            indices.append(row_indices)
+            data.append(row_data)
+        
+        lengths = np.concatenate((lengths, [len(row[0]) for row in appended])).astype(np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        n_cols = self.shape[1] if n_cols is None else n_cols
+        return CSRMatrix(indptr, np.concatenate(indices).astype(np.int32, copy=False),
+                         np.concatenate(data).astype(np.float64, copy=False), (len(lengths), n_cols))
+    
+    def take_rows(self, rows: np.ndarray) -> "CSRMatrix":
+        """
+        Copy of the given rows, in the given order
+        
+        Args:
+            rows: Row ids to gather
+            
+        Returns:
+            CSRMatrix with one row per id
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return CSRMatrix(indptr, self.indices[positions], self.data[positions], (len(rows), self.shape[1]))
+    
+    def remap_columns(self, mapping: np.ndarray, n_cols: int) -> "CSRMatrix":
+        """
+        Move column ``j`` to ``mapping[j]``, dropping columns mapped to -1
+        
+        Args:
+            mapping: New column id per old column, order-preserving for kept columns
+            n_cols: Number of columns after the move
+            
+        Returns:
+            CSRMatrix with the same rows
+        """
+        columns = np.asarray(mapping)[self.indices]
+        kept = columns >= 0
+        counts = np.bincount(self.row_ids[kept], minlength=self.shape[0])
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        return CSRMatrix(indptr, columns[kept], self.data[kept], (self.shape[0], n_cols))
+    
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """
+        Sparse matrix x dense vector product
+        
+        Args:
+            vector: Dense vector with one entry per column
+            
+        Returns:
+            Dense array with one score per row
+        """
+        vector = np.asarray(vector).ravel()
+        products = self.data * vector[self.indices]
+        return np.bincount(self.row_ids, weights=products, minlength=self.shape[0])
+    
+    def row_norms(self) -> np.ndarray:
+        """L2 norm of every row"""
+        squared = np.bincount(self.row_ids, weights=self.data ** 2, minlength=self.shape[0])
+        return np.sqrt(squared)
+    
+    def normalize_rows(self) -> "CSRMatrix":
+        """Return a copy with every non-empty row scaled to unit L2 norm"""
+        norms = self.row_norms()
+        norms[norms == 0] = 1.0
+        data = self.data / norms[self.row_ids]
+        return CSRMatrix(self.indptr.copy(), self.indices.copy(), data, self.shape)
+    
+    def toarray(self) -> np.ndarray:
+        """Expand to a dense 2-D array (small matrices only)"""
+        dense = np.zeros(self.shape)
+        dense[self.row_ids, self.indices] = self.data
+        return dense
+    
+    def __len__(self) -> int:
+        return self.shape[0]
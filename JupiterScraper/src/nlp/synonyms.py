@@ -0,0 +1,103 @@
+"""
+Financial synonym expansion for Jupiter.money RAG Bot
+"""
+
+from typing import Dict, Iterable, List, Mapping, Tuple
+from config.settings import SYNONYM_EXPANSION, SYNONYM_WEIGHT
+
+# Financial domain synonyms for better understanding
+FINANCIAL_SYNONYMS = {
+    'account': ['account', 'banking', 'wallet', 'portfolio', 'profile'],
+    'savings': ['savings', 'deposit', 'money', 'funds', 'balance', 'reserve'],
+    'expense': ['expense', 'spending', 'cost', 'payment', 'transaction', 'outflow'],
+    'investment': ['investment', 'invest', 'fund', 'portfolio', 'stocks', 'shares'],
+    'security': ['security', 'safe', 'secure', 'protection', 'privacy', 'encryption'],
+    'fee': ['fee', 'charge', 'cost', 'rate', 'commission', 'levy'],
+    'transfer': ['transfer', 'send', 'receive', 'move', 'exchange', 'wire'],
+    'budget': ['budget', 'planning', 'tracking', 'management', 'allocation'],
+    'interest': ['interest', 'return', 'yield', 'earnings', 'profit'],
+    'loan': ['loan', 'credit', 'borrowing', 'advance', 'mortgage']
+}
+
+
+class SynonymTable:
+    """
+    Synonym groups compiled into a reverse map from term to expansion terms
+    
+    Expansion is one dictionary lookup per distinct term. The same table is
+    applied to documents at index time and to queries at search time, so
+    both sides of the dot product see the same synonyms.
+    """
+    
+    def __init__(self, synonyms: Mapping[str, List[str]] = FINANCIAL_SYNONYMS,
+                 weight: float = SYNONYM_WEIGHT if SYNONYM_EXPANSION else 0.0):
+        """
+        Args:
+            synonyms: Category name -> list of interchangeable terms
+            weight: Count given to an expansion term, relative to the term
+                that triggered it (0 disables expansion)
+        """
+        self.synonyms = synonyms
+        self.weight = weight
+        
+        # A term in several groups (e.g. 'cost', 'portfolio') expands to all of them
+        groups: Dict[str, set] = {}
+        for terms in synonyms.values():
+            for term in terms:
+                groups.setdefault(term, set()).update(terms)
+        self.expansions: Dict[str, Tuple[str, ...]] = {
+            term: tuple(sorted(group - {term})) for term, group in groups.items()
+        }
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether expansion adds any terms"""
+        return self.weight > 0 and bool(self.expansions)
+    
+    def expand_counts(self, word_freq: Mapping[str, float]) -> Mapping[str, float]:
+        """
+        Add weighted synonym counts to token counts
+        
+        An expansion term gets ``weight`` x the count of the strongest term
+        that triggered it, and never lowers a count the text already has.
+        Repeated occurrences therefore do not pile up synonym mass.
+        
+        Args:
+            word_freq: Token counts of a document or query
+        
+        Returns:
+            Counts including expansion terms (the input itself if nothing expands)
+        """
+        if not self.enabled:
+            return word_freq
+        
+        expanded = None
+        for word, freq in word_freq.items():
+            synonyms = self.expansions.get(word)
+            if not synonyms:
+                continue
+            if expanded is None:
+                expanded = dict(word_freq)
+            weighted = self.weight * freq
+            for synonym in synonyms:
+                if expanded.get(synonym, 0) < weighted:
+                    expanded[synonym] = weighted
+        return word_freq if expanded is None else expanded
+    
+    def expand_terms(self, words: Iterable[str]) -> set:
+        """
+        Distinct terms of a text plus their expansion terms
+        
+        Args:
+            words: Tokens (or distinct tokens) of a text
+        
+        Returns:
+            Set of terms the text contributes to document frequencies
+        """
+        terms = set(words)
+        if not self.enabled:
+            return terms
+        
+        for word in list(terms):
+            terms.update(self.expansions.get(word, ()))
+        return terms
@@ -0,0 +1,47 @@
+"""
+Shared tokenizer for Jupiter.money RAG Bot
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Tuple
+from config.settings import QUERY_TOKEN_CACHE_SIZE
+
+# Lowercased word characters; \w+ already treats %, ₹, $ and punctuation as separators
+WORD_PATTERN = re.compile(r'\w+')
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
+    'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should'
+})
+
+MIN_TOKEN_LENGTH = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase tokens, dropping short words and stop words
+    
+    Args:
+        text: Input text
+        
+    Returns:
+        List of tokens in text order
+    """
+    return [word for word in WORD_PATTERN.findall(text.lower())
+            if len(word) >= MIN_TOKEN_LENGTH and word not in STOP_WORDS]
+
+
+@lru_cache(maxsize=QUERY_TOKEN_CACHE_SIZE)
+def tokenize_query(query: str) -> Tuple[str, ...]:
+    """
+    Tokenize a query, memoized so repeated questions skip the regex pass
+    
+    Args:
+        query: User question
+        
+    Returns:
+        Tuple of tokens (immutable, safe to share between callers)
+    """
+    return tuple(tokenize(query))
@@ -2,11 +2,15 @@
 Enhanced TF-IDF Vectorizer with financial domain knowledge
 """
 
-import re
-from typing import List
+import heapq
+from typing import Iterable, List, Optional, Tuple, Union
 from collections import Counter
 import numpy as np
-from config.settings import MAX_VOCABULARY_SIZE, SYNONYM_EXPANSION
+from config.settings import MAX_VOCABULARY_SIZE
+from .sparse import CSRMatrix
+from .synonyms import FINANCIAL_SYNONYMS, SynonymTable
+from .tokenizer import tokenize, tokenize_query
+from src.metrics import METRICS
 
 
 class EnhancedTFIDFVectorizer:
@@ -19,100 +23,214 @@ class EnhancedTFIDFVectorizer:
         self.idf = {}
         self.documents = []
         
-        # Financial domain synonyms for better understanding
-        self.synonyms = {
-            'account': ['account', 'banking', 'wallet', 'portfolio', 'profile'],
-            'savings': ['savings', 'deposit', 'money', 'funds', 'balance', 'reserve'],
-            'expense': ['expense', 'spending', 'cost', 'payment', 'transaction', 'outflow'],
-            'investment': ['investment', 'invest', 'fund', 'portfolio', 'stocks', 'shares'],
-            'security': ['security', 'safe', 'secure', 'protection', 'privacy', 'encryption'],
-            'fee': ['fee', 'charge', 'cost', 'rate', 'commission', 'levy'],
-            'transfer': ['transfer', 'send', 'receive', 'move', 'exchange', 'wire'],
-            'budget': ['budget', 'planning', 'tracking', 'management', 'allocation'],
-            'interest': ['interest', 'return', 'yield', 'earnings', 'profit'],
-            'loan': ['loan', 'credit', 'borrowing', 'advance', 'mortgage']
-        }
-    
-    def fit(self, documents: List[str]) -> None:
+        # Document frequency of every term seen (kept for incremental updates)
+        self.doc_freq = Counter()
+        self.total_docs = 0
+        self._idf_cache = (None, None)
+        
+        # Financial domain synonyms, compiled once into a reverse lookup table
+        self.synonyms = FINANCIAL_SYNONYMS
+        self.synonym_table = SynonymTable(self.synonyms)
+    
+    def fit(self, documents: Iterable[str]) -> None:
         """
         Build enhanced vocabulary with synonym expansion
         
         Args:
-            documents: List of text documents to process
+            documents: Text documents to process (any iterable, consumed once)
         """
-        self.documents = documents
+        self.documents = documents if isinstance(documents, list) else []
         
         # Build vocabulary with synonym expansion
         doc_freq = Counter()
+        total_docs = 0
         for doc in documents:
-            words = self._tokenize(doc)
-            if SYNONYM_EXPANSION:
-                # Add synonyms for key terms
-                expanded_words = self._expand_with_synonyms(words)
-                doc_freq.update(set(expanded_words))
-            else:
-                doc_freq.update(set(words))
-        
-        # Limit vocabulary size for performance
-        if len(doc_freq) > MAX_VOCABULARY_SIZE:
-            # Keep most frequent terms
-            doc_freq = Counter(dict(doc_freq.most_common(MAX_VOCABULARY_SIZE)))
-        
-        # Create vocabulary and IDF
-        total_docs = len(documents)
-        for word, freq in doc_freq.items():
-            self.vocabulary[word] = len(self.vocabulary)
-            self.idf[word] = np.log(total_docs / freq)
+            doc_freq.update(self._document_terms(self.analyze(doc)))
+            total_docs += 1
+        
+        self._build_vocabulary(doc_freq, total_docs)
     
-    def _tokenize(self, text: str) -> List[str]:
+    def fit_counts(self, term_counts: Iterable[Counter]) -> CSRMatrix:
         """
-        Enhanced tokenization with financial terms preservation
+        Fit on already analyzed documents and return their TF rows
         
         Args:
-            text: Input text to tokenize
+            term_counts: Token counts per document, as returned by ``analyze``;
+                None marks a removed document, which gets an empty row
             
         Returns:
-            List of cleaned tokens
+            CSRMatrix of TF values
+        """
+        doc_freq = Counter()
+        counts = []
+        total_docs = 0
+        for word_freq in term_counts:
+            if word_freq is not None:
+                doc_freq.update(self._document_terms(word_freq))
+                total_docs += 1
+            counts.append(word_freq or Counter())
+        
+        self._build_vocabulary(doc_freq, total_docs)
+        rows = [self._tf_row(word_freq) for word_freq in counts]
+        return CSRMatrix.from_rows(rows, len(self.vocabulary))
+    
+    def partial_fit(self, added: List[Counter] = (),
+                    removed: List[Iterable[str]] = ()) -> Optional[Tuple[CSRMatrix, Optional[np.ndarray]]]:
+        """
+        Update document frequencies, vocabulary and IDF for added and removed documents
+        
+        The vocabulary is cut exactly as in ``fit``. Terms that leave it (no
+        document left, or pushed out by MAX_VOCABULARY_SIZE) are dropped and
+        the remaining ids compacted in order; terms that enter get the next
+        free ids. A term entering the vocabulary that untouched documents
+        already contain cannot be added to their rows, so then nothing
+        changes and None is returned: the caller must refit.
+        
+        State is rebound rather than modified, so a copy of the vectorizer
+        can be updated while the original still serves queries.
+        
+        Args:
+            added: Token counts (``analyze``) of documents entering the corpus
+            removed: Distinct tokens of documents leaving the corpus
+            
+        Returns:
+            Tuple of (CSRMatrix of TF rows for the added documents, array mapping
+            old vocabulary ids to new ones with -1 for dropped terms, or None if
+            no id moved), or None if a full refit is needed
         """
-        # Remove special characters but keep financial terms
-        text = re.sub(r'[^\w\s\-%₹$]', ' ', text)
-        words = re.findall(r'\b\w+\b', text.lower())
+        doc_freq = self.doc_freq.copy()
+        for tokens in removed:
+            doc_freq.subtract(self._document_terms(tokens))
+        added_freq = Counter()
+        for word_freq in added:
+            added_freq.update(self._document_terms(word_freq))
+        doc_freq.update(added_freq)
+        # Terms no document holds any more are gone, as in a fresh fit
+        doc_freq = +doc_freq
+        
+        kept = self._top_terms(doc_freq)
+        entering = [term for term in doc_freq if term in kept and term not in self.vocabulary]
+        if any(doc_freq[term] > added_freq[term] for term in entering):
+            return None
+        
+        vocabulary = {}
+        remap = np.full(len(self.vocabulary), -1, dtype=np.int32)
+        for term, idx in self.vocabulary.items():
+            if term in kept:
+                remap[idx] = vocabulary[term] = len(vocabulary)
+        for term in entering:
+            vocabulary[term] = len(vocabulary)
+        moved = not np.array_equal(remap, np.arange(len(remap)))
         
-        # Filter out very short words and common stop words
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-            'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
-            'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should'
-        }
+        self.doc_freq = doc_freq
+        self.total_docs += len(added) - len(removed)
+        self.vocabulary = vocabulary
+        self._update_idf()
+        rows = [self._tf_row(word_freq) for word_freq in added]
+        return CSRMatrix.from_rows(rows, len(self.vocabulary)), remap if moved else None
+    
+    def analyze(self, text: str) -> Counter:
+        """
+        Tokenize a document once into token counts
         
-        return [word for word in words if len(word) > 2 and word not in stop_words]
+        Args:
+            text: Document text
+            
+        Returns:
+            Counter of tokens
+        """
+        return Counter(tokenize(text))
     
-    def _expand_with_synonyms(self, words: List[str]) -> List[str]:
+    def apply_idf(self, tf_matrix: CSRMatrix) -> CSRMatrix:
         """
-        Expand words with their financial synonyms
+        Weight TF rows by the current IDF
         
         Args:
-            words: List of input words
+            tf_matrix: CSRMatrix of TF values over this vocabulary
             
         Returns:
-            List of words with synonyms added
+            CSRMatrix of TF-IDF weights with the same structure
+        """
+        data = tf_matrix.data * self.idf_array()[tf_matrix.indices]
+        return CSRMatrix(tf_matrix.indptr, tf_matrix.indices, data, (tf_matrix.shape[0], len(self.vocabulary)))
+    
+    def idf_array(self) -> np.ndarray:
+        """IDF values ordered by vocabulary id (cached until the IDF changes)"""
+        cached_idf, values = self._idf_cache
+        if cached_idf is self.idf and values is not None and len(values) == len(self.vocabulary):
+            return values
+        
+        values = np.zeros(len(self.vocabulary))
+        for word, idx in self.vocabulary.items():
+            values[idx] = self.idf[word]
+        self._idf_cache = (self.idf, values)
+        return values
+    
+    def doc_freq_array(self) -> np.ndarray:
+        """Document frequencies ordered by vocabulary id"""
+        return np.array([self.doc_freq[word] for word in self.vocabulary], dtype=np.float64)
+    
+    def _document_terms(self, words: Iterable[str]) -> set:
+        """Distinct terms a document contributes to document frequencies"""
+        return self.synonym_table.expand_terms(words)
+    
+    def _build_vocabulary(self, doc_freq: Counter, total_docs: int) -> None:
+        """Create vocabulary and IDF from document frequencies, replacing any previous fit"""
+        self.doc_freq = doc_freq
+        self.total_docs = total_docs
+        self.vocabulary = {}
+        
+        kept = self._top_terms(doc_freq)
+        for word in doc_freq:
+            if word in kept:
+                self.vocabulary[word] = len(self.vocabulary)
+        
+        self._update_idf()
+    
+    @staticmethod
+    def _top_terms(doc_freq: Counter):
+        """
+        Terms in the vocabulary: the MAX_VOCABULARY_SIZE most frequent ones
+        
+        Ties are broken by the term itself, so an incrementally updated
+        vocabulary keeps exactly the terms a fresh fit would.
         """
-        expanded = words.copy()
-        for word in words:
-            for category, synonyms in self.synonyms.items():
-                if word in synonyms:
-                    expanded.extend(synonyms)
-        return expanded
+        if len(doc_freq) <= MAX_VOCABULARY_SIZE:
+            return doc_freq.keys()
+        return set(heapq.nsmallest(MAX_VOCABULARY_SIZE, doc_freq, key=lambda term: (-doc_freq[term], term)))
     
-    def transform(self, documents: List[str]) -> np.ndarray:
+    def _update_idf(self) -> None:
+        """Recompute IDF for every vocabulary term from document frequencies"""
+        idf = {}
+        for word in self.vocabulary:
+            freq = self.doc_freq[word]
+            idf[word] = np.log(self.total_docs / freq) if freq > 0 else 0.0
+        self.idf = idf
+    
+    def _tokenize(self, text: str) -> List[str]:
+        """
+        Enhanced tokenization with financial terms preservation
+        
+        Args:
+            text: Input text to tokenize
+            
+        Returns:
+            List of cleaned tokens
+        """
+        return tokenize(text)
+    
+    @METRICS.timed("transform")
+    def transform(self, documents: List[str], sparse: bool = False) -> Union[np.ndarray, CSRMatrix]:
         """
         Transform documents to enhanced TF-IDF vectors
         
         Args:
             documents: List of text documents
+            sparse: Return a CSRMatrix instead of a dense array. Memory then
+                scales with non-zero weights instead of docs x vocabulary.
             
         Returns:
-            Numpy array of TF-IDF vectors
+            Numpy array (or CSRMatrix) of TF-IDF vectors
             
         Raises:
             ValueError: If vectorizer hasn't been fitted
@@ -120,22 +238,80 @@ class EnhancedTFIDFVectorizer:
         if not self.vocabulary:
             raise ValueError("Vectorizer must be fitted first")
         
-        vectors = []
-        for doc in documents:
-            words = self._tokenize(doc)
-            word_freq = Counter(words)
+        rows = [self._weights(doc) for doc in documents]
+        if sparse:
+            return CSRMatrix.from_rows(rows, len(self.vocabulary))
+        
+        vectors = np.zeros((len(documents), len(self.vocabulary)))
+        for i, (indices, weights) in enumerate(rows):
+            vectors[i, indices] = weights
+        
+        return vectors
+    
+    def _weights(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Non-zero TF-IDF weights of a single text
+        
+        Args:
+            text: Input text
             
-            # Create TF-IDF vector
-            vector = np.zeros(len(self.vocabulary))
-            for word, freq in word_freq.items():
-                if word in self.vocabulary:
-                    idx = self.vocabulary[word]
-                    tf = freq / len(words)
-                    vector[idx] = tf * self.idf[word]
+        Returns:
+            Tuple of (vocabulary ids, weights), sorted by id
+        """
+        return self._tfidf_row(self.analyze(text))
+    
+    def query_weights(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Non-zero TF-IDF weights of a query, using the cached query tokenizer
+        
+        Args:
+            query: User question
             
-            vectors.append(vector)
+        Returns:
+            Tuple of (vocabulary ids, weights), sorted by id
+        """
+        return self._tfidf_row(Counter(tokenize_query(query)))
+    
+    def query_counts(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Raw (synonym-expanded) term counts of a query, for BM25 ranking
+        
+        Args:
+            query: User question
+            
+        Returns:
+            Tuple of (vocabulary ids, counts), sorted by id
+        """
+        return self._count_row(Counter(tokenize_query(query)))
+    
+    def _tfidf_row(self, word_freq: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        """TF-IDF weights from token counts"""
+        indices, tf = self._tf_row(word_freq)
+        return indices, tf * self.idf_array()[indices] if len(indices) else tf
+    
+    def _tf_row(self, word_freq: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Term frequencies of in-vocabulary words, sorted by vocabulary id
+        
+        Synonyms are added with the table's weight; they do not count
+        towards the text length, so expansion never dilutes the real terms.
+        """
+        indices, counts = self._count_row(word_freq)
+        return indices, counts / sum(word_freq.values()) if len(indices) else counts
+    
+    def _count_row(self, word_freq: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        """Synonym-expanded counts of in-vocabulary words, sorted by vocabulary id"""
+        indices = []
+        counts = []
+        for word, freq in self.synonym_table.expand_counts(word_freq).items():
+            if word in self.vocabulary:
+                indices.append(self.vocabulary[word])
+                counts.append(freq)
         
-        return np.array(vectors)
+        indices = np.array(indices, dtype=np.int32)
+        counts = np.array(counts, dtype=np.float64)
+        order = np.argsort(indices)
+        return indices[order], counts[order]
     
     def transform_single(self, text: str) -> np.ndarray:
         """
@@ -0,0 +1,410 @@
+"""
+Scheduled data refresh (scrape -> extract -> chunk -> index) for Jupiter.money RAG Bot
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from config.settings import (
+    BASE_URL, DATA_FILE, INDEX_MAX_REMOVED, MAX_PAGES, PIPELINE_BUFFER, RANKING, REFRESH_CHECK_INTERVAL
+)
+from src.data.chunker import SOURCE_PREFIX, Chunk, iter_pages
+from src.data.manager import DataManager
+from src.data.snapshots import Snapshot, SnapshotStore
+from src.scraper.manifest import ScrapeManifest
+
+logger = logging.getLogger(__name__)
+
+# Pages always fetched first; crawling discovers the rest
+SEED_URLS = [
+    BASE_URL,
+    f"{BASE_URL}/about-us",
+    f"{BASE_URL}/services",
+    f"{BASE_URL}/features",
+    f"{BASE_URL}/pricing"
+]
+
+
+class RefreshResult(NamedTuple):
+    """Outcome of one pipeline run"""
+    summary: Dict[str, List[str]]  # "changed", "unchanged" and "removed" page URLs
+    snapshot: Optional[Snapshot]  # newly published snapshot (None if nothing changed)
+    stages: Dict[str, float]  # seconds spent in each stage
+    pages: int  # pages in the served data
+    failed: List[str]  # URLs that could not be fetched except 404/410 (their previous text is kept)
+
+
+async def collect_pages(crawler, previous: dict, pool, html_dir: Path = None,
+                        buffer_size: int = PIPELINE_BUFFER, extractors: int = None,
+                        stages: Dict[str, float] = None, verbose: bool = True) -> dict:
+    """
+    Crawl and extract pages as a bounded two-stage pipeline
+    
+    The crawler feeds a queue of at most ``buffer_size`` pages drained by
+    ``extractors`` tasks, each running one extraction at a time in the
+    process pool. When extraction falls behind, the queue fills up and the
+    crawler stops fetching, so memory stays bounded however large the site.
+    Pages the manifest reports as unchanged reuse their previous text
+    without re-extraction, and pages the crawler already parsed for links
+    carry their text with them.
+    
+    Args:
+        crawler: Crawler (anything with ``crawl(seeds)`` and ``manifest``)
+        previous: Text of every page from the last run, keyed by URL
+        pool: ExtractionPool (anything with an async ``extract(html)``)
+        html_dir: Save the raw HTML of fetched pages here
+        buffer_size: Fetched pages waiting for extraction before the crawler pauses
+        extractors: Concurrent extractions (default: pool workers, or one per CPU)
+        stages: Filled with the seconds from the start until the crawl ("crawl") and the
+            last extraction ("extract") finished; the two stages overlap
+        verbose: Print one line per page
+    
+    Returns:
+        Dict of url -> extracted text
+    """
+    start = time.perf_counter()
+    stages = {} if stages is None else stages
+    extractors = extractors or getattr(pool, "max_workers", None) or os.cpu_count() or 1
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer_size))
+    texts = {}
+    
+    async def crawl() -> None:
+        async for page in crawler.crawl(SEED_URLS):
+            if not page.changed and page.url in previous:
+                texts[page.url] = previous[page.url]
+                continue
+            
+            if html_dir is not None:
+                name = hashlib.sha1(page.url.encode('utf-8')).hexdigest()[:16]
+                (html_dir / f"{name}.html").write_text(page.html, encoding="utf-8")
+            # Waits while the queue is full
+            await queue.put(page)
+        stages["crawl"] = time.perf_counter() - start
+    
+    async def extract() -> None:
+        while True:
+            page = await queue.get()
+            if page is None:
+                return
+            try:
+                text = page.text if page.text is not None else await pool.extract(page.html)
+            except Exception as e:
+                print(f"❌ Failed to extract {page.url}: {e}")
+                continue
+            
+            if text and len(text) > 100:
+                texts[page.url] = text
+                if verbose:
+                    print(f"✅ {page.url}: extracted {len(text)} characters")
+            elif verbose:
+                print(f"⚠️  Insufficient content from {page.url}")
+    
+    workers = [asyncio.create_task(extract()) for _ in range(extractors)]
+    try:
+        await crawl()
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    stages["extract"] = time.perf_counter() - start
+    return texts
+
+
+class RefreshPipeline:
+    """
+    Scrape -> extract -> chunk -> index -> publish, off the request path
+    
+    Crawling and extraction overlap through a bounded queue; chunking and
+    indexing run on the staged snapshot, and only a fully built index is
+    published, so processes serving the old snapshot swap straight to a
+    ready one. Incremental runs update the index of the previous snapshot
+    with just the changed and removed pages. Per-stage durations are
+    written to the cache metadata.
+    """
+    
+    def __init__(self, manager: DataManager = None, snapshots: SnapshotStore = None,
+                 ranking: str = RANKING, max_pages: int = MAX_PAGES, follow_links: bool = True,
+                 incremental: bool = True, html_dir: Path = None, crawler=None, pool=None,
+                 manifest=None, verbose: bool = True):
+        """
+        Args:
+            manager: Owner of the cache metadata (``should_refresh_data``)
+            snapshots: Store the new data is published to
+            ranking: Ranking of the index built for the new data
+            max_pages: Maximum pages to crawl
+            follow_links: Discover links beyond the seed URLs
+            incremental: Send conditional requests and skip unchanged pages
+            html_dir: Save the raw HTML of fetched pages here (benchmark corpus)
+            crawler: Crawler to use (a new one per run by default)
+            pool: ExtractionPool to use (a new one per run by default)
+            manifest: ScrapeManifest to use (loaded from disk per run by default)
+            verbose: Print progress and per-page lines
+        """
+        self.manager = manager or DataManager()
+        self.snapshots = snapshots or SnapshotStore()
+        self.ranking = ranking
+        self.max_pages = max_pages
+        self.follow_links = follow_links
+        self.incremental = incremental
+        self.html_dir = Path(html_dir) if html_dir is not None else None
+        self.crawler = crawler
+        self.pool = pool
+        self.manifest = manifest
+        self.verbose = verbose
+    
+    def is_due(self) -> bool:
+        """Check if the data is older than REFRESH_INTERVAL"""
+        return self.manager.should_refresh_data()
+    
+    def run(self) -> RefreshResult:
+        """
+        Run the whole pipeline once
+        
+        Returns:
+            RefreshResult (``snapshot`` is None if the data did not change)
+        """
+        from src.scraper.crawler import Crawler
+        from src.scraper.extractor import ExtractionPool
+        
+        start = time.perf_counter()
+        stages: Dict[str, float] = {}
+        
+        # Every run publishes a new immutable snapshot; readers keep serving the old one meanwhile
+        current = self.snapshots.current()
+        data_file = current.data_file if current is not None else DATA_FILE
+        
+        # Text of every page from the last run, keyed by source URL
+        previous = {}
+        if self.incremental and data_file.exists():
+            previous = {url: text for url, text in iter_pages(data_file) if url}
+        
+        manifest = self.manifest or ScrapeManifest().load()
+        # Only trust validators for pages whose text we still have
+        manifest.retain(previous)
+        
+        if self.html_dir is not None:
+            self.html_dir.mkdir(parents=True, exist_ok=True)
+        
+        pool = self.pool or ExtractionPool()
+        crawler = self.crawler or Crawler(max_pages=self.max_pages, follow_links=self.follow_links,
+                                          manifest=manifest, pool=pool)
+        try:
+            texts = asyncio.run(collect_pages(crawler, previous, pool, self.html_dir, stages=stages,
+                                              verbose=self.verbose))
+        finally:
+            if self.pool is None:
+                pool.close()
+            if self.crawler is None:
+                crawler.close()
+        
+        # Keep the old text of pages that could not be fetched (timeouts, 401/403/429, 5xx);
+        # pages answered 404/410, no longer HTML or not reached at all are removed
+        for url in crawler.failed:
+            if url in previous and url not in texts:
+                texts[url] = previous[url]
+        
+        summary = {
+            "changed": sorted(url for url, text in texts.items() if previous.get(url) != text),
+            "unchanged": sorted(url for url, text in texts.items() if previous.get(url) == text),
+            "removed": sorted(set(previous) - set(texts))
+        }
+        if not texts:
+            # Leave the cache metadata alone so the refresh is retried at the next check
+            stages["total"] = time.perf_counter() - start
+            return RefreshResult(summary, None, stages, 0, list(crawler.failed))
+        
+        snapshot = None
+        if summary["changed"] or summary["removed"] or current is None:
+            # The diff is only complete when ``previous`` holds every page of the current snapshot
+            diff = summary if self.incremental and current is not None else None
+            snapshot = self.publish(texts, stages, diff)
+            data_file = snapshot.data_file
+        manifest.save()
+        stages["total"] = time.perf_counter() - start
+        
+        self.manager.data_file = data_file
+        self.manager.update_cache(stages)
+        return RefreshResult(summary, snapshot, stages, len(texts), list(crawler.failed))
+    
+    def publish(self, texts: Dict[str, str], stages: Dict[str, float],
+                summary: Optional[Dict[str, List[str]]] = None) -> Snapshot:
+        """
+        Stage the scraped pages, chunk and index them, then activate the snapshot
+        
+        Args:
+            texts: Extracted text keyed by URL
+            stages: Filled with the seconds spent in "chunk", "index" and "publish"
+                (a full build chunks while indexing, so its "chunk" stage is empty)
+            summary: "changed" and "removed" URLs relative to the current snapshot;
+                when given, only those pages are chunked and applied to its index
+        
+        Returns:
+            The activated Snapshot
+        """
+        from src.data.index_store import IndexStore
+        
+        pages = [f"{SOURCE_PREFIX}{url}\n{texts[url]}" for url in sorted(texts)]
+        snapshot = self.snapshots.stage("\n\n".join(pages))
+        store = IndexStore(snapshot.index_dir, snapshot.data_file, ranking=self.ranking)
+        built = store.is_current()
+        search = self.previous_index() if summary is not None and not built else None
+        
+        started = time.perf_counter()
+        chunks = []
+        if search is not None:
+            # Pages are re-read from the staged file so their chunks match a full build
+            changed = set(summary["changed"])
+            chunks = [chunk for page_id, (url, text) in enumerate(iter_pages(snapshot.data_file)) if url in changed
+                      for chunk in self.manager.chunker.chunk_page(text, url, page_id)]
+        stages["chunk"] = time.perf_counter() - started
+        
+        # Build the index before switching, so readers swap straight to a ready one
+        started = time.perf_counter()
+        if search is not None:
+            store.save(search, self.apply_changes(search, chunks, summary))
+        elif not built:
+            # A full build streams its chunks straight into the store, so chunking counts as indexing
+            manager = DataManager()
+            manager.data_file = snapshot.data_file
+            store.fit_and_save(manager.load_chunks())
+        stages["index"] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        self.snapshots.activate(snapshot)
+        stages["publish"] = time.perf_counter() - started
+        return snapshot
+    
+    def previous_index(self):
+        """
+        Index of the current snapshot, to be updated in place
+        
+        Returns:
+            EnhancedSimilaritySearch, or None if there is no usable index or more
+            than INDEX_MAX_REMOVED of its ids are removed chunks (refit instead)
+        """
+        from src.data.index_store import IndexStore
+        
+        current = self.snapshots.current()
+        if current is None:
+            return None
+        search = IndexStore(current.index_dir, current.data_file, ranking=self.ranking).load()
+        if search is None or search.documents.count(None) > INDEX_MAX_REMOVED * len(search.documents):
+            return None
+        return search
+    
+    @staticmethod
+    def apply_changes(search, chunks: List[Chunk], summary: Dict[str, List[str]]) -> Iterator[Optional[Chunk]]:
+        """
+        Apply changed and removed pages to a loaded index in one update
+        
+        The windows of a changed page reuse the ids of its old windows; extra
+        old windows are removed and extra new ones added. Only the ids of
+        those pages are looked up, and the result is a stream, so untouched
+        chunks are decoded once, while the new build is written.
+        
+        Args:
+            search: Index loaded by ``previous_index`` (its documents are a ChunkStore)
+            chunks: New windows of every changed page
+            summary: "changed" and "removed" page URLs
+        
+        Returns:
+            Chunks in id order (None for removed ids), to save with the index
+        """
+        import numpy as np
+        
+        store = search.documents
+        pages = {url: page for page, url in enumerate(store.sources)}
+        wanted = [pages[url] for url in summary["changed"] + summary["removed"] if url in pages]
+        chunk_ids = np.flatnonzero(np.isin(store.pages, wanted))
+        old_ids: Dict[str, List[int]] = {}
+        for i, page in zip(chunk_ids.tolist(), store.pages[chunk_ids].tolist()):
+            old_ids.setdefault(store.sources[page], []).append(i)
+        
+        # Origins of the changed and added ids; the others keep the store's
+        origins: Dict[int, tuple] = {}
+        new_chunks: Dict[str, List[Chunk]] = {}
+        for chunk in chunks:
+            new_chunks.setdefault(chunk.source_url, []).append(chunk)
+        
+        changes: Dict[int, Optional[str]] = {}
+        additions = []
+        for url in summary["changed"] + summary["removed"]:
+            ids, new = old_ids.get(url, []), new_chunks.get(url, [])
+            for i, chunk in zip(ids, new):
+                changes[i] = chunk.text
+                origins[i] = (chunk.source_url, chunk.page_id)
+            for i in ids[len(new):]:
+                changes[i] = None
+            for chunk in new[len(ids):]:
+                origins[len(store) + len(additions)] = (chunk.source_url, chunk.page_id)
+                additions.append(chunk.text)
+        search.update_documents(changes, additions)
+        
+        # Offsets inside the page are not stored with the index
+        return (Chunk(text, *(origins.get(i) or (store.source(i), store.page_id(i))), 0, 0)
+                if text is not None else None for i, text in enumerate(search.documents))
+
+
+class RefreshWorker(threading.Thread):
+    """
+    Background thread running the pipeline whenever the data is due
+    
+    Every ``interval`` seconds it asks ``DataManager.should_refresh_data``;
+    when a refresh is due it runs the pipeline and hands the published
+    snapshot to the engine, which swaps the new index in while queries keep
+    being answered from the old one.
+    """
+    
+    def __init__(self, pipeline: RefreshPipeline = None, engine=None,
+                 interval: float = REFRESH_CHECK_INTERVAL, warm_questions=()):
+        """
+        Args:
+            pipeline: Pipeline to run (a quiet default one if not given)
+            engine: RetrievalEngine to swap the new index into
+            interval: Seconds between checks
+            warm_questions: Answered after each swap so the new version starts warm
+        """
+        super().__init__(name="data-refresher", daemon=True)
+        self.pipeline = pipeline or RefreshPipeline(verbose=False)
+        self.engine = engine
+        self.interval = interval
+        self.warm_questions = list(warm_questions)
+        self._stopped = threading.Event()
+    
+    def run_once(self, force: bool = False) -> Optional[RefreshResult]:
+        """
+        Refresh if due (or if forced) and hand the new index to the engine
+        
+        Returns:
+            RefreshResult, or None if no refresh was due
+        """
+        if not force and not self.pipeline.is_due():
+            return None
+        
+        result = self.pipeline.run()
+        logger.info("Data refresh finished: %d pages, %d changed, stages %s", result.pages,
+                    len(result.summary["changed"]), {k: round(v, 2) for k, v in result.stages.items()})
+        if self.engine is not None and result.snapshot is not None and self.engine.refresh():
+            self.engine.warm(self.warm_questions)
+        return result
+    
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # Keep serving the current data; try again at the next check
+                logger.exception("Data refresh failed")
+            self._stopped.wait(self.interval)
+    
+    def stop(self) -> None:
+        """Ask the thread to exit after its current run"""
+        self._stopped.set()
@@ -0,0 +1,18 @@
+"""
+Web scraping modules for Jupiter.money RAG Bot
+
+Classes are imported on first access (the crawler and extractor need
+requests, BeautifulSoup and lxml).
+"""
+
+from src._lazy import lazy_exports
+
+__getattr__, __all__ = lazy_exports(__name__, {
+    "Crawler": ".crawler",
+    "FetchedPage": ".crawler",
+    "TokenBucket": ".crawler",
+    "ScrapeManifest": ".manifest",
+    "ExtractionPool": ".extractor",
+    "extract_text": ".extractor",
+    "extract_page": ".extractor",
+})
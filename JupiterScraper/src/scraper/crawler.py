@@ -0,0 +1,281 @@
+"""
+Concurrent crawler for Jupiter.money RAG Bot
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urldefrag, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import (
+    BASE_URL, USER_AGENT, MAX_PAGES, MAX_RETRIES, PAGE_TIMEOUT, HTML_PARSER,
+    MAX_CONCURRENT_REQUESTS, REQUESTS_PER_SECOND, RETRY_BACKOFF, PIPELINE_BUFFER
+)
+from .extractor import extract_page
+from .manifest import ScrapeManifest, content_hash
+
+# Links to these file types are never queued
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico',
+    '.css', '.js', '.zip', '.mp4', '.mp3', '.xml', '.json'
+)
+
+# Status codes worth retrying with backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Status codes saying the page no longer exists
+GONE_STATUSES = {404, 410}
+
+
+class FetchedPage(NamedTuple):
+    """A successfully fetched HTML page"""
+    url: str
+    status: int
+    html: str
+    headers: Dict[str, str]
+    links: List[str]
+    changed: bool = True  # False when the manifest says the page is unchanged (html may be empty)
+    text: Optional[str] = None  # extracted text, when the crawler already parsed the page for links
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter
+    
+    Allows bursts of up to ``capacity`` requests and refills at ``rate``
+    tokens per second. Waiting callers sleep on the event loop instead of
+    blocking the thread.
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+    
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Crawler:
+    """
+    Breadth-first crawler restricted to the host of ``base_url``
+    
+    Pages are fetched concurrently through one pooled keep-alive
+    ``requests.Session`` (blocking calls run in worker threads), limited to
+    ``concurrency`` in-flight requests per host and paced by a per-host
+    token bucket. Failed requests are retried ``max_retries`` times with
+    exponential backoff. URLs answered with 404 or 410 end up in ``gone``;
+    every other URL that could not be fetched (timeouts, 401/403/429, 5xx)
+    ends up in ``failed``. With a ScrapeManifest, requests are conditional
+    and unchanged pages come back with ``changed=False``. At most
+    ``buffer_size`` fetched pages wait for the consumer; beyond that the
+    workers stop fetching until it catches up.
+    
+    Pages are parsed for links off the event loop, in the ExtractionPool
+    when one is given (or a worker thread otherwise). The same parse yields
+    the page text, which comes back on the page so it is never parsed twice.
+    """
+    
+    def __init__(self, base_url: str = BASE_URL, max_pages: int = MAX_PAGES,
+                 max_retries: int = MAX_RETRIES, concurrency: int = MAX_CONCURRENT_REQUESTS,
+                 rate: float = REQUESTS_PER_SECOND, timeout: float = PAGE_TIMEOUT,
+                 backoff: float = RETRY_BACKOFF, follow_links: bool = True,
+                 manifest: Optional[ScrapeManifest] = None, buffer_size: int = PIPELINE_BUFFER,
+                 pool=None):
+        self.base_url = base_url.rstrip('/')
+        self.host = urlparse(self.base_url).netloc
+        self.max_pages = max_pages
+        self.max_retries = max_retries
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.timeout = timeout
+        self.backoff = backoff
+        self.follow_links = follow_links
+        self.manifest = manifest
+        self.buffer_size = max(1, buffer_size)
+        self.pool = pool  # ExtractionPool parsing fetched pages (None: parse in a thread)
+        
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.failed: List[str] = []  # errors other than 404/410: the page may still exist
+        self.gone: List[str] = []  # 404/410: the page was removed
+    
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.session.close()
+    
+    async def crawl(self, seeds: Optional[Iterable[str]] = None) -> AsyncIterator[FetchedPage]:
+        """
+        Crawl from the seed URLs, yielding pages as soon as they are fetched
+        
+        Args:
+            seeds: Start URLs (defaults to ``base_url``)
+            
+        Yields:
+            FetchedPage for every successfully fetched HTML page
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.buffer_size)
+        seen = set()
+        self.failed = []
+        self.gone = []
+        # Asyncio primitives belong to one event loop; a reused crawler gets fresh ones per crawl
+        self._semaphores = {}
+        self._buckets = {}
+        
+        def schedule(url: str) -> None:
+            url = self.normalize_url(url)
+            if url and url not in seen and len(seen) < self.max_pages:
+                seen.add(url)
+                queue.put_nowait(url)
+        
+        for seed in seeds or [self.base_url]:
+            schedule(seed)
+        
+        async def worker() -> None:
+            while True:
+                url = await queue.get()
+                try:
+                    page = await self.fetch(url)
+                    if page is not None:
+                        if self.follow_links:
+                            for link in page.links:
+                                schedule(link)
+                        await results.put(page)
+                finally:
+                    queue.task_done()
+        
+        async def finish() -> None:
+            await queue.join()
+            await results.put(None)
+        
+        tasks = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        tasks.append(asyncio.create_task(finish()))
+        try:
+            while True:
+                page = await results.get()
+                if page is None:
+                    break
+                yield page
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def fetch(self, url: str) -> Optional[FetchedPage]:
+        """
+        Fetch one URL with rate limiting, per-host concurrency and retries
+        
+        Args:
+            url: Absolute URL
+            
+        Returns:
+            FetchedPage, or None if the page could not be fetched (recorded in
+            ``failed`` or ``gone`` unless it simply was not an HTML page)
+        """
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+            self._buckets[host] = TokenBucket(self.rate, capacity=self.concurrency)
+        semaphore = self._semaphores[host]
+        bucket = self._buckets[host]
+        
+        headers = self.manifest.conditional_headers(url) if self.manifest else {}
+        
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                async with semaphore:
+                    response = await asyncio.to_thread(self.session.get, url, headers=headers,
+                                                       timeout=self.timeout)
+            except requests.RequestException as e:
+                error = str(e)
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return await self._to_page(url, response)
+                error = f"HTTP {response.status_code}"
+            
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+        
+        print(f"❌ Failed to fetch {url}: {error}")
+        self.failed.append(url)
+        return None
+    
+    async def _to_page(self, url: str, response: requests.Response) -> Optional[FetchedPage]:
+        """Convert a final response into a page, ignoring errors and non-HTML"""
+        if response.status_code == 304 and self.manifest and self.manifest.get(url):
+            links = self.manifest.get(url).get('links', [])
+            return FetchedPage(url, 304, "", dict(response.headers), links, changed=False)
+        
+        if response.status_code >= 300:
+            print(f"⚠️  HTTP {response.status_code} for {url}")
+            # Only 404/410 say the page is gone; blocks (401/403/451) and errors may pass
+            if response.status_code in GONE_STATUSES:
+                self.gone.append(url)
+            else:
+                self.failed.append(url)
+            return None
+        
+        content_type = response.headers.get("Content-Type", "")
+        if "html" not in content_type:
+            return None
+        
+        html = response.text
+        text, links = await self.parse(response.url or url, html) if self.follow_links else (None, [])
+        
+        changed = True
+        if self.manifest is not None:
+            html_hash = content_hash(html)
+            changed = not self.manifest.is_unchanged(url, html_hash)
+            self.manifest.record_fetch(url, response.headers, html_hash, links)
+        return FetchedPage(url, response.status_code, html, dict(response.headers), links, changed, text)
+    
+    async def parse(self, page_url: str, html: str) -> Tuple[str, List[str]]:
+        """
+        Parse a page off the event loop
+        
+        Returns:
+            (text, links): extracted text and the absolute, same-host links found in the page
+        """
+        if self.pool is not None:
+            text, links = await self.pool.parse(html, page_url)
+        else:
+            text, links = await asyncio.to_thread(extract_page, html, page_url, HTML_PARSER)
+        links = (self.normalize_url(link) for link in links)
+        return text, list(dict.fromkeys(link for link in links if link))
+    
+    def normalize_url(self, url: str) -> Optional[str]:
+        """Strip fragments and reject off-site or non-page URLs"""
+        url, _ = urldefrag(url)
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.netloc != self.host:
+            return None
+        if parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+            return None
+        return url.rstrip('/') if parsed.path not in ("", "/") else f"{parsed.scheme}://{parsed.netloc}"
@@ -0,0 +1,130 @@
+"""
+HTML text extraction stage for Jupiter.money RAG Bot
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import lxml.etree
+import lxml.html
+from bs4 import BeautifulSoup
+
+from config.settings import HTML_PARSER, EXTRACTION_WORKERS
+
+# Elements whose text never belongs in the knowledge base
+UNWANTED_TAGS = ["script", "style", "nav", "footer", "header", "noscript", "template"]
+
+
+def extract_text(html: str, parser: str = HTML_PARSER) -> str:
+    """
+    Extract visible text from a page
+    
+    Args:
+        html: Page HTML
+        parser: "lxml" for the fast lxml.html path, or any BeautifulSoup
+            parser name (e.g. "html.parser") for the legacy path
+            
+    Returns:
+        Whitespace-joined text with navigation, scripts and styles removed
+    """
+    return extract_page(html, parser=parser)[0]
+
+
+def extract_page(html: str, page_url: Optional[str] = None, parser: str = HTML_PARSER) -> Tuple[str, List[str]]:
+    """
+    Extract visible text and link targets from a page in a single parse
+    
+    Args:
+        html: Page HTML
+        page_url: URL the page was fetched from; links are only collected when given
+        parser: "lxml" or a BeautifulSoup parser name, as for ``extract_text``
+    
+    Returns:
+        (text, links): the text as ``extract_text`` returns it, and the absolute
+        targets of every ``<a href>`` (navigation included), deduplicated in order
+    """
+    if not html or not html.strip():
+        return "", []
+    
+    if parser == "lxml":
+        try:
+            root = lxml.html.fromstring(html)
+        except (lxml.etree.ParserError, ValueError):
+            return "", []
+        # Links first: most of them sit in the navigation stripped below
+        hrefs = root.xpath("//a/@href") if page_url else []
+        lxml.etree.strip_elements(root, lxml.etree.Comment, *UNWANTED_TAGS, with_tail=False)
+        text = " ".join(part.strip() for part in root.itertext() if part.strip())
+    else:
+        soup = BeautifulSoup(html, parser)
+        hrefs = [anchor["href"] for anchor in soup.find_all("a", href=True)] if page_url else []
+        
+        # Remove unwanted elements
+        for unwanted in soup(UNWANTED_TAGS):
+            unwanted.extract()
+        
+        # Extract text content
+        text = soup.get_text(separator=" ", strip=True)
+    
+    links = [urljoin(page_url, href.strip()) for href in hrefs]
+    return text, list(dict.fromkeys(links))
+
+
+class ExtractionPool:
+    """
+    Parses HTML in worker processes so extraction is not bound to one core
+    
+    Use ``extract`` (or ``parse`` for text and links) from asyncio code,
+    e.g. while the crawler is still fetching, or ``extract_pages`` to
+    stream (url, text) pairs in completion order into the chunker.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = EXTRACTION_WORKERS, parser: str = HTML_PARSER):
+        self.max_workers = max_workers
+        self.parser = parser
+        self._executor = None
+    
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Worker pool, started on first use"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+    
+    def close(self) -> None:
+        """Shut the worker processes down"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    def __enter__(self) -> "ExtractionPool":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    async def extract(self, html: str) -> str:
+        """Extract text in a worker process without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, extract_text, html, self.parser)
+    
+    async def parse(self, html: str, page_url: str) -> Tuple[str, List[str]]:
+        """Extract text and links (see ``extract_page``) in a worker process"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, extract_page, html, page_url, self.parser)
+    
+    def extract_pages(self, pages: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        """
+        Extract (url, html) pages in parallel
+        
+        Args:
+            pages: Pairs of page URL and HTML
+            
+        Yields:
+            (url, text) pairs as soon as each page is parsed
+        """
+        futures = {self.executor.submit(extract_text, html, self.parser): url for url, html in pages}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
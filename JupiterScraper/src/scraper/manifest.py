@@ -0,0 +1,83 @@
+"""
+Per-URL scrape manifest for incremental refreshes
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from config.settings import MANIFEST_FILE
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ScrapeManifest:
+    """
+    Remembers what was fetched from each URL
+    
+    For every URL the manifest keeps the ETag and Last-Modified validators,
+    a hash of the HTML and the page's links.
+    Refreshes send them back as If-None-Match / If-Modified-Since so
+    unchanged pages cost a 304 instead of a download and re-extraction.
+    """
+    
+    def __init__(self, path: Path = MANIFEST_FILE):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+    
+    def load(self) -> "ScrapeManifest":
+        """Load entries from disk (missing or corrupt files start empty)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+    
+    def save(self) -> None:
+        """Atomically write entries to disk"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file, indent=1)
+        os.replace(tmp_path, self.path)
+    
+    def get(self, url: str) -> Optional[dict]:
+        """Entry for a URL, if any"""
+        return self.entries.get(url)
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a URL"""
+        entry = self.entries.get(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def is_unchanged(self, url: str, html_hash: str) -> bool:
+        """Check if a freshly downloaded page matches the recorded HTML"""
+        entry = self.entries.get(url)
+        return bool(entry) and entry.get('content_hash') == html_hash
+    
+    def record_fetch(self, url: str, headers: Dict[str, str], html_hash: str, links: List[str]) -> None:
+        """Store HTTP validators, the HTML hash and links of a fetched page"""
+        entry = self.entries.setdefault(url, {})
+        entry.update({
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_hash': html_hash,
+            'links': links,
+            'fetched_at': datetime.now().isoformat()
+        })
+    
+    def retain(self, urls: Iterable[str]) -> None:
+        """Forget every URL not in ``urls`` (e.g. pages missing from the data file)"""
+        keep = set(urls)
+        self.entries = {url: entry for url, entry in self.entries.items() if url in keep}
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Data pipeline tests for Jupiter.money RAG Bot: chunking, scraping and extraction
+"""
+
+import sys
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+PAGE_TEXT = (
+    "Jupiter is a money app. Open a savings account in three minutes. "
+    "Pots help you save for travel, weddings and long-term goals. "
+    "The Edge credit card gives 10% cashback on shopping and 5% on travel. "
+    "Transfers over UPI are instant and free. Your money is protected by partner banks."
+)
+
+
+def test_chunker_windows_respect_budget_and_offsets():
+    """Windows stay within the token budget, slice the page exactly and overlap"""
+    from src.data.chunker import TextChunker
+
+    chunker = TextChunker(chunk_size=20, overlap=12)
+    chunks = list(chunker.chunk_page(PAGE_TEXT, "https://jupiter.money/", page_id=3))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk.text.split()) <= 20
+        assert chunk.text == PAGE_TEXT[chunk.start:chunk.end]
+        assert chunk.source_url == "https://jupiter.money/"
+        assert chunk.page_id == 3
+        assert chunk.text[-1] in ".!?"
+
+    # Consecutive windows share trailing sentences and together cover the page
+    assert any(b.start < a.end for a, b in zip(chunks, chunks[1:]))
+    assert chunks[0].start == 0 and chunks[-1].end == len(PAGE_TEXT)
+
+
+def test_chunker_splits_long_sentences_on_tokens():
+    """A run-on sentence is cut on whitespace, never mid-word"""
+    from src.data.chunker import TextChunker
+
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = list(TextChunker(chunk_size=50, overlap=0).chunk_page(text))
+
+    assert [len(chunk.text.split()) for chunk in chunks] == [50, 50, 50, 50]
+    assert " ".join(chunk.text for chunk in chunks) == text
+
+
+def test_chunk_file_reads_source_lines():
+    """Pages written with a Source line keep their URL"""
+    from src.data.chunker import TextChunker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "scraped_texts.txt"
+        data_file.write_text(
+            f"Source: https://jupiter.money/savings\n{PAGE_TEXT}\n\nLegacy page without a source line.",
+            encoding="utf-8",
+        )
+        chunks = list(TextChunker(chunk_size=40).chunk_file(data_file))
+
+    assert {chunk.source_url for chunk in chunks} == {"https://jupiter.money/savings", None}
+    assert chunks[-1].text == "Legacy page without a source line."
+    assert chunks[-1].page_id == 1
+
+
+class StandInSite:
+    """
+    Local HTTP stand-in for jupiter.money
+    
+    ``pages`` maps a path to its HTML body. Paths listed in ``flaky`` answer
+    503 that many times before succeeding, and paths in ``statuses`` always
+    answer that status. Responses carry an ETag and matching If-None-Match
+    requests get a 304.
+    """
+
+    def __init__(self, pages: dict, flaky: dict = None, statuses: dict = None):
+        self.pages = pages
+        self.flaky = dict(flaky or {})
+        self.statuses = dict(statuses or {})
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with site.lock:
+                    site.requests.append(self.path)
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                try:
+                    self._respond()
+                finally:
+                    with site.lock:
+                        site.in_flight -= 1
+
+            def _respond(self):
+                with site.lock:
+                    failures = site.flaky.get(self.path, 0)
+                    if failures:
+                        site.flaky[self.path] = failures - 1
+                status, body = (503, "busy") if failures else (
+                    (200, site.pages[self.path]) if self.path in site.pages else (404, "missing"))
+                if self.path in site.statuses:
+                    status, body = site.statuses[self.path], "denied"
+                etag = f'"{hash(body) & 0xffffffff:x}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, ""
+                threading.Event().wait(0.02)
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _page(body: str, *links: str) -> str:
+    anchors = "".join(f'<a href="{link}">link</a>' for link in links)
+    return f"<html><body><p>{body}</p>{anchors}</body></html>"
+
+
+def _crawl(crawler, seeds=None) -> list:
+    async def collect():
+        return [page async for page in crawler.crawl(seeds)]
+    try:
+        return asyncio.run(collect())
+    finally:
+        crawler.close()
+
+
+def test_crawler_discovers_site_links_concurrently():
+    """Links within the base URL are followed with bounded parallelism"""
+    from src.scraper.crawler import Crawler
+
+    pages = {"/": _page("home", "/a", "/b#top", "https://elsewhere.example/x", "/logo.png")}
+    pages.update({f"/{name}": _page(name, *(f"/{name}{i}" for i in range(5))) for name in "ab"})
+    pages.update({f"/{name}{i}": _page(f"{name}{i}", "/") for name in "ab" for i in range(5)})
+
+    with StandInSite(pages) as site:
+        crawler = Crawler(base_url=site.base_url, concurrency=3, rate=1000, backoff=0.01)
+        fetched = _crawl(crawler)
+
+    assert {page.url[len(site.base_url):] or "/" for page in fetched} == set(pages)
+    assert len(site.requests) == len(pages)  # every page fetched exactly once
+    assert all(page.text.startswith(page.url[len(site.base_url) + 1:] or "home") for page in fetched)
+    assert 1 < site.max_in_flight <= 3
+
+
+def test_crawler_can_be_reused_across_event_loops():
+    """Per-host limits are created per crawl, so a second asyncio.run works"""
+    from src.scraper.crawler import Crawler
+
+    pages = {"/": _page("home", *(f"/p{i}" for i in range(6)))}
+    pages.update({f"/p{i}": _page(f"p{i}") for i in range(6)})
+    with StandInSite(pages) as site:
+        # A slow rate makes workers wait on the bucket's lock, binding it to the running loop
+        crawler = Crawler(base_url=site.base_url, concurrency=3, rate=20)
+
+        async def collect():
+            return [page.url async for page in crawler.crawl()]
+
+        try:
+            first = asyncio.run(collect())
+            second = asyncio.run(collect())
+        finally:
+            crawler.close()
+    assert sorted(first) == sorted(second) and len(first) == len(pages)
+
+
+def test_crawler_honors_max_pages_and_retries():
+    """MAX_PAGES caps the crawl and 5xx responses are retried with backoff"""
+    from src.scraper.crawler import Crawler
+
+    pages = {"/": _page("home", *(f"/p{i}" for i in range(20)))}
+    pages.update({f"/p{i}": _page(f"p{i}") for i in range(20)})
+
+    with StandInSite(pages, flaky={"/p0": 2, "/p1": 5}) as site:
+        crawler = Crawler(base_url=site.base_url, max_pages=4, max_retries=2,
+                          concurrency=2, rate=1000, backoff=0.01)
+        fetched = _crawl(crawler)
+
+    urls = {page.url[len(site.base_url):] or "/" for page in fetched}
+    assert urls == {"/", "/p0", "/p2"}
+    assert crawler.failed == [site.base_url + "/p1"]
+    assert site.requests.count("/p0") == 3 and site.requests.count("/p1") == 3
+
+
+def test_crawler_separates_removed_pages_from_transient_failures():
+    """404s are reported as gone; blocked pages and pages still failing after retries as failed"""
+    from src.scraper.crawler import Crawler
+
+    pages = {"/": _page("home", "/busy", "/missing", "/blocked"), "/busy": _page("busy"), "/blocked": _page("b")}
+    with StandInSite(pages, flaky={"/busy": 5}, statuses={"/blocked": 403}) as site:
+        crawler = Crawler(base_url=site.base_url, max_retries=1, concurrency=1, rate=1000, backoff=0.01)
+        fetched = _crawl(crawler)
+
+    assert [page.url for page in fetched] == [site.base_url]
+    assert sorted(crawler.failed) == [site.base_url + "/blocked", site.base_url + "/busy"]
+    assert crawler.gone == [site.base_url + "/missing"]
+
+
+def test_crawler_conditional_refresh_skips_unchanged_pages():
+    """A manifest turns refreshes into 304s for pages that did not change"""
+    from src.scraper.crawler import Crawler
+    from src.scraper.manifest import ScrapeManifest
+
+    pages = {"/": _page("home", "/a", "/b"), "/a": _page("a"), "/b": _page("b")}
+
+    with tempfile.TemporaryDirectory() as tmp, StandInSite(pages) as site:
+        manifest_file = Path(tmp) / "manifest.json"
+
+        manifest = ScrapeManifest(manifest_file).load()
+        first = _crawl(Crawler(base_url=site.base_url, rate=1000, manifest=manifest))
+        assert all(page.changed for page in first)
+        manifest.save()
+
+        site.pages["/b"] = _page("b, updated")
+        manifest = ScrapeManifest(manifest_file).load()
+        assert manifest.conditional_headers(site.base_url + "/a")["If-None-Match"]
+        second = _crawl(Crawler(base_url=site.base_url, rate=1000, manifest=manifest))
+
+    changed = {page.url[len(site.base_url):] or "/": page.changed for page in second}
+    assert changed == {"/": False, "/a": False, "/b": True}
+    assert [page.status for page in second if not page.changed] == [304, 304]
+
+
+def test_extraction_parsers_agree_and_pool_streams():
+    """lxml extraction keeps the same words as html.parser, also in the pool"""
+    import asyncio
+    from src.scraper.extractor import ExtractionPool, extract_page, extract_text
+
+    html = ("<html><head><title>Jupiter</title><style>p{}</style><script>var x;</script></head>"
+            "<body><header>Logo</header><nav><a href='/'>Home</a></nav><!-- note -->"
+            "<p>Open a <b>savings</b> account &amp; earn rewards.</p><footer>Legal</footer></body></html>")
+
+    legacy = extract_text(html, "html.parser")
+    fast = extract_text(html, "lxml")
+    assert fast.split() == legacy.split() == "Jupiter Open a savings account & earn rewards.".split()
+    assert extract_text("", "lxml") == ""
+
+    # Links come from the same parse, navigation included
+    for parser in ("lxml", "html.parser"):
+        text, links = extract_page(html, "https://jupiter.money/save/", parser)
+        assert text.split() == fast.split() and links == ["https://jupiter.money/"]
+
+    pages = [(f"https://jupiter.money/{i}", html) for i in range(4)]
+    with ExtractionPool(max_workers=2) as pool:
+        results = dict(pool.extract_pages(pages))
+        parsed = asyncio.run(pool.parse(html, pages[0][0]))
+    assert results == {url: fast for url, _ in pages}
+    assert parsed == (fast, ["https://jupiter.money/"])
+
+
+def test_token_bucket_paces_requests():
+    """Beyond the burst capacity, acquisitions are spaced by 1 / rate"""
+    import time
+    from src.scraper.crawler import TokenBucket
+
+    async def take(n):
+        bucket = TokenBucket(rate=50, capacity=2)
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(take(7)) >= 0.09
+
+
+if __name__ == "__main__":
+    test_chunker_windows_respect_budget_and_offsets()
+    test_chunker_splits_long_sentences_on_tokens()
+    test_chunk_file_reads_source_lines()
+    test_crawler_discovers_site_links_concurrently()
+    test_crawler_can_be_reused_across_event_loops()
+    test_crawler_honors_max_pages_and_retries()
+    test_crawler_separates_removed_pages_from_transient_failures()
+    test_crawler_conditional_refresh_skips_unchanged_pages()
+    test_extraction_parsers_agree_and_pool_streams()
+    test_token_bucket_paces_requests()
+    print("🎉 Data pipeline tests passed!")
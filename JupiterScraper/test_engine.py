@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Engine tests for Jupiter.money RAG Bot: persistence, caching and serving
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+TEST_DOCS = [
+    "Jupiter offers savings accounts with competitive interest rates",
+    "Track your expenses and budget with Jupiter's smart tools",
+    "Invest in mutual funds and stocks through Jupiter's platform",
+    "Transfer money instantly with zero fees on UPI payments",
+    "Your account is protected with bank-grade security and encryption",
+]
+
+
+def _write_data_file(directory: Path, docs=TEST_DOCS) -> Path:
+    """Write chunks the way the scraper does"""
+    data_file = directory / "scraped_texts.txt"
+    data_file.write_text("\n\n".join(docs), encoding="utf-8")
+    return data_file
+
+
+def test_index_store_round_trip():
+    """A saved index maps back in and answers like the fitted one"""
+    from src.data.index_store import IndexStore
+    from src.data.manager import DataManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        data_file = _write_data_file(tmp)
+        store = IndexStore(index_dir=tmp / "index", data_file=data_file)
+        manager = DataManager()
+        manager.data_file = data_file
+
+        built = store.load_or_build(manager.load_data)
+        assert store.is_current()
+
+        loaded = store.load()
+        assert loaded is not None
+        assert list(loaded.documents) == TEST_DOCS
+        assert not loaded.index.weights.flags.writeable  # read-only mmap, not a copy
+        assert loaded.presence_matrix.data.strides == (0,)  # all-ones view, no heap array
+
+        # An unchanged data file (same size and mtime) is not re-hashed on load
+        data_hash = store.data_hash
+        store.data_hash = lambda: (_ for _ in ()).throw(AssertionError("data file hashed"))
+        assert store.load() is not None and store.loaded_hash() == data_hash()
+        del store.data_hash
+
+        for query in ["savings interest", "fees on UPI", "security"]:
+            assert loaded.search(query) == built.search(query)
+            assert np.array_equal(loaded.hybrid_scores(query, loaded.documents),
+                                  built.hybrid_scores(query, built.documents))
+
+        # Switching the ranking mode rebuilds the index with BM25 weights
+        bm25_store = IndexStore(index_dir=tmp / "index", data_file=data_file, ranking="bm25")
+        assert not bm25_store.is_current()
+        bm25_built = bm25_store.load_or_build(manager.load_data)
+        assert bm25_store.load().search("fees on UPI") == bm25_built.search("fees on UPI")
+        assert not store.is_current()
+
+        # Quantized weights replace the full-precision postings on disk and in memory
+        uint8_store = IndexStore(index_dir=tmp / "index", data_file=data_file, precision="uint8")
+        assert not uint8_store.is_current()
+        uint8_built = uint8_store.load_or_build(manager.load_chunks)
+        uint8_loaded = uint8_store.load()
+        assert uint8_loaded.index.precision == "uint8" and not uint8_loaded.index.compact.flags.writeable
+        assert uint8_loaded.index.weights is None and not (uint8_store.build / "post_weights.npy").exists()
+        for query in ["savings interest", "fees on UPI", "security"]:
+            assert uint8_loaded.search(query) == uint8_built.search(query)
+            assert [i for i, _, _ in uint8_loaded.search(query)] == [i for i, _, _ in built.search(query)]
+
+        # Changing the data file invalidates the saved index
+        _write_data_file(tmp, TEST_DOCS[:3])
+        assert not store.is_current()
+        assert store.load() is None
+        rebuilt = store.load_or_build(manager.load_data)
+        assert list(rebuilt.documents) == TEST_DOCS[:3]
+        assert not rebuilt.index.weights.flags.writeable  # served from the saved build
+
+        # Every save is a new build: indexes mapped before keep reading their own files
+        assert list(loaded.documents) == TEST_DOCS
+        assert loaded.search("fees on UPI") == built.search("fees on UPI")
+        assert store.build.name == store.builds()[-1]
+        assert store.builds() == ["b000001", "b000002", "b000003", "b000004"]
+        assert store.prune(protect=[store.index_dir / "b000001"]) == ["b000002"]  # keep=2, b000001 still in use
+        assert store.builds() == ["b000001", "b000003", "b000004"] and store.load() is not None
+
+
+def test_chunk_store_decodes_lazily_with_sources():
+    """Chunk texts live in one mapped UTF-8 blob, with their source URL and page id"""
+    from src.data.chunk_store import ChunkStore
+    from src.data.index_store import IndexStore
+    from src.data.manager import DataManager
+    from src.data.chunker import SOURCE_PREFIX
+
+    pages = [("https://www.jupiter.money/savings", TEST_DOCS[0] + " ₹ zero balance."),
+             ("https://www.jupiter.money/pay", TEST_DOCS[3])]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        data_file = tmp / "scraped_texts.txt"
+        data_file.write_text("\n\n".join(f"{SOURCE_PREFIX}{url}\n{text}" for url, text in pages), encoding="utf-8")
+        manager = DataManager()
+        manager.data_file = data_file
+        chunks = list(manager.load_chunks())
+
+        store = IndexStore(index_dir=tmp / "index", data_file=data_file)
+        store.load_or_build(manager.load_chunks)
+        documents = store.load().documents
+        assert isinstance(documents, ChunkStore) and not documents.offsets.flags.writeable
+        assert len(documents) == len(chunks) and documents.count(None) == 0
+        assert list(documents) == [chunk.text for chunk in chunks]
+        assert documents[0].endswith("₹ zero balance.") and documents[-1] == documents[len(documents) - 1]
+        assert [documents.source(i) for i in range(len(documents))] == [chunk.source_url for chunk in chunks]
+        assert documents.page_id(len(documents) - 1) == 1
+
+        # Plain texts are stored without a source
+        assert ChunkStore.write(tmp / "plain", TEST_DOCS[:2]) == 2
+        plain = ChunkStore(tmp / "plain")
+        assert plain[:] == TEST_DOCS[:2] and plain.source(1) is None and plain.page_id(0) == -1
+
+
+def test_query_cache_lru_ttl_and_versions():
+    """Bounded LRU with expiry; a new index version invalidates old answers"""
+    from src.nlp.query_cache import CachedAnswer, QueryCache
+
+    now = [0.0]
+    cache = QueryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    answer = CachedAnswer((0, 3), (0.9, 0.4), "Savings answer")
+
+    assert cache.get("What fees?", 1) is None
+    cache.put("What fees?", 1, answer)
+    assert cache.get("  what FEES ", 1) == answer
+    cache.put("savings", 1, answer)
+    cache.get("what fees", 1)                      # refresh LRU position
+    cache.put("budget", 1, answer)                 # evicts "savings"
+    assert cache.get("savings", 1) is None and cache.get("what fees", 1) == answer
+
+    now[0] = 11.0
+    assert cache.get("budget", 1) is None          # expired
+    cache.put("budget", 1, answer)
+    # Requests finishing on another index version miss without touching the cache
+    assert cache.get("budget", 2) is None and len(cache) == 2
+    cache.put("savings", 2, answer)
+    assert cache.get("budget", 1) == answer and len(cache) == 2
+    cache.set_version(2)
+    assert cache.get("budget", 2) is None and len(cache) == 0
+    assert cache.stats()["hits"] == 4 and cache.stats()["misses"] == 5
+
+
+def test_engine_answers_are_cached_and_prewarmed():
+    """The shared engine loads the persisted index, pre-warms popular questions and caches repeats"""
+    from chatbot import POPULAR_QUESTIONS
+    from src.engine import RetrievalEngine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = _write_data_file(Path(tmp))
+        engine = RetrievalEngine(data_file=data_file, index_dir=Path(tmp) / "index")
+        assert engine.ask("savings").chunk_ids == () and engine.documents == []
+        assert engine.load() and list(engine.documents) == TEST_DOCS
+        assert (Path(tmp) / "index" / "current.json").exists()
+
+        engine.warm(POPULAR_QUESTIONS)
+        assert engine.cache.stats()["entries"] == len(POPULAR_QUESTIONS)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("retrieval should not run on a cache hit")
+
+        search, engine.searcher.search = engine.searcher.search, fail
+        result, chunks = engine.ask_with_chunks("how do i open a savings account")
+        assert result.chunk_ids and result.answer.startswith("**Here's what I found")
+        assert chunks == [TEST_DOCS[i] for i in result.chunk_ids]
+        assert engine.cache.stats()["hits"] == 1
+        engine.searcher.search = search
+
+        # A rewritten data file is a new index version: old answers are dropped
+        _write_data_file(Path(tmp), TEST_DOCS[::-1])
+        reloaded = RetrievalEngine(data_file=data_file, index_dir=Path(tmp) / "index", cache=engine.cache)
+        assert reloaded.load() and reloaded.version != engine.version
+        timings = {}
+        answer, reloaded_chunks = reloaded.ask_with_chunks("How do I open a savings account?", timings)
+        assert "search" in timings and answer.answer.startswith("**Here's what I found")
+        assert set(reloaded_chunks) == set(chunks)
+        assert engine.cache.stats()["entries"] == 1
+
+
+def test_streamed_answer_matches_full_answer_and_is_timed():
+    """Answer pieces concatenate to generate_answer, are cached when done and timed per stream"""
+    from src.engine import RetrievalEngine
+    from src.metrics import Metrics
+
+    engine = RetrievalEngine()
+    engine.fit(TEST_DOCS, version="v1")
+    query = "How do I invest in mutual funds?"
+    expected = engine.generate_answer(query, engine.search(query))
+
+    result, chunks, pieces = engine.ask_stream(query)
+    assert chunks == [TEST_DOCS[i] for i in result.chunk_ids]
+    assert result.chunk_ids == tuple(i for i, _, _ in engine.search(query)) and result.answer == ""
+    assert len(engine.cache) == 0  # nothing is cached before the answer is complete
+    first = next(pieces)
+    assert first == "**Here's what I found about your question:**\n\n"
+    assert first + "".join(pieces) == expected
+    assert engine.ask(query) == result._replace(answer=expected)
+
+    cached, _, pieces = engine.ask_stream(query)
+    assert cached.answer == expected and list(pieces) == [expected]
+
+    metrics = Metrics(enabled=True)
+    assert list(metrics.timed_stream(iter(["a", "b"]), "first", "total")) == ["a", "b"]
+    spans = metrics.snapshot()["spans"]
+    assert spans["first"]["calls"] == spans["total"]["calls"] == 1
+    assert spans["first"]["last_ms"] <= spans["total"]["last_ms"]
+
+
+def test_snapshot_publish_and_index_swap_under_lease():
+    """Snapshots are immutable and atomic; a swap lets in-flight requests finish on the old index"""
+    from src.data.snapshots import SnapshotStore
+    from src.engine import RetrievalEngine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(Path(tmp) / "snapshots", Path(tmp) / "current.json", keep=2)
+        engine = RetrievalEngine(snapshots=store)
+        assert store.current() is None
+
+        first = store.publish("\n\n".join(TEST_DOCS[:3]))
+        assert store.current() == first and first.data_file.read_text(encoding="utf-8").startswith(TEST_DOCS[0])
+        assert store.publish("\n\n".join(TEST_DOCS[:3])) == first  # unchanged text: no new snapshot
+        assert not list(Path(tmp).rglob("*.tmp"))
+
+        assert engine.load() and engine.version == first.version and list(engine.documents) == TEST_DOCS[:3]
+        assert not engine.refresh()  # nothing new published
+        engine.warm(["savings interest"])
+
+        with engine.lease() as old:
+            second = store.publish("\n\n".join(TEST_DOCS))
+            assert first.data_file.read_text(encoding="utf-8").count("\n\n") == 2  # old snapshot untouched
+            assert engine.refresh() and engine.version == second.version
+            assert list(engine.documents) == TEST_DOCS
+
+            # The leased (old) index keeps serving until released
+            assert old.version == first.version and not old.closed
+            assert [text for _, _, text in engine._search(old, "savings interest")][0] == TEST_DOCS[0]
+            stale = engine.cache.get("savings interest", engine.version)
+            assert stale is None  # the new version does not see answers of the old one
+        assert old.closed and old.searcher is None and old.refs == 0
+
+        third = store.publish("\n\n".join(TEST_DOCS[1:]))
+        assert engine.refresh() and engine.version == third.version
+        assert store.versions() == sorted([second.version, third.version])  # oldest pruned (keep=2)
+
+
+def test_data_file_rebuild_under_lease():
+    """Rewriting a followed data file builds a new index directory; leased requests keep the old one"""
+    from src.engine import RetrievalEngine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        data_file = _write_data_file(tmp)
+        engine = RetrievalEngine(data_file=data_file, index_dir=tmp / "index")
+        assert engine.load()
+        first_build = engine._handle.build
+
+        with engine.lease() as old:
+            for docs in (TEST_DOCS[::-1], TEST_DOCS[:2], TEST_DOCS[1:]):
+                _write_data_file(tmp, docs)
+                assert engine.refresh() and list(engine.documents) == docs
+            # Two builds newer than keep=2 exist, but the leased one stays on disk and readable
+            assert first_build.exists() and first_build != engine._handle.build
+            assert list(old.documents) == TEST_DOCS
+            assert [text for _, _, text in engine._search(old, "fees on UPI")][0] == TEST_DOCS[3]
+        assert old.closed and not first_build.exists()
+        assert engine._handle.build.exists() and len(list((tmp / "index").glob("b*"))) == 2
+
+
+def test_refresh_pipeline_backpressure_stages_and_handoff():
+    """The scheduled refresh bounds the crawl backlog, times each stage and hands the index to the engine"""
+    import asyncio
+    import json
+    from src.data.manager import DataManager
+    from src.data.snapshots import SnapshotStore
+    from src.engine import RetrievalEngine
+    from src.nlp.similarity import EnhancedSimilaritySearch
+    from src.refresh import RefreshPipeline, RefreshWorker, collect_pages
+    from src.scraper.crawler import FetchedPage
+    from src.scraper.manifest import ScrapeManifest
+
+    pages = {f"https://www.jupiter.money/p{i}": " ".join([doc + "."] * 3) for i, doc in enumerate(TEST_DOCS * 4)}
+
+    class FakeCrawler:
+        def __init__(self):
+            self.manifest = None
+            self.failed = []
+            self.fetched = 0
+
+        async def crawl(self, seeds):
+            for url, html in pages.items():
+                self.fetched += 1
+                yield FetchedPage(url, 200, html, {}, [])
+
+    class SlowPool:
+        max_workers = 1
+
+        def __init__(self, crawler):
+            self.crawler = crawler
+            self.extracted = 0
+            self.backlog = 0
+
+        async def extract(self, html):
+            self.backlog = max(self.backlog, self.crawler.fetched - self.extracted)
+            await asyncio.sleep(0.001)
+            self.extracted += 1
+            return html
+
+    # One extraction in flight, one page queued, one waiting in the producer
+    crawler = FakeCrawler()
+    pool = SlowPool(crawler)
+    stages = {}
+    texts = asyncio.run(collect_pages(crawler, {}, pool, buffer_size=1, stages=stages, verbose=False))
+    assert texts == pages and pool.backlog <= 3
+    assert 0 < stages["crawl"] <= stages["extract"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = SnapshotStore(tmp / "snapshots", tmp / "current.json")
+        manager = DataManager()
+        manager.cache_file = tmp / "cache_metadata.json"
+        crawler = FakeCrawler()
+        pipeline = RefreshPipeline(manager=manager, snapshots=store, crawler=crawler, pool=SlowPool(crawler),
+                                   manifest=ScrapeManifest(tmp / "manifest.json"), verbose=False)
+        engine = RetrievalEngine(snapshots=store)
+        worker = RefreshWorker(pipeline, engine=engine)
+        assert pipeline.is_due() and not engine.is_ready
+
+        result = worker.run_once()
+        assert result.snapshot == store.current() and result.pages == len(pages)
+        assert engine.is_ready and engine.version == result.snapshot.version
+        assert engine.search("mutual funds")[0][2].startswith("Invest in mutual funds")
+
+        meta = json.loads(manager.cache_file.read_text())
+        assert meta["data_file"] == str(result.snapshot.data_file)
+        assert set(meta["stages"]) == {"crawl", "extract", "chunk", "index", "publish", "total"}
+        assert worker.run_once() is None  # fresh data: nothing due
+
+        # Nothing changed: no new snapshot, but the refresh is recorded
+        rerun = worker.run_once(force=True)
+        assert rerun.snapshot is None and rerun.summary["unchanged"] == sorted(pages)
+        assert store.versions() == [result.snapshot.version]
+
+        # A transient failure keeps its old text; a page that is gone (404) is removed
+        busy, missing, edited = (f"https://www.jupiter.money/p{i}" for i in range(3))
+        del pages[busy], pages[missing]
+        pages[edited] = " ".join(["Gold rewards on every card payment."] * 30)
+        crawler.failed = [busy]
+        partial = worker.run_once(force=True)
+        assert partial.summary["removed"] == [missing] and partial.failed == [busy]
+        assert partial.summary["changed"] == [edited]
+        assert partial.pages == len(pages) + 1 and engine.version == partial.snapshot.version
+        served = partial.snapshot.data_file.read_text(encoding="utf-8")
+        assert f"{busy}\n" in served and f"{missing}\n" not in served
+
+        # The previous index was updated in place and ranks like a full rebuild
+        updated = engine.searcher
+        manager = DataManager()
+        manager.data_file = partial.snapshot.data_file
+        fresh = EnhancedSimilaritySearch()
+        fresh.fit(manager.load_data())
+        assert updated.documents.count(None) == 1  # the gone page's id is kept, empty
+        assert len(updated.documents) - 1 == len(fresh.documents) > len(pages) + 1
+        for query in ["gold rewards", "mutual funds", "savings accounts", "zero fees"]:
+            got = sorted((text, score) for _, score, text in updated.search(query, 100))
+            expected = sorted((text, score) for _, score, text in fresh.search(query, 100))
+            assert [text for text, _ in got] == [text for text, _ in expected]
+            assert np.allclose([score for _, score in got], [score for _, score in expected])
+
+
+def test_light_imports_do_not_load_numpy():
+    """Settings, packages and the engine facade import without NumPy or side effects"""
+    import subprocess
+
+    code = (
+        "import sys\n"
+        "import config.settings, src.nlp, src.data, src.scraper, src.engine, src.metrics, src.refresh\n"
+        "from src.nlp import QueryCache\n"
+        "assert 'numpy' not in sys.modules, 'numpy imported eagerly'\n"
+        "from src.data import IndexStore\n"
+        "assert 'numpy' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=project_root, check=True)
+
+    settings = (project_root / "config" / "settings.py").read_text(encoding="utf-8")
+    assert "mkdir" not in settings
+
+
+def test_query_api_over_keep_alive_connection():
+    """/search and /ask answer JSON over one persistent HTTP connection"""
+    import asyncio
+    import http.client
+    import json
+    import threading
+    from src.api.server import QueryServer
+    from src.engine import RetrievalEngine
+
+    engine = RetrievalEngine()
+    engine.fit(TEST_DOCS)
+    server = QueryServer(engine, host="127.0.0.1", port=0, workers=2)
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+
+        def request(method, path, body=None):
+            payload = json.dumps(body) if body is not None else None
+            connection.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+
+        status, data = request("GET", "/search?q=savings+interest&k=3")
+        assert status == 200
+        expected = engine.search("savings interest", 3)
+        assert [(r["id"], r["score"]) for r in data["results"]] == [(i, s) for i, s, _ in expected]
+        assert data["timings_ms"]["total"] >= data["timings_ms"]["search"]
+        sock = connection.sock
+
+        status, first = request("POST", "/ask", {"q": "How secure is my account?"})
+        assert status == 200 and not first["cached"]
+        assert first["chunks"] == [TEST_DOCS[i] for i in first["chunk_ids"]]
+        status, second = request("POST", "/ask", {"q": "how secure is my account"})
+        assert second["cached"] and second["answer"] == first["answer"]
+
+        assert request("GET", "/search")[0] == 400
+        assert request("GET", "/nope?q=x")[0] == 404
+        assert request("GET", "/metrics")[0] == 200
+        assert connection.sock is sock  # every request reused the same connection
+        connection.close()
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
+
+
+def test_metrics_spans_counters_and_exports():
+    """Spans and counters record when enabled, cost nothing when disabled, and export"""
+    import json
+    from src.metrics import Metrics, NULL_SPAN
+    from src.nlp.similarity import EnhancedSimilaritySearch
+
+    disabled = Metrics(enabled=False)
+    assert disabled.span("score") is NULL_SPAN
+    disabled.increment("search_errors")
+    disabled.timed("fit")(lambda: None)()
+    assert disabled.snapshot() == {"spans": {}, "counters": {}}
+
+    metrics = Metrics(enabled=True)
+    with metrics.span("score"):
+        pass
+    try:
+        with metrics.span("score"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert metrics.timed("fit")(lambda x: x * 2)(21) == 42
+    metrics.increment("search_errors")
+    metrics.increment("search_errors", 2)
+
+    snapshot = json.loads(metrics.to_json())
+    assert snapshot["spans"]["score"]["calls"] == 2 and snapshot["spans"]["score"]["errors"] == 1
+    assert snapshot["spans"]["fit"]["calls"] == 1
+    assert snapshot["counters"] == {"search_errors": 3}
+
+    text = metrics.to_prometheus()
+    assert '# TYPE jupiter_span_calls_total counter' in text
+    assert 'jupiter_span_calls_total{span="score"} 2' in text
+    assert 'jupiter_span_errors_total{span="score"} 1' in text
+    assert 'jupiter_search_errors_total 3' in text
+    metrics.reset()
+    assert metrics.snapshot() == {"spans": {}, "counters": {}}
+
+    # The shared registry picks up the search hot path once switched on
+    from src.metrics import METRICS
+    previous = METRICS.enabled
+    METRICS.enabled = True
+    METRICS.reset()
+    try:
+        search = EnhancedSimilaritySearch()
+        search.fit(TEST_DOCS)
+        search.search("savings interest", 3)
+        spans = METRICS.snapshot()["spans"]
+        assert {"fit", "tokenize", "vectorize_query", "score", "sort"} <= set(spans)
+    finally:
+        METRICS.enabled = previous
+        METRICS.reset()
+
+
+if __name__ == "__main__":
+    test_index_store_round_trip()
+    test_chunk_store_decodes_lazily_with_sources()
+    test_query_cache_lru_ttl_and_versions()
+    test_engine_answers_are_cached_and_prewarmed()
+    test_streamed_answer_matches_full_answer_and_is_timed()
+    test_snapshot_publish_and_index_swap_under_lease()
+    test_data_file_rebuild_under_lease()
+    test_refresh_pipeline_backpressure_stages_and_handoff()
+    test_light_imports_do_not_load_numpy()
+    test_query_api_over_keep_alive_connection()
+    test_metrics_spans_counters_and_exports()
+    print("🎉 Engine tests passed!")
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Retrieval tests for Jupiter.money RAG Bot: ranking must match exhaustive cosine scoring
+"""
+
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+TEST_DOCS = [
+    "Jupiter offers savings accounts with competitive interest rates",
+    "Track your expenses and budget with Jupiter's smart tools",
+    "Invest in mutual funds and stocks through Jupiter's platform",
+    "Transfer money instantly with zero fees on UPI payments",
+    "Your account is protected with bank-grade security and encryption",
+]
+
+TEST_QUERIES = [
+    "How do I open a savings account?",
+    "What fees should I know about?",
+    "Is my money secure?",
+    "invest in stocks",
+]
+
+
+def _exhaustive_cosine(query_vector: np.ndarray, doc_vectors: np.ndarray) -> np.ndarray:
+    """Reference cosine scores computed one document at a time"""
+    scores = []
+    for doc_vector in doc_vectors:
+        norm = np.linalg.norm(query_vector) * np.linalg.norm(doc_vector)
+        scores.append(float(query_vector @ doc_vector / norm) if norm else 0.0)
+    return np.array(scores)
+
+
+def test_top_k_indices():
+    """Partial selection returns the best scores in descending order"""
+    from src.nlp.index import top_k_indices
+
+    scores = np.array([0.1, 0.9, 0.3, 0.9, 0.5])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 4]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 4, 2, 0]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_sparse_transform_matches_dense():
+    """CSR vectors hold the same weights and scores as the dense rows"""
+    from src.nlp.vectorizer import EnhancedTFIDFVectorizer
+
+    vectorizer = EnhancedTFIDFVectorizer()
+    vectorizer.fit(TEST_DOCS)
+    dense = vectorizer.transform(TEST_DOCS)
+    sparse = vectorizer.transform(TEST_DOCS, sparse=True)
+
+    assert sparse.shape == dense.shape
+    assert sparse.nnz == np.count_nonzero(dense)
+    assert np.allclose(sparse.toarray(), dense)
+    assert np.allclose(sparse.row_norms(), np.linalg.norm(dense, axis=1))
+
+    query_vector = vectorizer.transform_single(TEST_QUERIES[0]).flatten()
+    assert np.allclose(sparse.dot(query_vector), dense @ query_vector)
+
+
+def test_similarity_sparse_path_matches_dense():
+    """Large-corpus CSR scoring gives the same similarities as the dense path"""
+    from src.nlp import similarity as similarity_module
+    from src.nlp.similarity import EnhancedSimilaritySearch
+
+    search = EnhancedSimilaritySearch()
+    search.fit(TEST_DOCS)
+    others = TEST_DOCS + ["Gold rewards on every card payment"]
+    dense = search.calculate_similarity(TEST_QUERIES[0], others)
+
+    original = similarity_module.SPARSE_MIN_DOCUMENTS
+    similarity_module.SPARSE_MIN_DOCUMENTS = 1
+    try:
+        sparse = search.calculate_similarity(TEST_QUERIES[0], others)
+    finally:
+        similarity_module.SPARSE_MIN_DOCUMENTS = original
+
+    assert [i for i, _, _ in sparse] == [i for i, _, _ in dense]
+    assert np.allclose([s for _, s, _ in sparse], [s for _, s, _ in dense])
+
+
+def test_vectorized_hybrid_matches_per_document_loop():
+    """Bulk cosine + Jaccard scores match the per-document formula, before and after updates"""
+    from src.nlp.similarity import EnhancedSimilaritySearch
+    from src.nlp.tokenizer import tokenize
+
+    def legacy(search, query, documents):
+        query_words = set(tokenize(query))
+        query_vector = search.vectorizer.transform_single(query).flatten()
+        scores = []
+        for doc in documents:
+            doc_vector = search.vectorizer.transform_single(doc).flatten()
+            norm = np.linalg.norm(query_vector) * np.linalg.norm(doc_vector)
+            cosine = np.dot(query_vector, doc_vector) / norm if norm else 0.0
+            doc_words = set(tokenize(doc))
+            union = query_words | doc_words
+            overlap = len(query_words & doc_words) / len(union) if union else 0.0
+            scores.append(0.7 * cosine + 0.3 * overlap)
+        return np.array(scores)
+
+    search = EnhancedSimilaritySearch()
+    search.fit(TEST_DOCS)
+    for query in TEST_QUERIES + ["", "unknownword savings"]:
+        scores = [s for _, s, _ in search.calculate_similarity(query, search.documents)]
+        assert np.allclose(scores, legacy(search, query, TEST_DOCS), rtol=0, atol=1e-12)
+
+    search.add_documents(["Savings pots for travel and gold"])
+    search.replace_documents([1], ["Instant UPI transfers with zero fees"])
+    live = list(search.documents)
+    for query in TEST_QUERIES + ["travel gold"]:
+        scores = [s for _, s, _ in search.calculate_similarity(query, search.documents)]
+        assert np.allclose(scores, legacy(search, query, live), rtol=0, atol=1e-12)
+
+    # Removed documents keep their id with a zero score and an empty text
+    search.remove_documents([2])
+    assert search.calculate_similarity("mutual funds", search.documents)[2] == (2, 0.0, '')
+
+    weighted = EnhancedSimilaritySearch(cosine_weight=0.0, overlap_weight=1.0)
+    weighted.fit(TEST_DOCS)
+    overlaps = weighted.hybrid_scores("savings account", weighted.documents)
+    assert overlaps.max() <= 1.0 and overlaps.argmax() == 0
+
+    # A copy of the fitted corpus is not silently re-vectorized
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        copied = weighted.hybrid_scores("savings account", list(weighted.documents))
+    assert [w.category for w in caught] == [RuntimeWarning] and np.allclose(copied, overlaps)
+    assert np.array_equal(weighted.hybrid_scores("savings account"), overlaps)
+
+
+def test_inverted_index_matches_exhaustive_cosine():
+    """MaxScore pruning returns the exhaustive cosine top-k"""
+    from src.nlp.similarity import EnhancedSimilaritySearch
+    from src.nlp.index import top_k_indices
+
+    rng = np.random.default_rng(7)
+    words = ["savings", "account", "fees", "upi", "transfer", "budget", "invest",
+             "card", "cashback", "loan", "secure", "gold", "rewards", "limit"]
+    docs = [" ".join(rng.choice(words, size=rng.integers(3, 20))) for _ in range(300)]
+
+    search = EnhancedSimilaritySearch()
+    search.fit(docs)
+    doc_vectors = search.vectorizer.transform(docs)
+
+    for query in TEST_QUERIES + ["cashback card rewards limit", "loan"]:
+        expected = _exhaustive_cosine(search.vectorizer.transform_single(query).flatten(), doc_vectors)
+        for k in (1, 5, 20):
+            results = search.search(query, k)
+            order = [i for i in top_k_indices(expected, k) if expected[i] > 0]
+            assert [i for i, _, _ in results] == order
+            assert np.allclose([s for _, s, _ in results], expected[order])
+
+
+def test_search_batch_matches_single_queries():
+    """One matrix product per block gives each query's search() results"""
+    from src.nlp.similarity import EnhancedSimilaritySearch
+
+    rng = np.random.default_rng(3)
+    words = ["savings", "account", "fees", "upi", "transfer", "budget", "invest",
+             "card", "cashback", "loan", "secure", "gold", "rewards", "limit"]
+    docs = [" ".join(rng.choice(words, size=rng.integers(3, 20))) for _ in range(150)]
+    queries = TEST_QUERIES + ["", "unknownword", "cashback card rewards limit", "loan loan gold"]
+
+    for ranking in ("tfidf", "bm25"):
+        search = EnhancedSimilaritySearch(ranking=ranking)
+        search.fit(docs)
+        for block_size in (None, 1, 3):
+            batch = search.search_batch(queries, 7, block_size=block_size)
+            assert len(batch) == len(queries)
+            for query, results in zip(queries, batch):
+                expected = search.search(query, 7)
+                assert [i for i, _, _ in results] == [i for i, _, _ in expected]
+                assert np.allclose([s for _, s, _ in results], [s for _, s, _ in expected])
+
+    assert search.search_batch([], 5) == []
+
+
+def test_compact_precisions_rerank_to_exact_results():
+    """float32/uint8 posting weights shrink the scan and re-rank to the float64 results"""
+    from src.nlp.similarity import EnhancedSimilaritySearch
+
+    rng = np.random.default_rng(5)
+    words = ["savings", "account", "fees", "upi", "transfer", "budget", "invest",
+             "card", "cashback", "loan", "secure", "gold", "rewards", "limit", "jupiter"]
+    docs = [" ".join(rng.choice(words, size=rng.integers(3, 30))) for _ in range(400)]
+    queries = TEST_QUERIES + ["cashback card rewards limit", "loan loan gold", "jupiter"]
+
+    for ranking in ("tfidf", "bm25"):
+        exact = EnhancedSimilaritySearch(ranking=ranking)
+        exact.fit(docs)
+        for precision, dtype in (("float32", np.float32), ("uint8", np.uint8)):
+            compact = EnhancedSimilaritySearch(ranking=ranking, precision=precision)
+            compact.fit(docs)
+            index = compact.index
+            assert index.compact.dtype == dtype and index.nbytes() < exact.index.nbytes() / 1.9
+            # Re-ranking reads the document-major matrices, so no float64 postings stay resident
+            assert index.weights is None and index.weight_nbytes() == index.nbytes()
+
+            for query in queries:
+                expected = exact.search(query, 10)
+                cutoff = expected[-1][1]
+                for results in (compact.search(query, 10), compact.search_batch([query], 10)[0]):
+                    assert np.allclose([s for _, s, _ in results], [s for _, s, _ in expected])
+                    # Documents tied with the k-th score may be swapped for one another
+                    assert ([i for i, s, _ in results if s > cutoff + 1e-12]
+                            == [i for i, s, _ in expected if s > cutoff + 1e-12])
+
+    # A shallow re-rank still returns k exactly re-scored results
+    shallow = exact.index.with_precision("uint8")
+    shallow.rerank = 1
+    term_ids, weights = exact.vectorizer.query_counts("savings fees")
+    doc_ids, scores = shallow.search(term_ids, weights, 5, normalize=False)
+    assert len(doc_ids) == 5 and list(scores) == sorted(scores, reverse=True)
+
+
+def test_incremental_updates_match_full_refit():
+    """add/remove/replace give the same rankings as refitting the final corpus"""
+    from src.nlp.similarity import EnhancedSimilaritySearch
+
+    for ranking in ("tfidf", "bm25"):
+        search = EnhancedSimilaritySearch(ranking=ranking)
+        search.fit(TEST_DOCS[:3])
+        new_ids = search.add_documents(TEST_DOCS[3:] + ["Gold rewards on every card payment"])
+        search.remove_documents([1])
+        search.replace_documents([0], ["Jupiter Pots make saving for travel simple"])
+
+        assert new_ids == [3, 4, 5]
+        live = {i: doc for i, doc in enumerate(search.documents) if doc is not None}
+        assert 1 not in live and live[0].startswith("Jupiter Pots")
+
+        fresh = EnhancedSimilaritySearch(ranking=ranking)
+        fresh.fit(list(live.values()))
+        fresh_ids = list(live)
+
+        assert search.vectorizer.total_docs == len(live)
+        for term in fresh.vectorizer.vocabulary:
+            assert np.isclose(search.vectorizer.idf[term], fresh.vectorizer.idf[term])
+
+        for query in TEST_QUERIES + ["gold rewards", "travel pots", "budget tools"]:
+            incremental = search.search(query, 10)
+            expected = fresh.search(query, 10)
+            assert [i for i, _, _ in incremental] == [fresh_ids[i] for i, _, _ in expected]
+            assert np.allclose([s for _, s, _ in incremental], [s for _, s, _ in expected])
+
+
+def test_document_overlay_and_row_splicing():
+    """Updates lay changes over the old documents and splice rows without a per-row copy"""
+    from src.nlp.documents import DocumentOverlay
+    from src.nlp.similarity import EnhancedSimilaritySearch
+    from src.nlp.sparse import CSRMatrix
+
+    base = ["a", "b", None, "d"]
+    overlay = DocumentOverlay(DocumentOverlay(base, {0: "A", 1: None}, ["e"]), {4: "E", 3: None}, ["f"])
+    assert overlay.base is base and list(overlay) == ["A", None, None, None, "E", "f"]
+    assert overlay.count(None) == 3 and overlay[-1] == "f" and overlay[1:3] == [None, None]
+
+    dense = np.arange(1.0, 13.0).reshape(4, 3)
+    spliced = CSRMatrix.from_dense(dense).splice_rows({1: (np.array([2]), np.array([7.0]))},
+                                                      [(np.array([3]), np.array([1.0]))], n_cols=4)
+    expected = np.zeros((5, 4))
+    expected[:4, :3] = dense
+    expected[1] = [0, 0, 7, 0]
+    expected[4, 3] = 1
+    assert np.array_equal(spliced.toarray(), expected)
+
+    search = EnhancedSimilaritySearch()
+    search.fit(TEST_DOCS)
+    documents = search.documents
+    search.update_documents({1: None}, ["Gold rewards on every card payment"])
+    assert isinstance(search.documents, DocumentOverlay) and search.documents.base is documents
+    assert search.presence_matrix.data.strides == (0,)
+
+
+def test_partial_fit_keeps_the_capped_vocabulary_of_a_full_fit():
+    """Under MAX_VOCABULARY_SIZE, partial_fit keeps the terms and IDF that fit would"""
+    import src.nlp.vectorizer as vectorizer_module
+    from src.nlp.similarity import EnhancedSimilaritySearch
+    from src.nlp.vectorizer import EnhancedTFIDFVectorizer
+
+    cap = vectorizer_module.MAX_VOCABULARY_SIZE
+    vectorizer_module.MAX_VOCABULARY_SIZE = 3
+    try:
+        vectorizer = EnhancedTFIDFVectorizer()
+        vectorizer.fit(["alpha beta gamma", "alpha delta"])
+        assert set(vectorizer.vocabulary) == {"alpha", "beta", "delta"}
+
+        # A frequent new term pushes out a rare one; surviving ids are compacted in order
+        added = [vectorizer.analyze("omega omega"), vectorizer.analyze("omega zeta")]
+        rows, remap = vectorizer.partial_fit(added)
+        fresh = EnhancedTFIDFVectorizer()
+        fresh.fit(["alpha beta gamma", "alpha delta", "omega omega", "omega zeta"])
+        assert set(vectorizer.vocabulary) == set(fresh.vocabulary) == {"alpha", "beta", "omega"}
+        assert vectorizer.idf == fresh.idf
+        assert list(remap) == [0, 1, -1] and rows.shape == (2, 3)
+
+        # Admitting a term an untouched document already holds needs a refit
+        assert vectorizer.partial_fit(removed=[{"alpha", "beta", "gamma"}]) is None
+        assert set(vectorizer.vocabulary) == {"alpha", "beta", "omega"}
+
+        # Through the search engine, that refit happens on its own
+        vectorizer_module.MAX_VOCABULARY_SIZE = 8
+        for ranking in ("tfidf", "bm25"):
+            search = EnhancedSimilaritySearch(ranking=ranking)
+            search.fit(TEST_DOCS[:3])
+            search.add_documents(TEST_DOCS[3:] + ["Gold rewards on every card payment"])
+            search.remove_documents([1])
+            search.replace_documents([0], ["Jupiter Pots make saving for travel simple"])
+
+            live = {i: doc for i, doc in enumerate(search.documents) if doc is not None}
+            fresh = EnhancedSimilaritySearch(ranking=ranking)
+            fresh.fit(list(live.values()))
+            assert set(search.vectorizer.vocabulary) == set(fresh.vectorizer.vocabulary)
+            assert search.vectorizer.idf == fresh.vectorizer.idf
+            for query in TEST_QUERIES + ["gold rewards", "travel pots"]:
+                incremental = search.search(query, 10)
+                expected = fresh.search(query, 10)
+                assert [i for i, _, _ in incremental] == [list(live)[i] for i, _, _ in expected]
+                assert np.allclose([s for _, s, _ in incremental], [s for _, s, _ in expected])
+    finally:
+        vectorizer_module.MAX_VOCABULARY_SIZE = cap
+
+
+def test_refit_starts_clean():
+    """Fitting twice does not keep the previous vocabulary"""
+    from src.nlp.vectorizer import EnhancedTFIDFVectorizer
+
+    vectorizer = EnhancedTFIDFVectorizer()
+    vectorizer.fit(TEST_DOCS)
+    vectorizer.fit(["cashback on travel"])
+    assert set(vectorizer.vocabulary) == {"cashback", "travel"}
+    assert sorted(vectorizer.vocabulary.values()) == [0, 1]
+
+
+def test_bm25_matches_exhaustive_scoring():
+    """BM25/BM25+ index search equals the textbook formula over every document"""
+    from src.nlp.similarity import EnhancedSimilaritySearch
+    from src.nlp.index import top_k_indices
+
+    rng = np.random.default_rng(11)
+    words = ["savings", "account", "fees", "upi", "transfer", "budget", "invest",
+             "card", "cashback", "loan", "secure", "gold", "rewards", "jupiter"]
+    docs = [" ".join(rng.choice(words, size=rng.integers(2, 40))) + " jupiter" for _ in range(200)]
+
+    for ranking, k1, b, delta in (("bm25", 1.2, 0.75, 0.0), ("bm25+", 1.2, 0.75, 1.0)):
+        search = EnhancedSimilaritySearch(ranking=ranking)
+        search.fit(docs)
+        vectorizer = search.vectorizer
+        n_docs = len(docs)
+        lengths = [sum(vectorizer.analyze(doc).values()) for doc in docs]
+        avg_length = np.mean(lengths)
+
+        doc_counts = [dict(zip(*vectorizer._count_row(vectorizer.analyze(doc)))) for doc in docs]
+        idf = np.log1p((n_docs - vectorizer.doc_freq_array() + 0.5) / (vectorizer.doc_freq_array() + 0.5))
+        assert idf[vectorizer.vocabulary["jupiter"]] > 0  # in every document, still counts
+
+        for query in ["savings account fees", "gold rewards card", "jupiter", "secure upi transfer transfer"]:
+            term_ids, query_counts = vectorizer.query_counts(query)
+            expected = np.zeros(n_docs)
+            for d, (length, counts) in enumerate(zip(lengths, doc_counts)):
+                for t, q in zip(term_ids.tolist(), query_counts.tolist()):
+                    tf = counts.get(t, 0.0)
+                    if tf:
+                        norm = k1 * (1 - b + b * length / avg_length)
+                        expected[d] += q * idf[t] * (tf * (k1 + 1) / (tf + norm) + delta)
+
+            results = search.search(query, 10)
+            order = top_k_indices(expected, 10)
+            assert np.allclose([s for _, s, _ in results], expected[order])
+            assert [i for i, _, _ in results] == order.tolist()
+
+
+def test_synonym_expansion_is_symmetric_and_shared():
+    """Synonyms expand documents and queries alike"""
+    from collections import Counter
+    from src.nlp.tokenizer import tokenize
+    from src.nlp.similarity import EnhancedSimilaritySearch
+    from src.nlp.synonyms import SynonymTable
+
+    table = SynonymTable(weight=0.5)
+    assert {"spending", "charge"} <= set(table.expansions["cost"])
+    assert "cost" not in table.expansions["cost"]
+    expanded = table.expand_counts({"fee": 3, "charge": 2, "gold": 1})
+    assert expanded["fee"] == 3 and expanded["charge"] == 2 and expanded["levy"] == 1.5
+    assert SynonymTable(weight=0.0).expand_counts({"fee": 1}) == {"fee": 1}
+
+    docs = ["No commission on international wire payments", "Gold rewards on every card swipe"]
+    search = EnhancedSimilaritySearch()
+    search.fit(docs)
+    assert [i for i, _, _ in search.search("what is the charge to send abroad")] == [0]
+
+    # The expansion is applied to document and query vectors alike
+    vectorizer = search.vectorizer
+    for text in docs:
+        counts = table.expand_counts(Counter(tokenize(text)))
+        vector = vectorizer.transform_single(text).flatten()
+        for term, idx in vectorizer.vocabulary.items():
+            expected = counts.get(term, 0) / len(tokenize(text)) * vectorizer.idf[term]
+            assert np.isclose(vector[idx], expected)
+
+
+def test_shared_tokenizer():
+    """One tokenizer (with cached queries) feeds vectorizer, search and answers"""
+    from src.nlp.tokenizer import tokenize, tokenize_query
+    from src.nlp.answer_generator import SmartAnswerGenerator
+
+    text = "Earn 7% interest on ₹10,000 — the Jupiter savings-account is free!"
+    assert tokenize(text) == ["earn", "interest", "000", "jupiter", "savings", "account", "free"]
+    assert tokenize_query(text) == tuple(tokenize(text))
+    assert tokenize_query(text) is tokenize_query(text)
+
+    generator = SmartAnswerGenerator()
+    assert generator._detect_query_type("Which stocks can I buy?") == "investments"
+    assert generator._detect_query_type("Is it safe?") == "security"
+    assert generator._detect_query_type("Hello there") == "general"
+
+
+if __name__ == "__main__":
+    test_top_k_indices()
+    test_sparse_transform_matches_dense()
+    test_similarity_sparse_path_matches_dense()
+    test_vectorized_hybrid_matches_per_document_loop()
+    test_inverted_index_matches_exhaustive_cosine()
+    test_search_batch_matches_single_queries()
+    test_compact_precisions_rerank_to_exact_results()
+    test_incremental_updates_match_full_refit()
+    test_document_overlay_and_row_splicing()
+    test_partial_fit_keeps_the_capped_vocabulary_of_a_full_fit()
+    test_refit_starts_clean()
+    test_bm25_matches_exhaustive_scoring()
+    test_synonym_expansion_is_symmetric_and_shared()
+    test_shared_tokenizer()
+    print("🎉 Retrieval tests passed!")